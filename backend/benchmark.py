@@ -0,0 +1,266 @@
+"""Offline benchmarks for the detection code in server.py (no web server needed).
+
+    # Detector pipeline over synthetic scenes and/or recorded video, per resolution
+    python benchmark.py pipeline --source mock://?pattern=crowd --source clips/platform.mp4 \\
+        --resolution 640x480,1280x720 --frames 300 --json results.json
+
+    # Abandoned-object detector cost and alert latency
+    python benchmark.py abandoned --frames 600 --fps 5 --pattern crowd
+
+Runs headless on CPU; compare the --json output of two builds before rolling out.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import resource
+import time
+from collections import Counter
+
+import cv2
+import numpy as np
+
+from server import (
+    AbandonedObjectDetector, FrameRenditions, MockFrameRenderer, VideoProcessor,
+    detection_scheduler, parse_file_source, parse_mock_source
+)
+
+DEFAULT_SOURCES = ['mock://?pattern=static', 'mock://?pattern=intrusion', 'mock://?pattern=crowd&objects=16']
+
+
+def percentile_ms(samples, q):
+    return float(np.percentile(samples, q) * 1000) if samples else 0.0
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def parse_resolution(value):
+    if value == 'native':
+        return None
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+
+def video_path(source):
+    """Local path of a video file source (plain path or file://...?loop=1&rate=native)"""
+    spec = parse_file_source(source)
+    return spec['path'] if spec is not None else source
+
+
+def read_frames(source, size, count):
+    """Yield (frame, timestamp) pairs from a mock:// scene or a video file on a simulated clock.
+
+    Mock scenes are rendered deterministically (fixed seed). Video files are
+    rewound when they run out, and resized when a resolution is given.
+    """
+    start = 1_000_000.0
+    scene = parse_mock_source(source)
+    if scene is not None:
+        width, height = size or (scene['width'], scene['height'])
+        renderer = MockFrameRenderer(width, height, scene['pattern'], scene['objects'], seed=1)
+        for index in range(count):
+            now = start + index / scene['fps']
+            yield renderer.render(now=now), now
+        return
+
+    cap = cv2.VideoCapture(video_path(source))
+    if not cap.isOpened():
+        raise SystemExit(f"Cannot open video file {source}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 10.0
+    try:
+        for index in range(count):
+            ok, frame = cap.read()
+            if not ok:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ok, frame = cap.read()
+                if not ok:
+                    return
+            if size is not None and (frame.shape[1], frame.shape[0]) != size:
+                frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            yield frame, start + index / fps
+    finally:
+        cap.release()
+
+
+def source_fps(source):
+    scene = parse_mock_source(source)
+    if scene is not None:
+        return scene['fps']
+    cap = cv2.VideoCapture(video_path(source))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 10.0
+    cap.release()
+    return fps
+
+
+def run_case(source, size, args):
+    """Feed one source at one resolution through a fresh camera's detection pipeline"""
+    processor = VideoProcessor(f"bench-{abs(hash((source, size))) % 10000}", source, "benchmark",
+                               detectors=args.detectors)
+    processor.fps = source_fps(source)
+    detections = Counter()
+
+    # Count detections instead of handing them to the incident aggregator and database
+    def record_detection(event_type, description, confidence, severity="medium", zone=None, area=0):
+        processor.pipeline.note_detection()
+        detections[event_type.value] += 1
+    processor.report_detection = record_detection
+
+    rss_before = peak_rss_mb()
+    timings = []
+    resolution = None
+    for index, (frame, now) in enumerate(read_frames(source, size, args.frames + args.warmup)):
+        resolution = f"{frame.shape[1]}x{frame.shape[0]}"
+        started = time.perf_counter()
+        renditions = FrameRenditions(frame)
+        if args.adaptive:
+            processor.process_frame_for_events(frame, renditions, now)
+        else:
+            processor.pipeline.run(renditions, now)
+        if index >= args.warmup:
+            timings.append(time.perf_counter() - started)
+
+    total = sum(timings)
+    return {
+        'source': source,
+        'resolution': resolution,
+        'frames': len(timings),
+        'fps': round(len(timings) / total, 1) if total else 0.0,
+        'mean_ms': round(float(np.mean(timings)) * 1000, 3) if timings else 0.0,
+        'p50_ms': round(percentile_ms(timings, 50), 3),
+        'p99_ms': round(percentile_ms(timings, 99), 3),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'rss_growth_mb': round(peak_rss_mb() - rss_before, 1),
+        'detections': dict(detections),
+        'detectors': processor.pipeline.stats()
+    }
+
+
+def print_case(result):
+    print(f"{result['source']} @ {result['resolution']}: {result['frames']} frames, {result['fps']} frames/s, "
+          f"mean {result['mean_ms']} ms, p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms, "
+          f"peak RSS {result['peak_rss_mb']} MB (+{result['rss_growth_mb']})")
+    for name, stats in result['detectors'].items():
+        state = '' if stats['enabled'] else ' (paused: over budget)'
+        print(f"  {name:<18} runs {stats['runs']:>5}  mean {stats['mean_ms']:>7.3f} ms  max {stats['max_ms']:>7.3f} ms  "
+              f"share {stats['share']:>5.1%}  detections {stats['detections']}{state}")
+    if result['detections']:
+        print("  detections by type: " + ", ".join(f"{k}={v}" for k, v in sorted(result['detections'].items())))
+
+
+def bench_pipeline(args):
+    """Frames/sec, per-frame latency, memory and detections per source, resolution and detector"""
+    if args.adaptive:
+        # Offline runs go faster than real time; the global budget would throttle by wall clock
+        detection_scheduler.budget_fps = 0
+        detection_scheduler.cpu_percent = 0
+
+    async def run_all():
+        results = []
+        for source in args.source or DEFAULT_SOURCES:
+            for size in args.resolution:
+                result = run_case(source, size, args)
+                print_case(result)
+                results.append(result)
+        return results
+
+    results = asyncio.run(run_all())
+    if args.json:
+        report = {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'machine': {
+                'platform': platform.platform(),
+                'processor': platform.processor(),
+                'python': platform.python_version(),
+                'opencv': cv2.__version__,
+                'numpy': np.__version__,
+                'opencv_threads': cv2.getNumThreads()
+            },
+            'options': {
+                'frames': args.frames, 'warmup': args.warmup, 'adaptive': args.adaptive,
+                'detectors': args.detectors
+            },
+            'results': results
+        }
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.json}")
+
+
+def bench_abandoned(args):
+    """Per-frame cost of AbandonedObjectDetector on a synthetic scene with a dropped bag.
+
+    Runs on a simulated clock at the detection rate, so the dwell time passes
+    without waiting and the alert latency can be checked alongside the cost.
+    """
+    renderer = MockFrameRenderer(args.width, args.height, args.pattern, args.objects, seed=1)
+    detector = AbandonedObjectDetector(dwell_seconds=args.dwell)
+    drop_frame = int(args.drop_at * args.fps)
+    start = 1_000_000.0
+    timings = []
+    alerts = []
+
+    for index in range(args.frames):
+        now = start + index / args.fps
+        frame = renderer.render(now=now)
+        if index >= drop_frame:
+            # A bag left on the platform edge
+            x, y = int(args.width * 0.6), int(args.height * 0.7)
+            size = max(8, args.width // 16)
+            cv2.rectangle(frame, (x, y), (x + size, y + size), (25, 25, 25), -1)
+        gray = FrameRenditions(frame).gray('detection')
+
+        started = time.perf_counter()
+        found = detector.update(gray, now)
+        timings.append(time.perf_counter() - started)
+        for box in found:
+            alerts.append((index, box))
+
+    print(f"abandoned: {args.frames} frames, {args.width}x{args.height} source, pattern={args.pattern}, "
+          f"{args.fps} fps detection rate")
+    print(f"  per frame: mean {np.mean(timings) * 1000:.3f} ms, p50 {percentile_ms(timings, 50):.3f} ms, "
+          f"p99 {percentile_ms(timings, 99):.3f} ms ({1.0 / np.mean(timings):.0f} frames/s per core)")
+    for index, (x0, y0, x1, y1, area, dwell) in alerts:
+        print(f"  alert at {(index - drop_frame) / args.fps:.1f}s after the drop: "
+              f"box=({x0},{y0},{x1},{y1}) area={area} dwell={dwell:.1f}s")
+    if not alerts:
+        print("  no alert raised")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    pipeline = commands.add_parser('pipeline', help='detector pipeline throughput, latency, memory and detections')
+    pipeline.add_argument('--source', action='append',
+                          help='mock:// scene or video file; repeatable (default: static, intrusion and crowd scenes)')
+    pipeline.add_argument('--resolution', type=lambda v: [parse_resolution(r) for r in v.split(',')],
+                          default=[(640, 480)], help="comma-separated WxH list, or 'native' (default 640x480)")
+    pipeline.add_argument('--frames', type=int, default=300, help='timed frames per source and resolution')
+    pipeline.add_argument('--warmup', type=int, default=20, help='untimed frames before measuring')
+    pipeline.add_argument('--detectors', type=lambda v: [d.strip() for d in v.split(',') if d.strip()],
+                          default=None, help='comma-separated detector names (default: DETECTORS)')
+    pipeline.add_argument('--adaptive', action='store_true',
+                          help='go through process_frame_for_events, including adaptive decimation')
+    pipeline.add_argument('--json', help='write the results to this file')
+    pipeline.set_defaults(run=bench_pipeline)
+
+    abandoned = commands.add_parser('abandoned', help='abandoned-object detector cost and alert latency')
+    abandoned.add_argument('--frames', type=int, default=600)
+    abandoned.add_argument('--fps', type=float, default=5.0, help='detection rate (after decimation)')
+    abandoned.add_argument('--width', type=int, default=640)
+    abandoned.add_argument('--height', type=int, default=480)
+    abandoned.add_argument('--pattern', default='crowd')
+    abandoned.add_argument('--objects', type=int, default=8)
+    abandoned.add_argument('--drop-at', type=float, default=20.0, help='seconds into the run the bag appears')
+    abandoned.add_argument('--dwell', type=float, default=30.0)
+    abandoned.set_defaults(run=bench_abandoned)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from fastapi import FastAPI, APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Depends, BackgroundTasks
+from fastapi import FastAPI, APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Depends, BackgroundTasks, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import StreamingResponse, FileResponse
@@ -12,14 +12,21 @@ import numpy as np
 import asyncio
 import json
 import base64
+import struct
 from pathlib import Path
+from urllib.parse import urlparse, parse_qs, unquote
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Literal
 from datetime import datetime, timezone
 import uuid
 import threading
+import queue
+import heapq
+import multiprocessing
+from multiprocessing import shared_memory
 import time
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 import bcrypt
 import jwt
 from jwt.exceptions import PyJWTError
@@ -55,6 +62,8 @@ async def init_database():
 # Create directories for video storage
 RECORDINGS_DIR = ROOT_DIR / "recordings"
 RECORDINGS_DIR.mkdir(exist_ok=True)
+SNAPSHOTS_DIR = RECORDINGS_DIR / "snapshots"
+SNAPSHOTS_DIR.mkdir(exist_ok=True)
 
 # JWT Settings
 JWT_SECRET = os.environ.get('JWT_SECRET', 'your-secret-key-change-in-production')
@@ -134,6 +143,15 @@ class UserLogin(BaseModel):
     username: str
     password: str
 
+class DetectionZone(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str
+    points: List[List[float]]  # polygon vertices as [x, y] fractions of the frame (0..1)
+    event_type: EventType = EventType.MOTION
+    severity: Literal["low", "medium", "high", "critical"] = "medium"
+    min_area: Optional[int] = None  # foreground pixels on the 320x240 detection frame; None scales with zone size
+    enabled: bool = True
+
 class Camera(BaseModel):
     model_config = ConfigDict(extra='ignore')
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -146,8 +164,14 @@ class Camera(BaseModel):
     gps_lng: float = 0.0
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     last_seen: Optional[datetime] = None
-    fps: int = 30
-    resolution: str = "640x480"
+    fps: int = 30  # capture rate
+    resolution: str = "640x480"  # capture size (larger sources are downscaled, never upscaled)
+    stream_fps: Optional[float] = None  # rate frames are encoded for clients; None = fps
+    detection_fps: Optional[float] = None  # most frames/sec analysed (before adaptive decimation); None = fps
+    detection_mode: Optional[str] = None  # "mog2" or "batch"; None uses DETECTION_MODE
+    priority: float = 1.0  # weight for the shared detection budget (0-100]
+    zones: List[DetectionZone] = []  # empty = whole frame raises MOTION
+    detectors: Optional[List[str]] = None  # None uses DETECTORS
 
 class CameraCreate(BaseModel):
     name: str
@@ -155,6 +179,17 @@ class CameraCreate(BaseModel):
     source: str = "0"  # Default to webcam
     gps_lat: float = 0.0
     gps_lng: float = 0.0
+    fps: int = 30
+    resolution: str = "640x480"
+    stream_fps: Optional[float] = None
+    detection_fps: Optional[float] = None
+    detection_mode: Optional[str] = None
+    priority: float = 1.0
+    zones: List[DetectionZone] = []
+    detectors: Optional[List[str]] = None
+
+class CameraBulkRequest(BaseModel):
+    camera_ids: Optional[List[str]] = None  # None = every camera (start) / every running camera (stop)
 
 class Event(BaseModel):
     model_config = ConfigDict(extra='ignore')
@@ -173,6 +208,14 @@ class Event(BaseModel):
     acknowledged_by: Optional[str] = None
     acknowledged_at: Optional[datetime] = None
     severity: str = "medium"  # low, medium, high, critical
+    zone_id: Optional[str] = None
+    zone_name: Optional[str] = None
+    # Incident lifecycle: detections are coalesced into one event until it closes
+    is_open: bool = False
+    ended_at: Optional[datetime] = None
+    duration: float = 0.0  # seconds from first to last detection
+    peak_area: int = 0
+    detection_count: int = 1
 
 class Recording(BaseModel):
     model_config = ConfigDict(extra='ignore')
@@ -190,7 +233,155 @@ class Recording(BaseModel):
 # Global variables for video processing
 active_cameras = {}
 websocket_connections = []
+client_sessions = []
+mjpeg_streams = []
 video_processors = {}
+starting_cameras = set()  # ids whose start() is still running on camera_control_executor
+
+# Per-client frame delivery: frames older than this are dropped instead of sent
+WS_FRAME_STALE_SECONDS = float(os.environ.get('WS_FRAME_STALE_SECONDS', '1.0'))
+WS_HEARTBEAT_SECONDS = float(os.environ.get('WS_HEARTBEAT_SECONDS', '5.0'))
+# Control/event messages queued per client before the oldest are dropped
+WS_MAX_QUEUED_MESSAGES = int(os.environ.get('WS_MAX_QUEUED_MESSAGES', '256'))
+
+# Binary WebSocket frame protocol (negotiated with ?protocol=binary on /api/ws).
+# Each binary message is FRAME_HEADER followed by the raw JPEG bytes:
+# version (uint8), camera index (uint16), frame number (uint32),
+# capture timestamp in epoch seconds (float64), mock flag (uint8)
+FRAME_PROTOCOL_VERSION = 1
+FRAME_HEADER = struct.Struct('!BHIdB')
+
+# Preallocated frame slots per camera shared between the capture thread and consumers
+FRAME_RING_SLOTS = int(os.environ.get('FRAME_RING_SLOTS', '3'))
+
+# Pre-event (pre-roll) buffer of recent encoded frames kept per camera
+PRE_EVENT_SECONDS = float(os.environ.get('PRE_EVENT_SECONDS', '5'))
+PRE_EVENT_FPS = float(os.environ.get('PRE_EVENT_FPS', '5'))
+PRE_EVENT_MEMORY_MB = float(os.environ.get('PRE_EVENT_MEMORY_MB', '256'))
+
+# Recording engine
+RECORDING_QUEUE_SIZE = int(os.environ.get('RECORDING_QUEUE_SIZE', '64'))
+RECORDING_MEMORY_MB = float(os.environ.get('RECORDING_MEMORY_MB', '512'))
+RECORDING_POST_EVENT_SECONDS = float(os.environ.get('RECORDING_POST_EVENT_SECONDS', '10'))
+AUTO_RECORD_EVENTS = os.environ.get('AUTO_RECORD_EVENTS', 'false').lower() in ('1', 'true', 'yes')
+
+# Detection mode: "mog2" runs the background subtractor on every frame; "batch" first
+# scores all cameras together by frame differencing on tiny grayscale renditions and
+# only runs MOG2 for cameras whose score crosses BATCH_SCORE_THRESHOLD
+DETECTION_MODES = ('mog2', 'batch')
+DETECTION_MODE = os.environ.get('DETECTION_MODE', 'mog2')
+BATCH_PIXEL_THRESHOLD = int(os.environ.get('BATCH_PIXEL_THRESHOLD', '25'))
+BATCH_SCORE_THRESHOLD = float(os.environ.get('BATCH_SCORE_THRESHOLD', '0.002'))
+BATCH_HOLD_SECONDS = float(os.environ.get('BATCH_HOLD_SECONDS', '3'))
+BATCH_TICK_SECONDS = float(os.environ.get('BATCH_TICK_SECONDS', '0.2'))
+# While quiet, still feed MOG2 every Nth frame so its background stays current
+BATCH_BACKGROUND_EVERY = int(os.environ.get('BATCH_BACKGROUND_EVERY', '10'))
+
+# Global detection budget shared by all cameras (0 disables that limit)
+DETECTION_BUDGET_FPS = float(os.environ.get('DETECTION_BUDGET_FPS', '100'))
+DETECTION_BUDGET_CPU_PERCENT = float(os.environ.get('DETECTION_BUDGET_CPU_PERCENT', '0'))
+DETECTION_MIN_FPS = float(os.environ.get('DETECTION_MIN_FPS', '0.5'))
+# Cameras with motion in the last DETECTION_ACTIVITY_WINDOW seconds get DETECTION_ACTIVITY_BOOST x weight
+DETECTION_ACTIVITY_WINDOW = float(os.environ.get('DETECTION_ACTIVITY_WINDOW', '30'))
+DETECTION_ACTIVITY_BOOST = float(os.environ.get('DETECTION_ACTIVITY_BOOST', '4'))
+
+# Adaptive decimation: static scenes are analysed every DECIMATION_MAX_STRIDE-th frame,
+# stepping back down to every frame while motion persists
+DECIMATION_MAX_STRIDE = int(os.environ.get('DECIMATION_MAX_STRIDE', '5'))
+DECIMATION_QUIET_SECONDS = float(os.environ.get('DECIMATION_QUIET_SECONDS', '5'))
+
+# Optional detection tier: worker processes fed through shared memory (0 = detect in capture workers)
+DETECTION_WORKERS = int(os.environ.get('DETECTION_WORKERS', '0'))
+DETECTION_SLOTS_PER_CAMERA = int(os.environ.get('DETECTION_SLOTS_PER_CAMERA', '2'))
+# A crashed detection worker is respawned after a backoff that doubles per consecutive crash
+DETECTION_RESPAWN_SECONDS = float(os.environ.get('DETECTION_RESPAWN_SECONDS', '1'))
+DETECTION_RESPAWN_MAX_SECONDS = float(os.environ.get('DETECTION_RESPAWN_MAX_SECONDS', '30'))
+
+# Multipart boundary for /api/cameras/{camera_id}/stream.mjpg
+MJPEG_BOUNDARY = 'railvisionframe'
+
+# Highest capture fps a camera can be configured with
+CAMERA_MAX_FPS = int(os.environ.get('CAMERA_MAX_FPS', '60'))
+
+# Camera start/stop run on their own threads (device opens can block) with timeouts
+CAMERA_CONTROL_WORKERS = int(os.environ.get('CAMERA_CONTROL_WORKERS', '32'))
+CAMERA_START_TIMEOUT_SECONDS = float(os.environ.get('CAMERA_START_TIMEOUT_SECONDS', '10'))
+CAMERA_STOP_TIMEOUT_SECONDS = float(os.environ.get('CAMERA_STOP_TIMEOUT_SECONDS', '10'))
+camera_control_executor = ThreadPoolExecutor(max_workers=CAMERA_CONTROL_WORKERS, thread_name_prefix="camera-control")
+camera_control_slots = asyncio.Semaphore(CAMERA_CONTROL_WORKERS)
+
+# Video file sources (local paths or file://...?loop=1&rate=native); relative paths resolve here
+VIDEO_SOURCE_DIR = Path(os.environ.get('VIDEO_SOURCE_DIR', str(ROOT_DIR / 'videos')))
+
+# Network camera sources (rtsp://, http://, ...): open/read timeouts and reconnect backoff
+NETWORK_SOURCE_SCHEMES = ('rtsp', 'rtsps', 'rtmp', 'http', 'https', 'udp', 'tcp', 'srt')
+STREAM_OPEN_TIMEOUT_MS = int(os.environ.get('STREAM_OPEN_TIMEOUT_MS', '5000'))
+STREAM_READ_TIMEOUT_MS = int(os.environ.get('STREAM_READ_TIMEOUT_MS', '5000'))
+STREAM_RECONNECT_MIN_SECONDS = float(os.environ.get('STREAM_RECONNECT_MIN_SECONDS', '1'))
+STREAM_RECONNECT_MAX_SECONDS = float(os.environ.get('STREAM_RECONNECT_MAX_SECONDS', '30'))
+# RTSP over TCP avoids the smeared frames UDP packet loss causes
+os.environ.setdefault('OPENCV_FFMPEG_CAPTURE_OPTIONS', 'rtsp_transport;tcp')
+
+# Capture scheduler: a bounded thread pool steps every camera at its own deadline
+CAPTURE_WORKERS = int(os.environ.get('CAPTURE_WORKERS', str(min(32, (os.cpu_count() or 1) + 4))))
+CAPTURE_SATURATION_UTILIZATION = float(os.environ.get('CAPTURE_SATURATION_UTILIZATION', '0.9'))
+CAPTURE_SATURATION_LATE_FRACTION = float(os.environ.get('CAPTURE_SATURATION_LATE_FRACTION', '0.1'))
+CAPTURE_STATS_WINDOW = float(os.environ.get('CAPTURE_STATS_WINDOW', '5'))
+
+# Stable small integer per camera id, used in binary frame headers
+camera_indexes = {}
+
+def get_camera_index(camera_id: str) -> int:
+    if camera_id not in camera_indexes:
+        camera_indexes[camera_id] = len(camera_indexes) + 1
+    return camera_indexes[camera_id]
+
+# Renditions produced from every captured frame: name -> (width, height), None = as captured
+RENDITION_SIZES = {
+    'full': None,
+    'detection': (320, 240),
+    'thumbnail': (240, 180),
+    'motion': (80, 60)
+}
+
+# Stream quality tiers a client can subscribe to: name -> (rendition, JPEG quality)
+QUALITY_TIERS = {
+    'full': ('full', 70),
+    'thumbnail': ('thumbnail', 50)
+}
+
+class StreamDemand:
+    """Counts consumers per (camera, quality tier) so capture threads only encode what is watched"""
+
+    def __init__(self):
+        self.per_camera = defaultdict(lambda: defaultdict(int))
+        # Consumers that want every camera (legacy clients that never subscribe)
+        self.all_cameras = defaultdict(int)
+
+    def add(self, camera_id: Optional[str], tier: str):
+        if camera_id is None:
+            self.all_cameras[tier] += 1
+        else:
+            self.per_camera[camera_id][tier] += 1
+
+    def remove(self, camera_id: Optional[str], tier: str):
+        counts = self.all_cameras if camera_id is None else self.per_camera.get(camera_id)
+        if counts is None or counts.get(tier, 0) <= 0:
+            return
+        counts[tier] -= 1
+        if counts[tier] == 0:
+            del counts[tier]
+        if camera_id is not None and not counts:
+            del self.per_camera[camera_id]
+
+    def tiers_for(self, camera_id: str) -> List[str]:
+        tiers = set(self.all_cameras)
+        counts = self.per_camera.get(camera_id)
+        if counts:
+            tiers.update(counts)
+        return [tier for tier in QUALITY_TIERS if tier in tiers]
+
+stream_demand = StreamDemand()
 
 # Mock database storage when MongoDB is not available
 mock_db = {
@@ -285,80 +476,2513 @@ async def db_count_documents(collection_name: str, query: Optional[dict] = None)
             results = [doc for doc in results if all(doc.get(k) == v for k, v in query.items())]
         return len(results)
 
+class EncodedFrame:
+    """JPEG encoding of one captured frame, shared by every consumer of a camera"""
+    __slots__ = ('camera_id', 'camera_name', 'camera_index', 'tier', 'version', 'jpeg', 'captured_at', 'fps',
+                 'mock', '_b64', '_message', '_packet', '_mjpeg_part')
+
+    def __init__(self, camera_id, camera_name, camera_index, tier, version, jpeg, captured_at, fps, mock):
+        self.camera_id = camera_id
+        self.camera_name = camera_name
+        self.camera_index = camera_index
+        self.tier = tier
+        self.version = version
+        self.jpeg = jpeg
+        self.captured_at = captured_at
+        self.fps = fps
+        self.mock = mock
+        self._b64 = None
+        self._message = None
+        self._packet = None
+        self._mjpeg_part = None
+
+    @property
+    def b64(self):
+        # Base64 is only needed by JSON consumers, so build it on first use and keep it
+        if self._b64 is None:
+            self._b64 = base64.b64encode(self.jpeg).decode('utf-8')
+        return self._b64
+
+    def to_message(self):
+        if self._message is None:
+            self._message = {
+                'camera_id': self.camera_id,
+                'camera_name': self.camera_name,
+                'quality': self.tier,
+                'frame': self.b64,
+                'timestamp': datetime.fromtimestamp(self.captured_at, timezone.utc).isoformat(),
+                'frame_count': self.version,
+                'fps': self.fps,
+                'mock': self.mock
+            }
+        return self._message
+
+    @property
+    def packet(self):
+        """Binary WebSocket message: FRAME_HEADER + raw JPEG bytes"""
+        if self._packet is None:
+            header = FRAME_HEADER.pack(
+                FRAME_PROTOCOL_VERSION,
+                self.camera_index,
+                self.version & 0xFFFFFFFF,
+                self.captured_at,
+                1 if self.mock else 0
+            )
+            self._packet = header + self.jpeg
+        return self._packet
+
+    @property
+    def mjpeg_part(self):
+        """One multipart/x-mixed-replace part for MJPEG HTTP streams"""
+        if self._mjpeg_part is None:
+            self._mjpeg_part = (
+                b'--' + MJPEG_BOUNDARY.encode() + b'\r\n'
+                b'Content-Type: image/jpeg\r\n'
+                b'Content-Length: ' + str(len(self.jpeg)).encode() + b'\r\n\r\n'
+                + self.jpeg + b'\r\n'
+            )
+        return self._mjpeg_part
+
+class FrameRenditions:
+    """Sized versions of one captured frame.
+
+    Each rendition is resized at most once (from the smallest rendition already
+    available that is large enough) and JPEG-encoded only when a consumer asks
+    for it, so detection, dashboard thumbnails and full-size streaming share work.
+    """
+    __slots__ = ('full', '_images', '_grays', '_jpegs')
+
+    def __init__(self, frame: np.ndarray):
+        self.full = frame
+        self._images = {'full': frame}
+        self._grays = {}
+        self._jpegs = {}
+
+    def get(self, name: str) -> np.ndarray:
+        image = self._images.get(name)
+        if image is None:
+            width, height = RENDITION_SIZES[name]
+            if (self.full.shape[1], self.full.shape[0]) == (width, height):
+                image = self.full
+            else:
+                candidates = [img for img in self._images.values()
+                              if img.shape[1] >= width and img.shape[0] >= height]
+                source = min(candidates, key=lambda img: img.shape[0] * img.shape[1]) if candidates else self.full
+                image = cv2.resize(source, (width, height), interpolation=cv2.INTER_AREA)
+            self._images[name] = image
+        return image
+
+    @property
+    def detection(self) -> np.ndarray:
+        return self.get('detection')
+
+    def gray(self, name: str) -> np.ndarray:
+        image = self._grays.get(name)
+        if image is None:
+            image = self._grays[name] = cv2.cvtColor(self.get(name), cv2.COLOR_BGR2GRAY)
+        return image
+
+    def jpeg(self, name: str, quality: int) -> Optional[bytes]:
+        key = (name, quality)
+        if key not in self._jpegs:
+            ok, buffer = cv2.imencode('.jpg', self.get(name), [cv2.IMWRITE_JPEG_QUALITY, quality])
+            self._jpegs[key] = buffer.tobytes() if ok else None
+        return self._jpegs[key]
+
+class FrameSlot:
+    """A published frame: read-only view of a ring slot plus its sequence number"""
+    __slots__ = ('sequence', 'frame', 'captured_at')
+
+    def __init__(self, sequence, frame, captured_at):
+        self.sequence = sequence
+        self.frame = frame
+        self.captured_at = captured_at
+
+class FrameRing:
+    """Preallocated frame slots for one camera.
+
+    The capture step decodes or renders straight into the next slot and then
+    publishes it; consumers get a read-only view of the published slot instead
+    of a copy. That is only safe because every consumer (detection, encoding,
+    recording, the detection-worker handoff) runs synchronously inside the same
+    capture_step, before the slot can be reused. Anything that keeps a frame
+    past the step - an async task, a queue - must copy it first, or it will
+    read a slot the next frames overwrite.
+    """
+
+    def __init__(self, slots: int = 3):
+        self.buffers = [None] * slots
+        self.sequence = 0
+        self.latest = None
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def next_buffer(self, shape=None) -> Optional[np.ndarray]:
+        """Buffer to capture the next frame into (None if not allocated or the shape changed)"""
+        buffer = self.buffers[self._next]
+        if buffer is not None and shape is not None and buffer.shape != shape:
+            return None
+        return buffer
+
+    def publish(self, frame: np.ndarray, captured_at: Optional[float] = None) -> FrameSlot:
+        """Publish the frame captured into the next slot (adopting it if the capture allocated it)
+
+        captured_at is when the source produced the frame; None means now.
+        """
+        index = self._next
+        self.buffers[index] = frame
+        view = frame.view()
+        view.flags.writeable = False
+        with self._lock:
+            self.sequence += 1
+            self.latest = FrameSlot(self.sequence, view, time.time() if captured_at is None else captured_at)
+            self._next = (index + 1) % len(self.buffers)
+        return self.latest
+
+class PreEventBuffer:
+    """Recent full-quality EncodedFrames of one camera, covering the last `seconds`.
+
+    All mutation goes through the owning PreEventBufferPool, which enforces the
+    memory cap shared by every camera.
+    """
+
+    def __init__(self, pool, seconds: float):
+        self.pool = pool
+        self.seconds = seconds
+        self.frames = deque()
+        self.bytes = 0
+
+    def add(self, encoded: EncodedFrame):
+        self.pool.add(self, encoded)
+
+    def snapshot(self, seconds: Optional[float] = None) -> List[EncodedFrame]:
+        """Frames currently buffered (optionally only the last `seconds`), oldest first"""
+        with self.pool.lock:
+            frames = list(self.frames)
+        if seconds is not None and frames:
+            cutoff = frames[-1].captured_at - seconds
+            frames = [f for f in frames if f.captured_at >= cutoff]
+        return frames
+
+    def drain(self) -> List[EncodedFrame]:
+        """Take every buffered frame out of the buffer, oldest first"""
+        with self.pool.lock:
+            frames = list(self.frames)
+            self.frames.clear()
+            self.pool.total_bytes -= self.bytes
+            self.bytes = 0
+        return frames
+
+    def latest(self) -> Optional[EncodedFrame]:
+        with self.pool.lock:
+            return self.frames[-1] if self.frames else None
+
+class PreEventBufferPool:
+    """Owns every camera's PreEventBuffer and keeps their total size under max_bytes.
+
+    When over the cap, the buffer being written evicts its own oldest frames if it
+    holds more than its fair share; otherwise the largest buffer gives them up.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.evicted_frames = 0
+        self.buffers = []
+        self.lock = threading.Lock()
+
+    def create(self, seconds: float) -> PreEventBuffer:
+        buffer = PreEventBuffer(self, seconds)
+        with self.lock:
+            self.buffers.append(buffer)
+        return buffer
+
+    def release(self, buffer: PreEventBuffer):
+        with self.lock:
+            if buffer in self.buffers:
+                self.buffers.remove(buffer)
+                self.total_bytes -= buffer.bytes
+                buffer.frames.clear()
+                buffer.bytes = 0
+
+    def _pop_oldest(self, buffer: PreEventBuffer):
+        size = len(buffer.frames.popleft().jpeg)
+        buffer.bytes -= size
+        self.total_bytes -= size
+
+    def add(self, buffer: PreEventBuffer, encoded: EncodedFrame):
+        with self.lock:
+            buffer.frames.append(encoded)
+            size = len(encoded.jpeg)
+            buffer.bytes += size
+            self.total_bytes += size
+            
+            # Age limit for this camera
+            cutoff = encoded.captured_at - buffer.seconds
+            while len(buffer.frames) > 1 and buffer.frames[0].captured_at < cutoff:
+                self._pop_oldest(buffer)
+            
+            # Global memory cap across all cameras
+            while self.total_bytes > self.max_bytes:
+                fair_share = self.max_bytes / max(1, len(self.buffers))
+                victim = buffer if buffer.bytes > fair_share else max(self.buffers, key=lambda b: b.bytes)
+                if not victim.frames:
+                    break
+                self._pop_oldest(victim)
+                self.evicted_frames += 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                'cameras': len(self.buffers),
+                'frames': sum(len(b.frames) for b in self.buffers),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'evicted_frames': self.evicted_frames
+            }
+
+pre_event_pool = PreEventBufferPool(int(PRE_EVENT_MEMORY_MB * 1024 * 1024))
+
 # Mock video frames for demonstration
+MOCK_PATTERNS = ('static', 'sweep', 'bounce', 'intrusion', 'crowd')
+
+class MockFrameRenderer:
+    """Synthetic surveillance scene used for mock cameras.
+
+    The gradient, grid and static labels are rendered once per resolution and
+    shared by every renderer; each frame only copies that layer and draws the
+    timestamp and moving elements. Patterns:
+      static    - no motion (quiet platform)
+      sweep     - one marker crossing the frame every minute (default)
+      bounce    - one marker bouncing around the frame
+      intrusion - a figure crossing the track bed for a few seconds every 20s
+      crowd     - several walkers moving around the platform
+    """
+
+    _backgrounds = {}
+    _backgrounds_lock = threading.Lock()
+
+    def __init__(self, width: int = 640, height: int = 480, pattern: str = 'sweep',
+                 objects: int = 8, seed: Optional[int] = None):
+        if pattern not in MOCK_PATTERNS:
+            raise ValueError(f"Unknown mock pattern '{pattern}'. Must be one of {list(MOCK_PATTERNS)}")
+        self.width = width
+        self.height = height
+        self.pattern = pattern
+        self.scale = width / 640.0
+        self.background = self.get_background(width, height)
+        
+        # Crowd walkers: positions and velocities in pixels / second
+        rng = np.random.default_rng(seed)
+        self.positions = rng.uniform((0, height * 0.4), (width, height), size=(objects, 2))
+        self.velocities = rng.normal(0, 40 * self.scale, size=(objects, 2))
+        self.last_render_time = None
+        
+        # Timestamp patch is redrawn once per second, not once per frame
+        self.timestamp_text = None
+        self.timestamp_patch = None
+        self.timestamp_rows = min(height, int(45 * self.scale))
+        self.timestamp_cols = min(width, int(320 * self.scale))
+
+    @classmethod
+    def get_background(cls, width: int, height: int) -> np.ndarray:
+        key = (width, height)
+        with cls._backgrounds_lock:
+            background = cls._backgrounds.get(key)
+            if background is None:
+                background = cls._build_background(width, height)
+                background.flags.writeable = False
+                cls._backgrounds[key] = background
+        return background
+
+    @staticmethod
+    def _build_background(width: int, height: int) -> np.ndarray:
+        scale = width / 640.0
+        
+        # Background gradient, one broadcast assignment instead of a per-row loop
+        intensity = (30 + np.arange(height, dtype=np.float32) / height * 50).astype(np.uint8)
+        img = np.empty((height, width, 3), dtype=np.uint8)
+        img[:, :, 0] = intensity[:, None]
+        img[:, :, 1] = intensity[:, None]
+        img[:, :, 2] = intensity[:, None] + 10
+        
+        # Add grid lines for professional look
+        for x in range(0, width, max(1, int(80 * scale))):
+            cv2.line(img, (x, 0), (x, height), (40, 40, 40), 1)
+        for y in range(0, height, max(1, int(60 * scale))):
+            cv2.line(img, (0, y), (width, y), (40, 40, 40), 1)
+        
+        # Add camera info
+        cv2.putText(img, "RAILWAY VSS - LIVE",
+                    (int(10 * scale), int(60 * scale)), cv2.FONT_HERSHEY_SIMPLEX, 0.6 * scale, (0, 255, 255), 2)
+        
+        # Add status indicators, anchored to the bottom-right corner
+        left, top = width - int(140 * scale), height - int(80 * scale)
+        cv2.rectangle(img, (left, top), (width - int(20 * scale), height - int(20 * scale)), (0, 100, 0), -1)
+        cv2.putText(img, "RECORDING", (left + int(10 * scale), top + int(25 * scale)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.4 * scale, (255, 255, 255), 1)
+        cv2.putText(img, "AI ACTIVE", (left + int(10 * scale), top + int(45 * scale)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.4 * scale, (255, 255, 255), 1)
+        return img
+
+    def _draw_timestamp(self, img: np.ndarray, now: float):
+        text = datetime.fromtimestamp(now).strftime("%Y-%m-%d %H:%M:%S")
+        if text != self.timestamp_text:
+            patch = self.background[:self.timestamp_rows, :self.timestamp_cols].copy()
+            cv2.putText(patch, text, (int(10 * self.scale), int(30 * self.scale)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7 * self.scale, (0, 255, 0), 2)
+            self.timestamp_patch = patch
+            self.timestamp_text = text
+        img[:self.timestamp_rows, :self.timestamp_cols] = self.timestamp_patch
+
+    def _draw_marker(self, img: np.ndarray, x: int, y: int):
+        radius = max(4, int(20 * self.scale))
+        cv2.circle(img, (x, y), radius, (0, 0, 255), -1)
+        cv2.putText(img, "MOTION", (x - int(30 * self.scale), y - radius - 4),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5 * self.scale, (255, 255, 255), 1)
+
+    def _draw_dynamic(self, img: np.ndarray, now: float):
+        w, h, scale = self.width, self.height, self.scale
+        if self.pattern == 'sweep':
+            x = int(((now % 60) / 60) * (w - 40 * scale) + 20 * scale)
+            self._draw_marker(img, x, int(200 * scale))
+        elif self.pattern == 'bounce':
+            # Triangle waves with different periods on each axis
+            fx = abs((now / 7.0) % 2 - 1)
+            fy = abs((now / 5.0) % 2 - 1)
+            margin = int(30 * scale)
+            self._draw_marker(img, int(margin + fx * (w - 2 * margin)), int(margin + fy * (h - 2 * margin)))
+        elif self.pattern == 'intrusion':
+            # Figure crosses the track bed during the first 6 seconds of every 20
+            phase = now % 20
+            if phase < 6:
+                x = int((phase / 6) * w)
+                y = int(h * 0.85)
+                # ~1100 px on the 320x240 detection frame, above MOTION_AREA_THRESHOLD
+                bw, bh = int(40 * scale), int(110 * scale)
+                cv2.rectangle(img, (x - bw // 2, y - bh), (x + bw // 2, y), (200, 200, 220), -1)
+        elif self.pattern == 'crowd':
+            dt = 0.0 if self.last_render_time is None else min(1.0, now - self.last_render_time)
+            self.positions += self.velocities * dt
+            # Bounce walkers off the edges of the platform area
+            low = np.array([0, h * 0.4])
+            high = np.array([w - 1, h - 1])
+            out_of_bounds = (self.positions < low) | (self.positions > high)
+            self.velocities[out_of_bounds] *= -1
+            np.clip(self.positions, low, high, out=self.positions)
+            radius = max(3, int(12 * scale))
+            for px, py in self.positions.astype(np.int32):
+                cv2.circle(img, (int(px), int(py)), radius, (180, 160, 140), -1)
+        self.last_render_time = now
+
+    def render(self, out: Optional[np.ndarray] = None, now: Optional[float] = None) -> np.ndarray:
+        """Render one frame, into `out` if given (must match the renderer resolution)"""
+        if now is None:
+            now = time.time()
+        if out is None:
+            out = self.background.copy()
+        else:
+            np.copyto(out, self.background)
+        self._draw_timestamp(out, now)
+        self._draw_dynamic(out, now)
+        return out
+
+def parse_resolution(value: str) -> tuple:
+    """Parse 'WIDTHxHEIGHT' into (width, height); raises ValueError"""
+    width, height = (int(v) for v in value.lower().split('x'))
+    if not (16 <= width <= 7680 and 16 <= height <= 4320):
+        raise ValueError(f"Resolution {value} out of range")
+    return width, height
+
+def parse_mock_source(source: str, width: int = 640, height: int = 480, fps: int = 10) -> Optional[dict]:
+    """Parse a synthetic scene source such as mock://?resolution=1280x720&fps=15&pattern=crowd
+
+    Settings missing from the URL take the given defaults. Returns None when the
+    source is not a mock:// source.
+    """
+    if source != "mock" and not source.startswith("mock://"):
+        return None
+    params = {k: v[-1] for k, v in parse_qs(urlparse(source).query).items()}
+    scene = {'width': width, 'height': height, 'fps': fps, 'pattern': params.get('pattern', 'sweep'), 'objects': 8}
+    try:
+        if 'resolution' in params:
+            scene['width'], scene['height'] = parse_resolution(params['resolution'])
+        if 'fps' in params:
+            scene['fps'] = max(1, int(float(params['fps'])))
+        if 'objects' in params:
+            scene['objects'] = max(1, int(params['objects']))
+    except ValueError:
+        raise ValueError(f"Invalid mock source '{source}'")
+    if scene['pattern'] not in MOCK_PATTERNS:
+        raise ValueError(f"Unknown mock pattern '{scene['pattern']}'. Must be one of {list(MOCK_PATTERNS)}")
+    return scene
+
+_default_mock_renderer = MockFrameRenderer()
+
 def generate_mock_frame():
     """Generate a mock surveillance camera frame"""
-    # Create a base image
-    img = np.zeros((480, 640, 3), dtype=np.uint8)
-    
-    # Background gradient
-    for i in range(480):
-        intensity = int(30 + (i / 480) * 50)
-        img[i, :] = [intensity, intensity, intensity + 10]
-    
-    # Add some "surveillance" elements
-    current_time = datetime.now()
-    
-    # Add timestamp
-    cv2.putText(img, current_time.strftime("%Y-%m-%d %H:%M:%S"), 
-                (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-    
-    # Add camera info
-    cv2.putText(img, "RAILWAY VSS - LIVE", 
-                (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
-    
-    # Add some moving elements to simulate activity
-    second = current_time.second
-    x_pos = int((second / 60) * 600) + 20
-    cv2.circle(img, (x_pos, 200), 20, (0, 0, 255), -1)
-    cv2.putText(img, "MOTION", (x_pos - 30, 190), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-    
-    # Add grid lines for professional look
-    for i in range(0, 640, 80):
-        cv2.line(img, (i, 0), (i, 480), (40, 40, 40), 1)
-    for i in range(0, 480, 60):
-        cv2.line(img, (0, i), (640, i), (40, 40, 40), 1)
-    
-    # Add status indicators
-    cv2.rectangle(img, (500, 400), (620, 460), (0, 100, 0), -1)
-    cv2.putText(img, "RECORDING", (510, 425), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
-    cv2.putText(img, "AI ACTIVE", (510, 445), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
+    return _default_mock_renderer.render()
+
+def parse_file_source(source: str) -> Optional[dict]:
+    """Parse a video file source: a local path or file:///videos/platform.mp4?loop=1&rate=native
+
+    rate is 'native' (the file's own fps) or the frames/sec to play it at; loop
+    defaults to on. Returns None when the source is not a file source.
+    """
+    parsed = urlparse(source)
+    if parsed.scheme == 'file':
+        path = unquote(parsed.netloc + parsed.path)
+        params = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+    elif len(parsed.scheme) <= 1:  # plain path, or one starting with a Windows drive letter
+        path, params = source, {}
+    else:
+        return None
+    try:
+        if (VIDEO_SOURCE_DIR / path).is_file():
+            path = str(VIDEO_SOURCE_DIR / path)  # absolute paths stay as they are
+        elif parsed.scheme != 'file' and not os.path.isfile(path):
+            return None  # webcam index or other non-file source
+    except OSError:
+        return None
     
-    return img
+    rate = params.get('rate', 'native')
+    try:
+        rate = None if rate == 'native' else float(rate)
+    except ValueError:
+        raise ValueError(f"Invalid rate '{rate}' in '{source}'. Must be 'native' or frames/sec")
+    if rate is not None and rate <= 0:
+        raise ValueError(f"Invalid rate '{rate}' in '{source}'. Must be above 0")
+    return {
+        'path': path,
+        'loop': params.get('loop', '1').lower() not in ('0', 'false', 'no'),
+        'rate': rate
+    }
+
+class VideoFileSource:
+    """Plays a local video file as a camera, in real time.
+
+    Decoded in the capture step (no thread of its own). read() returns the frame
+    the wall clock has reached; frames a lower capture rate passes over are still
+    grabbed, so decode load matches a live camera delivering at the file's rate.
+    At the end the file rewinds when looping, otherwise the camera keeps its last
+    frame. A capture that falls more than a second behind re-anchors the clock
+    instead of decoding a burst to catch up.
+    """
+
+    def __init__(self, path: str, loop: bool = True, rate: Optional[float] = None):
+        self.path = path
+        self.loop = loop
+        self.rate = rate
+        self.cap = None
+        self.fps = 0.0
+        self.frame_total = 0
+        self.resolution = None
+        self.started_at = 0.0
+        self.position = 0  # index of the next frame to decode
+        self.loops = 0
+        self.decoded = 0
+        self.skipped = 0
+        self.ended = False
+
+    def open(self) -> bool:
+        cap = cv2.VideoCapture(self.path)
+        if not cap.isOpened():
+            cap.release()
+            return False
+        self.cap = cap
+        self.fps = self.rate or cap.get(cv2.CAP_PROP_FPS) or 25.0
+        self.frame_total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        self.resolution = f"{int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))}x{int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))}"
+        self.started_at = time.monotonic()
+        self.position = 0
+        return True
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def _rewind(self, now: float) -> bool:
+        if not self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0):
+            self.release()
+            if not self.open():
+                return False
+        self.started_at = now
+        self.position = 0
+        self.loops += 1
+        return True
+
+    def read(self, out: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """The frame due now (decoded into `out` when possible); None if it was already returned or the file ended"""
+        if self.cap is None or self.ended:
+            return None
+        now = time.monotonic()
+        due = int((now - self.started_at) * self.fps)
+        if due < self.position:
+            return None
+        if due - self.position > self.fps:
+            self.started_at = now - self.position / self.fps
+            due = self.position
+        
+        for _ in range(2):
+            # Decode, without colour conversion, the frames passed over since the last read
+            while self.position < due and self.cap.grab():
+                self.position += 1
+                self.decoded += 1
+                self.skipped += 1
+            if self.position == due:
+                ok, frame = self.cap.read(out)
+                if ok:
+                    self.position += 1
+                    self.decoded += 1
+                    return frame
+            # End of file
+            if not self.loop or not self._rewind(now):
+                self.ended = True
+                logging.info(f"Video file {self.path} ended after {self.decoded} frames")
+                return None
+            due = 0
+        return None
+
+    def stats(self) -> dict:
+        return {
+            'path': self.path,
+            'file_fps': round(self.fps, 2),
+            'resolution': self.resolution,
+            'frames_in_file': self.frame_total,
+            'position': self.position,
+            'loop': self.loop,
+            'loops': self.loops,
+            'frames_decoded': self.decoded,
+            'frames_skipped': self.skipped,
+            'ended': self.ended
+        }
+
+def is_network_source(source: str) -> bool:
+    return urlparse(str(source)).scheme.lower() in NETWORK_SOURCE_SCHEMES
+
+class LatestFrameReader:
+    """Keeps a network stream drained and hands out only its newest frame.
+
+    A dedicated thread calls grab() continuously, so packets never queue up in
+    the decoder and latency doesn't accumulate; retrieve() (the BGR conversion)
+    only runs when request() asks for a frame, so that work follows the consumer's
+    rate. A request can name the time the frame is due: the reader then retrieves
+    the last grab before it rather than the next one. poll() collects the frame
+    and its grab time without waiting, so a stalled stream never blocks the
+    capture worker that steps this camera. A failed open or grab releases the
+    capture and retries with exponential backoff between
+    STREAM_RECONNECT_MIN_SECONDS and STREAM_RECONNECT_MAX_SECONDS.
+    A local file is grabbed at its native rate and loops at its end, so the
+    reader behaves like a live stream in tests.
+    """
+
+    def __init__(self, source: str, name: str = ""):
+        self.source = source
+        self.name = name or source
+        self.cap = None
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.requested = threading.Event()
+        self.request_id = 0
+        self.request_buffer = None
+        self.request_after = 0.0
+        self.pending = False
+        self.result = None
+        self.result_id = 0
+        self.result_at = 0.0
+        self.grab_interval = 0.0
+        
+        self.connected = False
+        self.backoff = STREAM_RECONNECT_MIN_SECONDS
+        self.failures = 0
+        self.reconnects = 0
+        self.grabbed = 0
+        self.retrieved = 0
+        self.last_error = None
+        self.stream_fps = 0.0
+        self.resolution = None
+        self.is_file = False
+
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name=f"reader-{self.name}", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.requested.set()
+        if self.thread is not None:
+            self.thread.join(timeout=STREAM_READ_TIMEOUT_MS / 1000.0 + 1.0)
+        self._release()
+
+    def request(self, out: Optional[np.ndarray] = None, due: Optional[float] = None):
+        """Ask for a frame, retrieved into `out` when possible; collect it with poll().
+
+        Without `due` the next grab is retrieved. With a time.monotonic() `due` it
+        is the first grab within two grab intervals of it, so the frame is fresh
+        when the caller comes back for it.
+        """
+        with self.lock:
+            self.request_id += 1
+            self.request_buffer = out
+            self.request_after = 0.0 if due is None else due - 2 * self.grab_interval
+            self.pending = True
+            self.result = None
+        self.requested.set()
+
+    def poll(self) -> Optional[tuple]:
+        """(frame, grab time) for the last request(), once; None while pending or if retrieve failed"""
+        with self.lock:
+            if not self.pending or self.result_id != self.request_id:
+                return None
+            self.pending = False
+            frame, self.result = self.result, None
+            return (frame, self.result_at) if frame is not None else None
+
+    def _open(self) -> bool:
+        cap = cv2.VideoCapture(self.source, cv2.CAP_FFMPEG, [
+            cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, STREAM_OPEN_TIMEOUT_MS,
+            cv2.CAP_PROP_READ_TIMEOUT_MSEC, STREAM_READ_TIMEOUT_MS
+        ])
+        if not cap.isOpened():
+            cap.release()
+            return False
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.stream_fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        self.resolution = f"{int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))}x{int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))}"
+        self.is_file = os.path.isfile(self.source)
+        with self.lock:
+            self.cap = cap
+        return True
+
+    def _release(self):
+        with self.lock:
+            cap, self.cap = self.cap, None
+        if cap is not None:
+            cap.release()
+        self.connected = False
+
+    def _fail(self, error: str):
+        """Drop the capture and wait out the backoff before the next attempt"""
+        self._release()
+        self.failures += 1
+        self.last_error = error
+        delay = self.backoff
+        self.backoff = min(STREAM_RECONNECT_MAX_SECONDS, self.backoff * 2)
+        logging.warning(f"Stream {self.name}: {error}; reconnecting in {delay:.0f}s")
+        self.stop_event.wait(delay)
+
+    def _run(self):
+        last_grab = next_grab = 0.0
+        while not self.stop_event.is_set():
+            if self.cap is None:
+                if not self._open():
+                    self._fail("cannot open stream")
+                    continue
+                if self.failures:
+                    self.reconnects += 1
+                logging.info(f"Stream {self.name} connected ({self.resolution} @ {self.stream_fps:.0f}fps)")
+                next_grab = time.monotonic()
+            
+            if self.is_file and self.stream_fps > 0:
+                # A file decodes as fast as it can; grab it at the rate it was recorded
+                next_grab = max(next_grab + 1.0 / self.stream_fps, time.monotonic() - 1.0 / self.stream_fps)
+                if self.stop_event.wait(max(0.0, next_grab - time.monotonic())):
+                    break
+            ok = self.cap.grab()
+            if not ok and self.is_file and self.grabbed:
+                # End of the file, not a stalled stream: start it over
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ok = self.cap.grab()
+            if not ok:
+                self._fail("stream ended or stalled")
+                continue
+            grabbed_at = time.time()
+            now = time.monotonic()
+            if self.grabbed:
+                interval = now - last_grab
+                self.grab_interval = interval if self.grab_interval == 0.0 else self.grab_interval * 0.9 + interval * 0.1
+            last_grab = now
+            self.grabbed += 1
+            if not self.connected:
+                self.connected = True
+                self.backoff = STREAM_RECONNECT_MIN_SECONDS
+            
+            if self.requested.is_set() and now >= self.request_after:
+                with self.lock:
+                    self.requested.clear()
+                    request_id = self.request_id
+                    buffer = self.request_buffer
+                ok, frame = self.cap.retrieve(buffer)
+                with self.lock:
+                    self.result = frame if ok else None
+                    self.result_id = request_id
+                    self.result_at = grabbed_at
+                self.retrieved += 1
+
+    def stats(self) -> dict:
+        return {
+            'connected': self.connected,
+            'stream_fps': round(self.stream_fps, 2),
+            'resolution': self.resolution,
+            'frames_grabbed': self.grabbed,
+            'frames_retrieved': self.retrieved,
+            'frames_skipped': self.grabbed - self.retrieved,
+            'reconnects': self.reconnects,
+            'failures': self.failures,
+            'next_backoff_seconds': self.backoff,
+            'last_error': self.last_error
+        }
+
+class CaptureScheduler:
+    """Multiplexes every camera's capture onto a bounded pool of worker threads.
+
+    Each camera is a heap entry keyed by its next deadline (1/fps after the
+    previous one). Idle workers take the earliest due camera, run one
+    capture_step() and put it back, so cameras at the same rate are served
+    round-robin and none runs twice at once. A camera that falls more than a
+    frame behind drops the missed frames instead of bursting to catch up.
+
+    stats() reports pool utilization and how late steps start over the last
+    CAPTURE_STATS_WINDOW seconds; the pool is flagged saturated when either
+    crosses its threshold, and capacity_fps estimates how many frames/sec the
+    pool can sustain at the measured per-step cost.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self.threads = []
+        self.heap = []
+        self.entries = {}
+        self.sequence = 0
+        self.condition = threading.Condition()
+        
+        self.window_start = time.monotonic()
+        self.window_busy = 0.0
+        self.window_steps = 0
+        self.window_late = 0
+        self.utilization = 0.0
+        self.late_fraction = 0.0
+        self.mean_step = 0.0
+        self.saturated = False
+        self.saturated_since = None
+
+    def _push(self, entry: dict, deadline: float):
+        self.sequence += 1
+        heapq.heappush(self.heap, (deadline, self.sequence, entry))
+        self.condition.notify()
+
+    def add(self, processor):
+        """Start stepping a camera, first frame now"""
+        entry = {
+            'processor': processor, 'active': True, 'idle': threading.Event(),
+            'steps': 0, 'late': 0, 'dropped': 0, 'errors': 0, 'lateness': 0.0, 'step_seconds': 0.0
+        }
+        entry['idle'].set()
+        with self.condition:
+            previous = self.entries.get(processor.camera_id)
+            if previous is not None:
+                previous['active'] = False
+            self.entries[processor.camera_id] = entry
+            self._push(entry, time.monotonic())
+            while len(self.threads) < self.workers:
+                thread = threading.Thread(target=self._worker, name=f"capture-{len(self.threads)}", daemon=True)
+                self.threads.append(thread)
+                thread.start()
+
+    def remove(self, processor, timeout: float = 2.0):
+        """Stop stepping a camera and wait for a step in flight to finish"""
+        with self.condition:
+            entry = self.entries.get(processor.camera_id)
+            if entry is None or entry['processor'] is not processor:
+                return
+            del self.entries[processor.camera_id]
+            entry['active'] = False
+        entry['idle'].wait(timeout)
+
+    def _next(self):
+        """Block until the earliest active camera is due, then claim it"""
+        with self.condition:
+            while True:
+                if not self.heap:
+                    self.condition.wait()
+                    continue
+                deadline, _, entry = self.heap[0]
+                if not entry['active']:
+                    heapq.heappop(self.heap)
+                    continue
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    self.condition.wait(delay)
+                    continue
+                heapq.heappop(self.heap)
+                entry['idle'].clear()
+                return deadline, entry
+
+    def _worker(self):
+        while True:
+            deadline, entry = self._next()
+            processor = entry['processor']
+            started = time.monotonic()
+            failed = False
+            try:
+                processor.capture_step()
+            except Exception as e:
+                failed = True
+                logging.error(f"Error in capture loop for {processor.camera_id}: {e}")
+            finished = time.monotonic()
+            
+            with self.condition:
+                period = 1.0 / max(0.1, processor.fps)
+                lateness = started - deadline
+                entry['steps'] += 1
+                entry['step_seconds'] += finished - started
+                entry['lateness'] = lateness if entry['steps'] == 1 else entry['lateness'] * 0.9 + lateness * 0.1
+                self.window_busy += finished - started
+                self.window_steps += 1
+                if lateness > period:
+                    entry['late'] += 1
+                    self.window_late += 1
+                if finished - self.window_start >= CAPTURE_STATS_WINDOW:
+                    self._close_window(finished)
+                
+                entry['idle'].set()
+                if entry['active']:
+                    if failed:
+                        entry['errors'] += 1
+                        next_deadline = finished + 1.0  # Prevent tight loop on error
+                    else:
+                        next_deadline = deadline + period
+                        if next_deadline < finished:
+                            # Skip the frames we missed rather than bursting to catch up
+                            missed = int((finished - next_deadline) / period) + 1
+                            entry['dropped'] += missed
+                            next_deadline += missed * period
+                    self._push(entry, next_deadline)
+
+    def _close_window(self, now: float):
+        elapsed = now - self.window_start
+        self.utilization = self.window_busy / (self.workers * elapsed)
+        self.late_fraction = self.window_late / max(1, self.window_steps)
+        if self.window_steps:
+            self.mean_step = self.window_busy / self.window_steps
+        saturated = self.utilization >= CAPTURE_SATURATION_UTILIZATION or \
+            self.late_fraction >= CAPTURE_SATURATION_LATE_FRACTION
+        if saturated and not self.saturated:
+            self.saturated_since = time.time()
+            logging.warning(f"Capture pool saturated: {self.utilization:.0%} of {self.workers} workers busy, "
+                            f"{self.late_fraction:.0%} of frames late")
+        elif self.saturated and not saturated:
+            self.saturated_since = None
+            logging.info("Capture pool no longer saturated")
+        self.saturated = saturated
+        self.window_start = now
+        self.window_busy = 0.0
+        self.window_steps = 0
+        self.window_late = 0
+
+    def stats(self) -> dict:
+        with self.condition:
+            demand = sum(entry['processor'].fps for entry in self.entries.values())
+            capacity = self.workers / self.mean_step if self.mean_step > 0 else None
+            return {
+                'workers': self.workers,
+                'cameras': len(self.entries),
+                'demand_fps': round(demand, 2),
+                'capacity_fps': round(capacity, 1) if capacity is not None else None,
+                'utilization': round(self.utilization, 3),
+                'late_fraction': round(self.late_fraction, 3),
+                'mean_step_ms': round(self.mean_step * 1000, 3),
+                'saturated': self.saturated,
+                'saturated_since': self.saturated_since
+            }
+
+    def camera_stats(self, camera_id: str) -> Optional[dict]:
+        with self.condition:
+            entry = self.entries.get(camera_id)
+            if entry is None:
+                return None
+            return {
+                'steps': entry['steps'],
+                'late_steps': entry['late'],
+                'dropped_frames': entry['dropped'],
+                'errors': entry['errors'],
+                'lateness_ms': round(entry['lateness'] * 1000, 2),
+                'mean_step_ms': round(entry['step_seconds'] / max(1, entry['steps']) * 1000, 3)
+            }
+
+capture_scheduler = CaptureScheduler(CAPTURE_WORKERS)
+
+class RecordingMemoryPool:
+    """Byte budget for the frames queued by every RecordingSession together.
+
+    A frame that does not fit is dropped instead of queued, and a new recording
+    is refused while the budget has no room for even one of its frames, so many
+    recordings during a disk stall can't grow memory without bound.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.sessions = 0
+        self.dropped_frames = 0
+        self.refused_sessions = 0
+        self.lock = threading.Lock()
+
+    def admit(self, frame_bytes: int) -> bool:
+        """Register a new session; False (and counted) when the budget is full"""
+        with self.lock:
+            if self.total_bytes + frame_bytes > self.max_bytes:
+                self.refused_sessions += 1
+                return False
+            self.sessions += 1
+            return True
+
+    def leave(self):
+        with self.lock:
+            self.sessions -= 1
+
+    def reserve(self, nbytes: int) -> bool:
+        with self.lock:
+            if self.total_bytes + nbytes > self.max_bytes:
+                self.dropped_frames += 1
+                return False
+            self.total_bytes += nbytes
+            return True
+
+    def release(self, nbytes: int):
+        with self.lock:
+            self.total_bytes -= nbytes
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                'sessions': self.sessions,
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'dropped_frames': self.dropped_frames,
+                'refused_sessions': self.refused_sessions
+            }
+
+recording_memory_pool = RecordingMemoryPool(int(RECORDING_MEMORY_MB * 1024 * 1024))
+
+class RecordingSession:
+    """One recording in progress.
+
+    The capture thread only copies frames into a bounded queue (dropping them
+    when the queue or the shared RecordingMemoryPool is full); a dedicated writer thread owns the cv2.VideoWriter,
+    so disk stalls never block capture. Frames are written on a timestamp clock,
+    repeating frames to cover gaps (pre-roll sampled at a lower rate, drops), so
+    the file plays back in real time.
+    """
+
+    def __init__(self, processor, recording: Recording, path: Path, fps: int,
+                 pre_roll: Optional[List[EncodedFrame]] = None):
+        self.processor = processor
+        self.recording = recording
+        self.path = path
+        self.fps = max(1, fps)
+        self.pre_roll = pre_roll or []
+        self.queue = queue.Queue(maxsize=RECORDING_QUEUE_SIZE)
+        self.queue_lock = threading.Lock()  # so no frame is queued after the final drain
+        self.stopping = threading.Event()
+        self.stop_at = None
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.frame_size = None
+        self.started_at = self.pre_roll[0].captured_at if self.pre_roll else time.time()
+        self.last_captured_at = self.started_at
+        self.thread = threading.Thread(target=self._writer_loop, daemon=True,
+                                       name=f"recording-{recording.id[:8]}")
+
+    def start(self):
+        self.thread.start()
+
+    def submit(self, frame: np.ndarray, captured_at: float):
+        """Queue a copy of a frame (called from the capture thread, never blocks)"""
+        with self.queue_lock:
+            if self.stopping.is_set():
+                return
+            if self.queue.full() or not recording_memory_pool.reserve(frame.nbytes):
+                self.frames_dropped += 1
+                return
+            self.queue.put_nowait((captured_at, frame.copy()))
+
+    def stop(self):
+        self.stopping.set()
+
+    def _write(self, writer, frame: np.ndarray, captured_at: float) -> cv2.VideoWriter:
+        if writer is None:
+            height, width = frame.shape[:2]
+            writer = cv2.VideoWriter(str(self.path), cv2.VideoWriter_fourcc(*'mp4v'), self.fps, (width, height))
+            if not writer.isOpened():
+                raise RuntimeError(f"Could not open video writer for {self.path}")
+            self.frame_size = (width, height)
+        if (frame.shape[1], frame.shape[0]) != self.frame_size:
+            frame = cv2.resize(frame, self.frame_size)
+        
+        # Write as many copies as the capture clock says this frame covers
+        target = int(round((captured_at - self.started_at) * self.fps)) + 1
+        for _ in range(max(1, min(target - self.frames_written, self.fps * 2))):
+            writer.write(frame)
+            self.frames_written += 1
+        self.last_captured_at = captured_at
+        return writer
+
+    def _writer_loop(self):
+        writer = None
+        try:
+            for encoded in self.pre_roll:
+                frame = cv2.imdecode(np.frombuffer(encoded.jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if frame is not None:
+                    writer = self._write(writer, frame, encoded.captured_at)
+            self.pre_roll = []
+            
+            while True:
+                try:
+                    captured_at, frame = self.queue.get(timeout=0.2)
+                except queue.Empty:
+                    if self.stopping.is_set():
+                        break
+                    continue
+                try:
+                    writer = self._write(writer, frame, captured_at)
+                finally:
+                    recording_memory_pool.release(frame.nbytes)
+        except Exception as e:
+            logging.error(f"Recording {self.recording.id} failed: {e}")
+        finally:
+            if writer is not None:
+                writer.release()
+            # Stop taking frames and give back the budget of any still queued
+            with self.queue_lock:
+                self.stopping.set()
+                while True:
+                    try:
+                        _, frame = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    recording_memory_pool.release(frame.nbytes)
+            recording_memory_pool.leave()
+            self._finalize()
+
+    def _finalize(self):
+        self.recording.end_time = datetime.now(timezone.utc)
+        self.recording.duration = int(round(max(0.0, self.last_captured_at - self.started_at)))
+        self.recording.file_size = self.path.stat().st_size if self.path.exists() else 0
+        try:
+            asyncio.run_coroutine_threadsafe(self.processor.finalize_recording(self), self.processor.loop)
+        except RuntimeError:
+            # Event loop already closed (shutdown in progress)
+            pass
+
+class BatchMotionScorer:
+    """Cheap first-pass motion scoring for every camera in one vectorised step.
+
+    Capture threads copy their tiny grayscale 'motion' rendition into a row of a
+    shared (cameras, h, w) array. Every BATCH_TICK_SECONDS a scorer thread diffs
+    the whole stack against the previous tick, takes the fraction of changed
+    pixels per camera, and opens a BATCH_HOLD_SECONDS window in which that
+    camera's full MOG2 detection runs.
+    """
+
+    def __init__(self, pixel_threshold: int, score_threshold: float, hold_seconds: float,
+                 tick_seconds: float, shape=(60, 80)):
+        self.pixel_threshold = pixel_threshold
+        self.score_threshold = score_threshold
+        self.hold_seconds = hold_seconds
+        self.tick_seconds = tick_seconds
+        self.shape = shape
+        self.rows = {}
+        self.free_rows = []
+        self.current = np.zeros((0,) + shape, dtype=np.uint8)
+        self.previous = np.zeros((0,) + shape, dtype=np.uint8)
+        self.fresh = np.zeros(0, dtype=bool)
+        self.primed = np.zeros(0, dtype=bool)
+        self.scores = np.zeros(0, dtype=np.float32)
+        self.active_until = np.zeros(0, dtype=np.float64)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.last_tick_ms = 0.0
+
+    def _grow(self, size: int):
+        def grown(array):
+            bigger = np.zeros((size,) + array.shape[1:], dtype=array.dtype)
+            bigger[:len(array)] = array
+            return bigger
+        self.free_rows.extend(range(len(self.current), size))
+        self.current, self.previous = grown(self.current), grown(self.previous)
+        self.fresh, self.primed = grown(self.fresh), grown(self.primed)
+        self.scores, self.active_until = grown(self.scores), grown(self.active_until)
+
+    def update(self, camera_id: str, gray: np.ndarray):
+        with self.lock:
+            row = self.rows.get(camera_id)
+            if row is None:
+                if not self.free_rows:
+                    self._grow(max(8, len(self.current) * 2))
+                row = self.rows[camera_id] = self.free_rows.pop(0)
+                self.primed[row] = False
+                self.active_until[row] = 0.0
+            np.copyto(self.current[row], gray)
+            self.fresh[row] = True
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True, name="batch-motion-scorer")
+                self.thread.start()
+
+    def unregister(self, camera_id: str):
+        with self.lock:
+            row = self.rows.pop(camera_id, None)
+            if row is not None:
+                self.fresh[row] = False
+                self.free_rows.append(row)
+
+    def is_active(self, camera_id: str) -> bool:
+        row = self.rows.get(camera_id)
+        return row is not None and self.active_until[row] > time.time()
+
+    def score(self, camera_id: str) -> float:
+        row = self.rows.get(camera_id)
+        return float(self.scores[row]) if row is not None else 0.0
+
+    def tick(self):
+        started = time.perf_counter()
+        with self.lock:
+            rows = np.flatnonzero(self.fresh)
+            if len(rows) == 0:
+                return
+            current = self.current[rows]
+            primed = self.primed[rows]
+            
+            # One vectorised diff + threshold + per-camera mean over the whole stack
+            flat_current = current.reshape(len(rows), -1)
+            changed = cv2.absdiff(flat_current, self.previous[rows].reshape(len(rows), -1)) > self.pixel_threshold
+            scores = changed.mean(axis=1).astype(np.float32)
+            scores[~primed] = 0.0
+            
+            self.scores[rows] = scores
+            self.previous[rows] = current
+            self.primed[rows] = True
+            self.fresh[rows] = False
+            triggered = rows[scores >= self.score_threshold]
+            self.active_until[triggered] = time.time() + self.hold_seconds
+        self.last_tick_ms = (time.perf_counter() - started) * 1000
+
+    def _run(self):
+        while True:
+            time.sleep(self.tick_seconds)
+            try:
+                self.tick()
+            except Exception as e:
+                logging.error(f"Batch motion scoring failed: {e}")
+
+    def stats(self) -> dict:
+        now = time.time()
+        with self.lock:
+            active = sum(1 for row in self.rows.values() if self.active_until[row] > now)
+        return {
+            'cameras': len(self.rows),
+            'active': active,
+            'last_tick_ms': round(self.last_tick_ms, 3)
+        }
+
+batch_motion_scorer = BatchMotionScorer(
+    BATCH_PIXEL_THRESHOLD, BATCH_SCORE_THRESHOLD, BATCH_HOLD_SECONDS, BATCH_TICK_SECONDS,
+    shape=(RENDITION_SIZES['motion'][1], RENDITION_SIZES['motion'][0])
+)
+
+# Incident coalescing: detections of the same camera/event type/zone update one open incident,
+# which closes after INCIDENT_HOLD_SECONDS without detections or INCIDENT_MAX_SECONDS in total
+INCIDENT_HOLD_SECONDS = float(os.environ.get('INCIDENT_HOLD_SECONDS', '10'))
+INCIDENT_UPDATE_SECONDS = float(os.environ.get('INCIDENT_UPDATE_SECONDS', '30'))
+INCIDENT_MAX_SECONDS = float(os.environ.get('INCIDENT_MAX_SECONDS', '600'))
+SEVERITY_LEVELS = ('low', 'medium', 'high', 'critical')
+
+def severity_rank(severity: str) -> int:
+    """Position in SEVERITY_LEVELS; anything unknown ranks as medium"""
+    return SEVERITY_LEVELS.index(severity) if severity in SEVERITY_LEVELS else 1
+
+# Detector pipeline: DETECTORS run on every camera that doesn't list its own; a detector
+# averaging more than DETECTOR_BUDGET_MS per frame is disabled for DETECTOR_RETRY_SECONDS
+DEFAULT_DETECTORS = [name.strip() for name in os.environ.get('DETECTORS', 'motion,abandoned_object').split(',') if name.strip()]
+DETECTOR_BUDGET_MS = float(os.environ.get('DETECTOR_BUDGET_MS', '25'))
+DETECTOR_RETRY_SECONDS = float(os.environ.get('DETECTOR_RETRY_SECONDS', '60'))
+
+# Abandoned objects: foreground that a fast-adapting background has absorbed but a slow one
+# has not, tracked until it has stayed ABANDONED_DWELL_SECONDS (areas in detection-frame pixels)
+ABANDONED_DWELL_SECONDS = float(os.environ.get('ABANDONED_DWELL_SECONDS', '30'))
+ABANDONED_MIN_AREA = int(os.environ.get('ABANDONED_MIN_AREA', '80'))
+ABANDONED_DIFF_THRESHOLD = int(os.environ.get('ABANDONED_DIFF_THRESHOLD', '30'))
+ABANDONED_FAST_SECONDS = float(os.environ.get('ABANDONED_FAST_SECONDS', '2'))
+ABANDONED_SLOW_SECONDS = float(os.environ.get('ABANDONED_SLOW_SECONDS', '300'))
+
+# Crowd density: foreground occupancy binned into a CROWD_GRID (columns x rows) over the
+# detection crop and smoothed over CROWD_SMOOTHING_SECONDS; CROWD_GATHERING is raised when a
+# zone's mean density stays above CROWD_DENSITY_THRESHOLD for CROWD_HOLD_SECONDS
+CROWD_GRID = tuple(int(v) for v in os.environ.get('CROWD_GRID', '16x12').lower().split('x'))
+CROWD_SMOOTHING_SECONDS = float(os.environ.get('CROWD_SMOOTHING_SECONDS', '5'))
+CROWD_DENSITY_THRESHOLD = float(os.environ.get('CROWD_DENSITY_THRESHOLD', '0.3'))
+CROWD_HOLD_SECONDS = float(os.environ.get('CROWD_HOLD_SECONDS', '10'))
+
+# Whole-frame motion threshold on the detection frame; zone thresholds scale from it by area
+MOTION_AREA_THRESHOLD = 500
+
+class ZoneMask:
+    """One detection zone rasterised onto the detection frame (bounding box relative to the layout crop)"""
+    __slots__ = ('zone_id', 'name', 'event_type', 'severity', 'x0', 'y0', 'x1', 'y1', 'mask', 'threshold')
+
+    def __init__(self, zone_id, name, event_type, severity, bbox, mask, threshold):
+        self.zone_id = zone_id
+        self.name = name
+        self.event_type = event_type
+        self.severity = severity
+        self.x0, self.y0, self.x1, self.y1 = bbox
+        self.mask = mask  # None when the zone fills its bounding box
+        self.threshold = threshold
+
+class ZoneLayout:
+    """A camera's detection zones compiled for the detection frame.
+
+    Motion is computed only on the union bounding box of the enabled zones, and
+    foreground pixels are counted per zone inside its polygon. Without zones the
+    layout is a single whole-frame zone raising MOTION, as before.
+    """
+
+    def __init__(self, zones: Optional[List[DetectionZone]] = None, size=None):
+        width, height = size or RENDITION_SIZES['detection']
+        self.zones = []
+        boxes = []
+        for zone in zones or []:
+            if not zone.enabled:
+                continue
+            points = np.round(np.array(zone.points, dtype=np.float32) * [width - 1, height - 1]).astype(np.int32)
+            x, y, w, h = cv2.boundingRect(points)
+            mask = np.zeros((h, w), dtype=np.uint8)
+            cv2.fillPoly(mask, [points - [x, y]], 255)
+            pixels = cv2.countNonZero(mask)
+            if pixels == 0:
+                continue
+            threshold = zone.min_area if zone.min_area is not None else \
+                max(20, int(MOTION_AREA_THRESHOLD * pixels / (width * height)))
+            boxes.append((x, y, x + w, y + h))
+            self.zones.append(ZoneMask(zone.id, zone.name, zone.event_type, zone.severity,
+                                       (x, y, x + w, y + h), None if pixels == w * h else mask, threshold))
+        
+        if not self.zones:
+            self.crop = (0, 0, width, height)
+            self.zones = [ZoneMask(None, None, EventType.MOTION, "medium", self.crop, None, MOTION_AREA_THRESHOLD)]
+            return
+        
+        # Crop to the union of the zones and make each zone box relative to it
+        self.crop = (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                     max(b[2] for b in boxes), max(b[3] for b in boxes))
+        for zone in self.zones:
+            zone.x0 -= self.crop[0]
+            zone.x1 -= self.crop[0]
+            zone.y0 -= self.crop[1]
+            zone.y1 -= self.crop[1]
+
+    def crop_frame(self, frame: np.ndarray) -> np.ndarray:
+        x0, y0, x1, y1 = self.crop
+        return frame[y0:y1, x0:x1]
+
+    def measure(self, fg_mask: np.ndarray) -> List[int]:
+        """Foreground pixel count per zone for a mask of the cropped frame"""
+        areas = []
+        for zone in self.zones:
+            region = fg_mask[zone.y0:zone.y1, zone.x0:zone.x1]
+            if zone.mask is not None:
+                region = cv2.bitwise_and(region, zone.mask)
+            areas.append(cv2.countNonZero(region))
+        return areas
+
+# Detector classes by name, filled by @register_detector
+DETECTOR_REGISTRY = {}
+
+def register_detector(cls):
+    """Class decorator making a Detector available to cameras by its name"""
+    DETECTOR_REGISTRY[cls.name] = cls
+    return cls
+
+class Detector:
+    """Base class for the analytics a camera's DetectorPipeline runs on analysed frames.
+
+    Subclasses set `name`, the FrameRenditions input they read (`rendition`, None
+    for no image, and `gray`), optionally a desired rate in `fps` (None = every
+    analysed frame) and a per-frame `budget_ms`. process() receives the input
+    cropped to the camera's detection zones and reports through
+    processor.report_detection().
+    """
+    name = None
+    rendition = 'detection'
+    gray = False
+    fps = None
+    budget_ms = None  # None uses DETECTOR_BUDGET_MS
+
+    def __init__(self, processor=None):
+        self.processor = processor
+
+    def process(self, image: Optional[np.ndarray], now: float):
+        raise NotImplementedError
+
+    def reset(self):
+        """Forget learnt state, e.g. after the zone layout changed"""
+
+class StaticBlobTracker:
+    """Fixed-capacity tracker for static foreground blobs, kept in parallel NumPy arrays.
+
+    Blobs are matched to tracks by best IoU; a track unseen for grace_seconds is
+    freed. Each track remembers where and when it was first seen and whether it has
+    alerted; a blob that creeps more than half its size from that spot (a slow walker
+    rather than a left object) restarts its dwell clock.
+    """
+
+    def __init__(self, capacity: int = 32, iou_threshold: float = 0.3, grace_seconds: float = 3.0):
+        self.capacity = capacity
+        self.iou_threshold = iou_threshold
+        self.grace_seconds = grace_seconds
+        self.boxes = np.zeros((capacity, 4), dtype=np.float32)  # x0, y0, x1, y1
+        self.origin = np.zeros((capacity, 2), dtype=np.float32)  # centre when first seen
+        self.first_seen = np.zeros(capacity, dtype=np.float64)
+        self.last_seen = np.zeros(capacity, dtype=np.float64)
+        self.area = np.zeros(capacity, dtype=np.int32)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.alerted = np.zeros(capacity, dtype=bool)
+
+    def _iou(self, box: np.ndarray) -> np.ndarray:
+        x0 = np.maximum(self.boxes[:, 0], box[0])
+        y0 = np.maximum(self.boxes[:, 1], box[1])
+        x1 = np.minimum(self.boxes[:, 2], box[2])
+        y1 = np.minimum(self.boxes[:, 3], box[3])
+        inter = np.clip(x1 - x0, 0, None) * np.clip(y1 - y0, 0, None)
+        areas = (self.boxes[:, 2] - self.boxes[:, 0]) * (self.boxes[:, 3] - self.boxes[:, 1])
+        union = areas + (box[2] - box[0]) * (box[3] - box[1]) - inter
+        iou = inter / np.maximum(union, 1e-6)
+        iou[~self.active] = 0.0
+        return iou
+
+    def update(self, boxes: np.ndarray, areas: np.ndarray, now: float):
+        for box, area in zip(boxes, areas):
+            centre = (box[:2] + box[2:]) / 2
+            iou = self._iou(box)
+            index = int(np.argmax(iou)) if self.active.any() else -1
+            if index < 0 or iou[index] < self.iou_threshold:
+                free = np.flatnonzero(~self.active)
+                if free.size == 0:
+                    continue
+                index = int(free[0])
+                self.active[index] = True
+                self.alerted[index] = False
+                self.first_seen[index] = now
+                self.origin[index] = centre
+            elif np.abs(centre - self.origin[index]).max() > (box[2:] - box[:2]).max() / 2:
+                self.first_seen[index] = now
+                self.origin[index] = centre
+            self.boxes[index] = box
+            self.area[index] = area
+            self.last_seen[index] = now
+        self.active &= (now - self.last_seen) <= self.grace_seconds
+
+    def due(self, now: float, dwell_seconds: float) -> np.ndarray:
+        """Indexes of tracks that have just passed the dwell time; marks them alerted"""
+        ready = self.active & ~self.alerted & ((now - self.first_seen) >= dwell_seconds) & (self.last_seen == now)
+        self.alerted |= ready
+        return np.flatnonzero(ready)
+
+    def reset(self):
+        self.active[:] = False
+
+@register_detector
+class AbandonedObjectDetector(Detector):
+    """Dual-rate background abandoned-object detector for the grayscale detection frame.
+
+    Two running averages with time-based rates (ABANDONED_FAST_SECONDS and
+    ABANDONED_SLOW_SECONDS) are kept in float32. Pixels that differ from the slow
+    background but already match the fast one are static foreground: something
+    arrived and stopped. Blobs of it are tracked, and once one has stayed for the
+    dwell time update() returns it. Independent of the analysis rate, so it can run
+    on decimated frames.
+    """
+
+    name = 'abandoned_object'
+    gray = True
+
+    def __init__(self, processor=None, dwell_seconds: float = None, min_area: int = None,
+                 diff_threshold: int = None, max_fraction: float = 0.25):
+        super().__init__(processor)
+        self.dwell_seconds = ABANDONED_DWELL_SECONDS if dwell_seconds is None else dwell_seconds
+        self.min_area = ABANDONED_MIN_AREA if min_area is None else min_area
+        self.diff_threshold = ABANDONED_DIFF_THRESHOLD if diff_threshold is None else diff_threshold
+        self.max_fraction = max_fraction
+        self.fast = None
+        self.slow = None
+        self.started = 0.0
+        self.last_update = 0.0
+        self.warmup_samples = []
+        self.tracker = StaticBlobTracker()
+        self.kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+
+    def update(self, gray: np.ndarray, now: float) -> List[tuple]:
+        """Feed one grayscale frame; returns (x0, y0, x1, y1, area, dwell) for newly abandoned objects"""
+        if self.fast is None or self.fast.shape != gray.shape:
+            self.fast = gray.astype(np.float32)
+            self.slow = self.fast.copy()
+            self.started = self.last_update = now
+            self.warmup_samples = [gray.copy()]
+            self.tracker.reset()
+            return []
+        
+        dt = max(0.0, now - self.last_update)
+        self.last_update = now
+        cv2.accumulateWeighted(gray, self.fast, 1.0 - math.exp(-dt / ABANDONED_FAST_SECONDS))
+        if self.warmup_samples:
+            # Warm-up: seed the slow model with the per-pixel median of one frame a
+            # second, so people passing by at startup don't leave ghosts behind
+            if now - self.started < ABANDONED_FAST_SECONDS * 5:
+                if now - self.started >= len(self.warmup_samples):
+                    self.warmup_samples.append(gray.copy())
+                return []
+            self.slow[:] = np.median(np.stack(self.warmup_samples), axis=0)
+            self.warmup_samples = []
+        cv2.accumulateWeighted(gray, self.slow, 1.0 - math.exp(-dt / ABANDONED_SLOW_SECONDS))
+        
+        # Static foreground: away from the slow background, settled in the fast one
+        frame = gray.astype(np.float32)
+        static = (cv2.absdiff(frame, self.slow) > self.diff_threshold) & \
+                 (cv2.absdiff(frame, self.fast) <= self.diff_threshold)
+        mask = cv2.morphologyEx(static.view(np.uint8) * np.uint8(255), cv2.MORPH_OPEN, self.kernel)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, self.kernel)
+        
+        if cv2.countNonZero(mask) > self.max_fraction * mask.size:
+            # Global lighting change rather than an object: accept the new scene
+            self.slow[:] = self.fast
+            self.tracker.reset()
+            return []
+        
+        count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        stats = stats[1:count]
+        stats = stats[stats[:, cv2.CC_STAT_AREA] >= self.min_area]
+        boxes = np.column_stack((
+            stats[:, cv2.CC_STAT_LEFT], stats[:, cv2.CC_STAT_TOP],
+            stats[:, cv2.CC_STAT_LEFT] + stats[:, cv2.CC_STAT_WIDTH],
+            stats[:, cv2.CC_STAT_TOP] + stats[:, cv2.CC_STAT_HEIGHT]
+        )).astype(np.float32)
+        self.tracker.update(boxes, stats[:, cv2.CC_STAT_AREA], now)
+        
+        tracker = self.tracker
+        return [
+            (*tracker.boxes[i].astype(int).tolist(), int(tracker.area[i]), now - tracker.first_seen[i])
+            for i in tracker.due(now, self.dwell_seconds)
+        ]
+
+    def process(self, image: np.ndarray, now: float):
+        for x0, y0, x1, y1, area, dwell in self.update(image, now):
+            self.processor.report_detection(
+                EventType.ABANDONED_OBJECT,
+                f"Object left unattended for {int(dwell)}s (area: {area} pixels)",
+                min(0.95, 0.5 + area / 2000),
+                "high",
+                area=area
+            )
+
+    def reset(self):
+        self.fast = self.slow = None
+
+def occupancy_grid(fg_mask: np.ndarray, grid=None) -> np.ndarray:
+    """Fraction of confident foreground pixels (shadows excluded) in each cell of a (cols, rows) grid"""
+    cols, rows = grid or CROWD_GRID
+    foreground = cv2.threshold(fg_mask, 200, 1.0, cv2.THRESH_BINARY)[1].astype(np.float32)
+    return cv2.resize(foreground, (cols, rows), interpolation=cv2.INTER_AREA)
+
+class CrowdDensityEstimator:
+    """Exponentially smoothed occupancy per grid cell, and per-zone crowd alerts.
+
+    Each analysed frame contributes an occupancy_grid(); smoothing is time-based
+    so it is independent of the detection rate. A zone's density is the mean of
+    the cells it covers (weighted by coverage, one matrix product for all zones).
+    update() returns the zones that have stayed above the threshold for the hold
+    time. heatmap() is built once per update and shared by every reader.
+    """
+
+    def __init__(self, camera_id: str, threshold: float = None, hold_seconds: float = None):
+        self.camera_id = camera_id
+        self.threshold = CROWD_DENSITY_THRESHOLD if threshold is None else threshold
+        self.hold_seconds = CROWD_HOLD_SECONDS if hold_seconds is None else hold_seconds
+        self.density = None
+        self.layout = None
+        self.weights = None
+        self.zone_density = None
+        self.above_since = None
+        self.last_update = 0.0
+        self.version = 0
+        self._heatmap = None
+
+    def _bind(self, layout: ZoneLayout, shape):
+        """Rebuild per-zone cell weights for a new zone layout"""
+        rows, cols = shape
+        x0, y0, x1, y1 = layout.crop
+        weights = []
+        for zone in layout.zones:
+            canvas = np.zeros((y1 - y0, x1 - x0), dtype=np.float32)
+            canvas[zone.y0:zone.y1, zone.x0:zone.x1] = 1.0 if zone.mask is None else zone.mask / 255.0
+            weights.append(cv2.resize(canvas, (cols, rows), interpolation=cv2.INTER_AREA).ravel())
+        weights = np.stack(weights)
+        self.weights = weights / np.maximum(weights.sum(axis=1, keepdims=True), 1e-6)
+        self.layout = layout
+        self.density = np.zeros(shape, dtype=np.float32)
+        self.above_since = np.full(len(layout.zones), np.nan)
+
+    def update(self, occupancy: np.ndarray, layout: ZoneLayout, now: float) -> List[tuple]:
+        """Feed one occupancy grid; returns (zone, density) for zones crowded for the hold time"""
+        if layout is not self.layout or self.density is None or self.density.shape != occupancy.shape:
+            self._bind(layout, occupancy.shape)
+            self.last_update = now
+        
+        dt = max(0.0, now - self.last_update)
+        self.last_update = now
+        alpha = 1.0 - math.exp(-dt / CROWD_SMOOTHING_SECONDS) if dt > 0 else 0.0
+        cv2.accumulateWeighted(occupancy, self.density, alpha)
+        self.zone_density = self.weights @ self.density.ravel()
+        self.version += 1
+        
+        crowded = self.zone_density >= self.threshold
+        self.above_since[~crowded] = np.nan
+        self.above_since[crowded & np.isnan(self.above_since)] = now
+        due = np.flatnonzero(crowded & (now - self.above_since >= self.hold_seconds))
+        return [(layout.zones[i], float(self.zone_density[i])) for i in due]
+
+    def heatmap(self) -> Optional[dict]:
+        """Current density map, in a form the dashboard can draw directly"""
+        if self.density is None:
+            return None
+        if self._heatmap is None or self._heatmap['version'] != self.version:
+            width, height = RENDITION_SIZES['detection']
+            x0, y0, x1, y1 = self.layout.crop
+            rows, cols = self.density.shape
+            self._heatmap = {
+                'camera_id': self.camera_id,
+                'version': self.version,
+                'updated_at': datetime.fromtimestamp(self.last_update, timezone.utc).isoformat(),
+                'rows': rows,
+                'cols': cols,
+                # Grid position as fractions of the frame
+                'bounds': [x0 / width, y0 / height, x1 / width, y1 / height],
+                'threshold': self.threshold,
+                'cells': np.round(self.density, 3).tolist(),
+                'zones': [
+                    {'zone_id': zone.zone_id, 'name': zone.name, 'density': round(float(density), 3)}
+                    for zone, density in zip(self.layout.zones, self.zone_density)
+                ]
+            }
+        return self._heatmap
+
+@register_detector
+class MotionDetector(Detector):
+    """MOG2 motion per zone plus the crowd occupancy grid, in a worker process when the detection tier is on"""
+    name = 'motion'
+
+    def __init__(self, processor=None):
+        super().__init__(processor)
+        self.reset()
+
+    def process(self, image: np.ndarray, now: float):
+        if detection_pool is not None and detection_pool.available(self.processor):
+            self.processor.pool_submitted = detection_pool.submit(self.processor, image)
+        elif not self.primed:
+            # Prime the background model; its first mask is all foreground
+            self.subtractor.apply(image)
+            self.primed = True
+        else:
+            fg_mask = self.subtractor.apply(image)
+            self.processor.handle_motion(self.processor.zone_layout.measure(fg_mask), now)
+            self.processor.handle_occupancy(occupancy_grid(fg_mask), now)
+
+    def reset(self):
+        self.subtractor = cv2.createBackgroundSubtractorMOG2(detectShadows=True)
+        self.primed = False
+
+@register_detector
+class DemoEventDetector(Detector):
+    """Simulated DROWSINESS / PANIC events for demonstrations (default webcam only)"""
+    name = 'demo_events'
+    rendition = None
+    fps = 1 / 120.0  # Every ~2 minutes
+
+    def process(self, image, now: float):
+        event_type = random.choice([EventType.DROWSINESS, EventType.PANIC])
+        descriptions = {
+            EventType.DROWSINESS: "Driver drowsiness pattern detected",
+            EventType.PANIC: "Unusual crowd behavior pattern detected"
+        }
+        
+        self.processor.report_detection(
+            event_type,
+            descriptions[event_type],
+            random.uniform(0.7, 0.95),
+            random.choice(["medium", "high"])
+        )
+
+class DetectorPipeline:
+    """Runs a camera's detectors on every analysed frame with per-detector wall-time accounting.
+
+    Each detector runs at most at its own `fps` and is timed; its mean cost is
+    an EMA of recent runs. A detector whose mean exceeds its budget (after a few
+    runs) is disabled for DETECTOR_RETRY_SECONDS and then retried, so one slow
+    analytic can't starve the camera. stats() shows where the time goes.
+    """
+
+    def __init__(self, processor, names: Optional[List[str]] = None):
+        self.processor = processor
+        self.entries = []
+        self.running = None
+        self.running_thread = None
+        self.configure(names)
+
+    def configure(self, names: Optional[List[str]] = None):
+        """(Re)build the detector list; None uses DEFAULT_DETECTORS (plus demo events on webcam 0)"""
+        if names is None:
+            names = list(DEFAULT_DETECTORS)
+            if str(self.processor.source) == "0":
+                names.append('demo_events')
+        entries = []
+        for name in names:
+            cls = DETECTOR_REGISTRY.get(name)
+            if cls is None:
+                logging.warning(f"Unknown detector '{name}' for camera {self.processor.camera_id}")
+                continue
+            entries.append(self._entry(cls(self.processor)))
+        self.entries = entries
+
+    @staticmethod
+    def _entry(detector: Detector) -> dict:
+        return {
+            'detector': detector,
+            'budget_ms': detector.budget_ms or DETECTOR_BUDGET_MS,
+            'last_run': time.time() if detector.fps else 0.0,
+            'runs': 0, 'recent_runs': 0, 'mean_ms': 0.0, 'max_ms': 0.0, 'total_ms': 0.0,
+            'overruns': 0, 'disabled_until': 0.0, 'detections': 0
+        }
+
+    def reset(self):
+        for entry in self.entries:
+            entry['detector'].reset()
+
+    def run(self, renditions: FrameRenditions, now: float) -> float:
+        """Run the due detectors on one frame; returns the total seconds spent"""
+        layout = self.processor.zone_layout
+        total = 0.0
+        for entry in self.entries:
+            detector = entry['detector']
+            if entry['disabled_until']:
+                if now < entry['disabled_until']:
+                    continue
+                entry['disabled_until'] = 0.0
+                entry['recent_runs'] = 0
+                entry['mean_ms'] = 0.0
+            if detector.fps and now - entry['last_run'] < 1.0 / detector.fps:
+                continue
+            entry['last_run'] = now
+            
+            started = time.perf_counter()
+            try:
+                image = None
+                if detector.rendition is not None:
+                    image = renditions.gray(detector.rendition) if detector.gray else renditions.get(detector.rendition)
+                    if detector.rendition == 'detection':
+                        image = layout.crop_frame(image)
+                self.running, self.running_thread = entry, threading.get_ident()
+                detector.process(image, now)
+            except Exception as e:
+                logging.error(f"Detector {detector.name} failed on camera {self.processor.camera_id}: {e}")
+            finally:
+                self.running = None
+            seconds = time.perf_counter() - started
+            total += seconds
+            
+            ms = seconds * 1000
+            entry['runs'] += 1
+            entry['recent_runs'] += 1
+            entry['total_ms'] += ms
+            entry['max_ms'] = max(entry['max_ms'], ms)
+            entry['mean_ms'] = ms if entry['recent_runs'] == 1 else entry['mean_ms'] * 0.9 + ms * 0.1
+            if entry['recent_runs'] >= 5 and entry['mean_ms'] > entry['budget_ms']:
+                entry['overruns'] += 1
+                entry['disabled_until'] = now + DETECTOR_RETRY_SECONDS
+                logging.warning(
+                    f"Detector {detector.name} disabled on camera {self.processor.camera_id} for "
+                    f"{DETECTOR_RETRY_SECONDS:.0f}s: {entry['mean_ms']:.1f} ms per frame exceeds its "
+                    f"{entry['budget_ms']:.1f} ms budget"
+                )
+        return total
+
+    def note_detection(self):
+        """Credit a detection to the detector running on this thread, if any"""
+        entry = self.running
+        if entry is not None and self.running_thread == threading.get_ident():
+            entry['detections'] += 1
+
+    def stats(self) -> dict:
+        now = time.time()
+        total = sum(entry['total_ms'] for entry in self.entries) or 1.0
+        return {
+            entry['detector'].name: {
+                'enabled': now >= entry['disabled_until'],
+                'disabled_for': round(max(0.0, entry['disabled_until'] - now), 1),
+                'rendition': entry['detector'].rendition,
+                'fps': entry['detector'].fps,
+                'budget_ms': entry['budget_ms'],
+                'runs': entry['runs'],
+                'mean_ms': round(entry['mean_ms'], 3),
+                'max_ms': round(entry['max_ms'], 3),
+                'total_ms': round(entry['total_ms'], 1),
+                'share': round(entry['total_ms'] / total, 3),
+                'detections': entry['detections'],
+                'overruns': entry['overruns']
+            } for entry in self.entries
+        }
+
+class AdaptiveDecimator:
+    """Per-camera detection stride: every k-th frame for static scenes, every frame during motion.
+
+    The base stride follows the camera's detection rate (capture fps / detection
+    fps). After DECIMATION_QUIET_SECONDS without motion it is multiplied by a factor
+    that grows by one per analysed frame up to DECIMATION_MAX_STRIDE; motion drops
+    the factor straight back to 1. Independently, when measured detection latency
+    exceeds the frame interval the stride is floored at latency/interval so the
+    camera never queues up work.
+    """
+
+    def __init__(self, processor, max_stride: int = None, quiet_seconds: float = None):
+        self.processor = processor
+        self.max_stride = max(1, max_stride or DECIMATION_MAX_STRIDE)
+        self.quiet_seconds = DECIMATION_QUIET_SECONDS if quiet_seconds is None else quiet_seconds
+        self.activity_stride = 1
+        self.latency = 0.0
+        self.since_analysed = 0
+        self.last_active = 0.0
+        self.last_analysed = 0.0
+        self.effective_fps = 0.0
+        self.frames_analysed = 0
+
+    @property
+    def latency_stride(self) -> int:
+        return max(1, math.ceil(self.latency * max(1, self.processor.fps) - 1e-9))
+
+    @property
+    def rate_stride(self) -> int:
+        return max(1, math.ceil(max(1, self.processor.fps) / self.processor.detection_rate - 1e-9))
+
+    @property
+    def stride(self) -> int:
+        return max(self.rate_stride * self.activity_stride, self.latency_stride)
+
+    def requested_fps(self) -> float:
+        return max(1, self.processor.fps) / self.stride
+
+    def should_analyse(self) -> bool:
+        self.since_analysed += 1
+        return self.since_analysed >= self.stride
+
+    def mark_analysed(self):
+        self.since_analysed = 0
+
+    def record_result(self, now: float):
+        """Count a frame whose detection result came back (frames a busy worker pool skipped are not)"""
+        self.frames_analysed += 1
+        if self.last_analysed:
+            interval = max(1e-3, now - self.last_analysed)
+            self.effective_fps = self.effective_fps * 0.8 + 0.2 / interval if self.effective_fps else 1.0 / interval
+        self.last_analysed = now
+
+    def record_latency(self, seconds: float):
+        self.latency = seconds if self.latency == 0.0 else self.latency * 0.8 + seconds * 0.2
+
+    def observe(self, active: bool, now: float):
+        """Feed the motion verdict of an analysed frame"""
+        if active:
+            self.last_active = now
+            self.activity_stride = 1
+        elif now - self.last_active >= self.quiet_seconds:
+            self.activity_stride = min(self.max_stride, self.activity_stride + 1)
+
+    def stats(self) -> dict:
+        return {
+            'stride': self.stride,
+            'latency_ms': round(self.latency * 1000, 2),
+            'detection_fps': round(self.effective_fps, 2),
+            'frames_analysed': self.frames_analysed
+        }
+
+class DetectionScheduler:
+    """Shares a global detection budget (frames/sec and/or CPU%) between all cameras.
+
+    Once a second the budget is split by weight - camera priority, boosted for
+    cameras with recent activity - with water-filling so no camera is given more
+    than it captures, and every camera keeps at least DETECTION_MIN_FPS when the
+    budget allows. Each camera spends its share through a token bucket; frames
+    without a token are decimated and counted, so falling behind is visible in
+    stats() rather than silent.
+    """
+
+    def __init__(self, budget_fps: float, cpu_percent: float = 0.0, min_fps: float = 0.5):
+        self.budget_fps = budget_fps
+        self.cpu_percent = cpu_percent
+        self.min_fps = min_fps
+        self.cameras = {}
+        self.lock = threading.Lock()
+        self.last_rebalance = 0.0
+        self.mean_cost = 0.0
+
+    def report_cost(self, seconds: float):
+        """Feed the measured cost of one detection (used by the CPU% budget)"""
+        self.mean_cost = seconds if self.mean_cost == 0.0 else self.mean_cost * 0.95 + seconds * 0.05
+
+    def effective_budget(self) -> float:
+        budgets = []
+        if self.budget_fps > 0:
+            budgets.append(self.budget_fps)
+        if self.cpu_percent > 0 and self.mean_cost > 0:
+            budgets.append(self.cpu_percent / 100.0 * (os.cpu_count() or 1) / self.mean_cost)
+        return min(budgets) if budgets else float('inf')
+
+    def _weight(self, processor, now: float) -> float:
+        weight = processor.detection_priority
+        if now - processor.last_motion_time < DETECTION_ACTIVITY_WINDOW:
+            weight *= DETECTION_ACTIVITY_BOOST
+        return weight
+
+    def _rebalance(self, now: float):
+        budget = self.effective_budget()
+        states = list(self.cameras.values())
+        for state in states:
+            state['requested'] = state['processor'].decimator.requested_fps()
+            state['weight'] = self._weight(state['processor'], now)
+        
+        # Minimum share first, then water-fill the rest by weight
+        floor = min(self.min_fps, budget / max(1, len(states)))
+        for state in states:
+            state['allocated'] = min(state['requested'], floor)
+        remaining = budget - sum(state['allocated'] for state in states)
+        hungry = [state for state in states if state['allocated'] < state['requested']]
+        while remaining > 1e-6 and hungry:
+            total_weight = sum(state['weight'] for state in hungry)
+            spent = 0.0
+            for state in hungry:
+                extra = min(remaining * state['weight'] / total_weight, state['requested'] - state['allocated'])
+                state['allocated'] += extra
+                spent += extra
+            remaining -= spent
+            hungry = [state for state in hungry if state['allocated'] < state['requested'] - 1e-6]
+            if spent <= 1e-6:
+                break
+        
+        # Measured rates over the last window
+        elapsed = now - self.last_rebalance if self.last_rebalance else 0.0
+        for state in states:
+            if elapsed > 0:
+                state['effective_fps'] = state['window_runs'] / elapsed
+                state['decimation'] = state['window_skips'] / max(1, state['window_runs'] + state['window_skips'])
+            state['window_runs'] = state['window_skips'] = 0
+        self.last_rebalance = now
+
+    def try_acquire(self, processor, now: float) -> bool:
+        """True if this camera may run detection on the current frame"""
+        with self.lock:
+            state = self.cameras.get(processor.camera_id)
+            if state is None:
+                state = self.cameras[processor.camera_id] = {
+                    'processor': processor, 'tokens': 1.0, 'last': now,
+                    'requested': float(processor.fps), 'allocated': float(processor.fps), 'weight': 1.0,
+                    'effective_fps': 0.0, 'decimation': 0.0,
+                    'runs': 0, 'skips': 0, 'window_runs': 0, 'window_skips': 0
+                }
+                self.last_rebalance = 0.0
+            if now - self.last_rebalance >= 1.0:
+                self._rebalance(now)
+            
+            state['tokens'] = min(1.0, state['tokens'] + (now - state['last']) * state['allocated'])
+            state['last'] = now
+            if state['tokens'] >= 1.0 or state['allocated'] >= state['requested']:
+                state['tokens'] = max(0.0, state['tokens'] - 1.0)
+                state['runs'] += 1
+                state['window_runs'] += 1
+                return True
+            state['skips'] += 1
+            state['window_skips'] += 1
+            return False
+
+    def refund(self, processor):
+        """Give back the token of an acquired frame that was not analysed after all"""
+        with self.lock:
+            state = self.cameras.get(processor.camera_id)
+            if state is None:
+                return
+            state['tokens'] = min(1.0, state['tokens'] + 1.0)
+            state['runs'] -= 1
+            state['window_runs'] = max(0, state['window_runs'] - 1)
+            state['skips'] += 1
+            state['window_skips'] += 1
+
+    def unregister(self, camera_id: str):
+        with self.lock:
+            self.cameras.pop(camera_id, None)
+
+    def stats(self) -> dict:
+        with self.lock:
+            budget = self.effective_budget()
+            return {
+                'budget_fps': None if budget == float('inf') else round(budget, 2),
+                'mean_cost_ms': round(self.mean_cost * 1000, 3),
+                'cameras': {
+                    camera_id: {
+                        'weight': round(state['weight'], 2),
+                        'requested_fps': round(state['requested'], 2),
+                        'allocated_fps': round(state['allocated'], 2),
+                        'effective_fps': round(state['effective_fps'], 2),
+                        'decimation': round(state['decimation'], 3),
+                        'frames_detected': state['runs'],
+                        'frames_decimated': state['skips'],
+                        **state['processor'].decimator.stats()
+                    } for camera_id, state in self.cameras.items()
+                }
+            }
+
+detection_scheduler = DetectionScheduler(DETECTION_BUDGET_FPS, DETECTION_BUDGET_CPU_PERCENT, DETECTION_MIN_FPS)
+
+def _detection_worker_main(task_queue, result_queue):
+    """Detection worker process: MOG2 motion scoring on frames read from shared memory.
+
+    Tasks are ('frame', camera_id, shm_name, slot, shape, sequence), ('zones', camera_id, layout)
+    or ('drop', camera_id); results are (camera_id, slot, sequence, motion_areas, occupancy, seconds)
+    with one foreground count per zone of the camera's ZoneLayout and the occupancy grid.
+    """
+    cv2.setNumThreads(1)
+    subtractors = {}
+    segments = {}
+    layouts = {}
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        
+        if task[0] == 'zones':
+            # New crop: the background model has to be learnt again
+            layouts[task[1]] = task[2]
+            subtractors.pop(task[1], None)
+            continue
+        
+        if task[0] == 'drop':
+            subtractors.pop(task[1], None)
+            layouts.pop(task[1], None)
+            for name in [n for n in segments if n.startswith(f"rv_det_{task[2]}_")]:
+                segments.pop(name).close()
+            continue
+        
+        _, camera_id, shm_name, slot, shape, sequence = task
+        started = time.perf_counter()
+        try:
+            shm = segments.get(shm_name)
+            if shm is None:
+                # Spawned workers share the main process's resource tracker, which
+                # owns the segment and unlinks it when the camera is released
+                shm = shared_memory.SharedMemory(name=shm_name)
+                segments[shm_name] = shm
+            nbytes = int(np.prod(shape))
+            frame = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=slot * nbytes)
+            
+            subtractor = subtractors.get(camera_id)
+            if subtractor is None:
+                # Prime the model on the first frame; motion needs a previous frame
+                subtractor = subtractors[camera_id] = cv2.createBackgroundSubtractorMOG2(detectShadows=True)
+                subtractor.apply(frame)
+                motion_areas = occupancy = None
+            else:
+                fg_mask = subtractor.apply(frame)
+                layout = layouts.get(camera_id)
+                motion_areas = layout.measure(fg_mask) if layout else [cv2.countNonZero(fg_mask)]
+                occupancy = occupancy_grid(fg_mask)
+        except Exception as e:
+            logging.error(f"Detection worker failed on {camera_id}: {e}")
+            motion_areas = occupancy = None
+        result_queue.put((camera_id, slot, sequence, motion_areas, occupancy, time.perf_counter() - started))
+
+class DetectionWorkerPool:
+    """Runs motion detection for every camera in a pool of worker processes.
+
+    Each camera gets a shared-memory segment with DETECTION_SLOTS_PER_CAMERA frame
+    slots. The capture thread copies the small detection rendition into a free slot
+    and sends only the slot reference; if all slots are still being processed the
+    frame is skipped. A camera is always served by the same worker, which keeps its
+    background model. A listener thread hands results back to the owning processor.
+
+    A worker that dies is logged and respawned after a backoff that doubles with
+    each consecutive crash (DETECTION_RESPAWN_SECONDS up to DETECTION_RESPAWN_MAX_SECONDS);
+    until it is back, available() is False and its cameras detect in-process.
+    """
+
+    def __init__(self, workers: int, slots_per_camera: int = 2,
+                 respawn_seconds: float = None, respawn_max_seconds: float = None):
+        self.workers = workers
+        self.slots_per_camera = max(1, slots_per_camera)
+        self.respawn_seconds = DETECTION_RESPAWN_SECONDS if respawn_seconds is None else respawn_seconds
+        self.respawn_max_seconds = DETECTION_RESPAWN_MAX_SECONDS if respawn_max_seconds is None else respawn_max_seconds
+        self.context = multiprocessing.get_context('spawn')
+        self.task_queues = []
+        self.processes = []
+        self.alive = []
+        self.started_at = []
+        self.crashes = []
+        self.respawn_at = []
+        self.result_queue = None
+        self.listener = None
+        self.stopping = False
+        self.cameras = {}
+        self.lock = threading.Lock()
+        self.frames_submitted = 0
+        self.frames_skipped = 0
+        self.stale_results = 0
+        self.respawns = 0
+
+    def _spawn(self, index: int):
+        """Start a worker process; slow under spawn, so never called with the lock held"""
+        task_queue = self.context.Queue()
+        process = self.context.Process(
+            target=_detection_worker_main, args=(task_queue, self.result_queue),
+            daemon=True, name=f"detection-worker-{index}"
+        )
+        process.start()
+        return task_queue, process
+
+    def _install(self, index: int, task_queue, process):
+        """Make a started worker the one serving its cameras (lock held)"""
+        self.task_queues[index] = task_queue
+        self.processes[index] = process
+        self.started_at[index] = time.monotonic()
+        self.alive[index] = True
+
+    def start(self):
+        self.stopping = False
+        self.result_queue = self.context.Queue()
+        self.task_queues = [None] * self.workers
+        self.processes = [None] * self.workers
+        self.alive = [False] * self.workers
+        self.started_at = [0.0] * self.workers
+        self.crashes = [0] * self.workers
+        self.respawn_at = [0.0] * self.workers
+        for i in range(self.workers):
+            self._install(i, *self._spawn(i))
+        self.listener = threading.Thread(target=self._listen, daemon=True, name="detection-results")
+        self.listener.start()
+        logging.info(f"Detection worker pool started with {self.workers} processes")
+
+    def stop(self):
+        with self.lock:
+            self.stopping = True
+        for task_queue in self.task_queues:
+            task_queue.put(None)
+        for process in self.processes:
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+        if self.result_queue is not None:
+            self.result_queue.put(None)
+        if self.listener is not None:
+            self.listener.join(timeout=2.0)
+        for camera_id in list(self.cameras):
+            self.unregister(camera_id)
+        self.task_queues, self.processes = [], []
+
+    def _worker_for(self, processor) -> int:
+        return processor.camera_index % self.workers
+
+    def _worker_died(self, index: int):
+        """Mark a dead worker (lock held): free its cameras' slots and schedule a respawn"""
+        if not self.alive[index]:
+            return
+        self.alive[index] = False
+        now = time.monotonic()
+        # A worker that ran for a while before dying starts the backoff afresh
+        if now - self.started_at[index] > self.respawn_max_seconds:
+            self.crashes[index] = 0
+        delay = min(self.respawn_max_seconds, self.respawn_seconds * 2 ** self.crashes[index])
+        self.crashes[index] += 1
+        self.respawn_at[index] = now + delay
+        for camera in self.cameras.values():
+            if self._worker_for(camera['processor']) == index:
+                # In-flight frames are lost and the new worker needs the zones again
+                camera['busy'] = [False] * self.slots_per_camera
+                camera['layout'] = None
+        logging.error(
+            f"Detection worker {index} died (exit code {self.processes[index].exitcode}); "
+            f"detecting in-process, respawning in {delay:.1f}s"
+        )
+
+    def _check_workers(self):
+        """Detect dead workers and respawn those whose backoff has elapsed (listener thread only)"""
+        with self.lock:
+            if self.stopping:
+                return
+            now = time.monotonic()
+            due = []
+            for index, process in enumerate(self.processes):
+                if self.alive[index] and not process.is_alive():
+                    self._worker_died(index)
+                if not self.alive[index] and now >= self.respawn_at[index]:
+                    due.append(index)
+        
+        # Capture workers keep submitting (or detecting in-process) while the new processes start
+        for index in due:
+            task_queue, process = self._spawn(index)
+            with self.lock:
+                if self.stopping:
+                    process.terminate()
+                    return
+                old_queue = self.task_queues[index]
+                self._install(index, task_queue, process)
+                self.respawns += 1
+            old_queue.cancel_join_thread()
+            old_queue.close()
+            logging.info(f"Detection worker {index} respawned")
+
+    def available(self, processor) -> bool:
+        """Whether the processor's worker is up; callers detect in-process while it is not"""
+        with self.lock:
+            index = self._worker_for(processor)
+            if self.alive[index] and not self.processes[index].is_alive():
+                self._worker_died(index)
+            return self.alive[index]
+
+    def submit(self, processor, frame: np.ndarray) -> bool:
+        """Hand a detection frame to the processor's worker; False if it had to be skipped"""
+        with self.lock:
+            index = self._worker_for(processor)
+            if not self.alive[index]:
+                self.frames_skipped += 1
+                return False
+            camera = self.cameras.get(processor.camera_id)
+            if camera is None or camera['shape'] != frame.shape:
+                if camera is not None:
+                    self._release(processor.camera_id)
+                shm = shared_memory.SharedMemory(
+                    create=True, size=frame.nbytes * self.slots_per_camera,
+                    name=f"rv_det_{processor.camera_index}_{uuid.uuid4().hex[:8]}"
+                )
+                camera = {
+                    'processor': processor,
+                    'shm': shm,
+                    'shape': frame.shape,
+                    'busy': [False] * self.slots_per_camera,
+                    'submitted_at': [0.0] * self.slots_per_camera,
+                    'sequences': [0] * self.slots_per_camera,
+                    'layout': None,
+                    'sequence': 0
+                }
+                self.cameras[processor.camera_id] = camera
+            
+            try:
+                slot = camera['busy'].index(False)
+            except ValueError:
+                self.frames_skipped += 1
+                return False
+            camera['busy'][slot] = True
+            camera['submitted_at'][slot] = time.perf_counter()
+            camera['sequence'] += 1
+            sequence = camera['sequences'][slot] = camera['sequence']
+            layout = processor.zone_layout
+            send_layout = camera['layout'] is not layout
+            camera['layout'] = layout
+            task_queue = self.task_queues[index]
+        
+        if send_layout:
+            task_queue.put(('zones', processor.camera_id, layout))
+        view = np.ndarray(frame.shape, dtype=np.uint8, buffer=camera['shm'].buf, offset=slot * frame.nbytes)
+        np.copyto(view, frame)
+        task_queue.put(('frame', processor.camera_id, camera['shm'].name, slot, frame.shape, sequence))
+        self.frames_submitted += 1
+        return True
+
+    def _release(self, camera_id: str):
+        camera = self.cameras.pop(camera_id, None)
+        if camera is None:
+            return
+        if self.task_queues:
+            self.task_queues[self._worker_for(camera['processor'])].put(
+                ('drop', camera_id, camera['processor'].camera_index)
+            )
+        camera['shm'].close()
+        camera['shm'].unlink()
+
+    def unregister(self, camera_id: str):
+        with self.lock:
+            self._release(camera_id)
+
+    def _listen(self):
+        while True:
+            self._check_workers()
+            try:
+                result = self.result_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if result is None:
+                break
+            camera_id, slot, sequence, motion_areas, occupancy, seconds = result
+            with self.lock:
+                camera = self.cameras.get(camera_id)
+                # A result for a slot that was since freed (worker died) or reused is stale
+                if camera is None or slot >= len(camera['busy']) or not camera['busy'][slot] \
+                        or camera['sequences'][slot] != sequence:
+                    self.stale_results += 1
+                    continue
+                camera['busy'][slot] = False
+                latency = time.perf_counter() - camera['submitted_at'][slot]
+                layout = camera['layout']
+                processor = camera['processor']
+            detection_scheduler.report_cost(seconds)
+            processor.decimator.record_latency(latency)
+            processor.decimator.record_result(time.time())
+            if motion_areas is None:
+                continue
+            try:
+                now = time.time()
+                processor.handle_motion(motion_areas, now)
+                if layout is processor.zone_layout:
+                    processor.handle_occupancy(occupancy, now)
+            except Exception as e:
+                logging.error(f"Error handling detection result for {camera_id}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            'workers': self.workers,
+            'alive': sum(1 for p in self.processes if p.is_alive()),
+            'respawns': self.respawns,
+            'cameras': len(self.cameras),
+            'frames_submitted': self.frames_submitted,
+            'frames_skipped': self.frames_skipped,
+            'stale_results': self.stale_results
+        }
+
+# Created on startup when DETECTION_WORKERS > 0
+detection_pool = None
+
+class Incident:
+    """In-memory state of an open incident; event is set once its document has been inserted"""
+    __slots__ = ('processor', 'event_type', 'zone', 'description', 'confidence', 'severity', 'peak_area',
+                 'count', 'started_at', 'last_seen', 'last_flush', 'dirty', 'event')
+
+    def __init__(self, processor, event_type, zone, description, confidence, severity, area, now):
+        self.processor = processor
+        self.event_type = event_type
+        self.zone = zone
+        self.description = description
+        self.confidence = confidence
+        self.severity = severity
+        self.peak_area = area
+        self.count = 1
+        self.started_at = now
+        self.last_seen = now
+        self.last_flush = now
+        self.dirty = False
+        self.event = None
+
+class IncidentAggregator:
+    """Coalesces raw detections into incidents keyed by (camera, event type, zone).
+
+    The first detection opens an incident: one events insert and an 'event'
+    broadcast, as before. Further detections only update the peak confidence,
+    area and severity in memory, flushed as an 'event_update' at most every
+    INCIDENT_UPDATE_SECONDS. The incident closes (a final 'event_update' with
+    is_open false) after INCIDENT_HOLD_SECONDS without detections or
+    INCIDENT_MAX_SECONDS in total. Runs on the event loop only.
+    """
+
+    def __init__(self, hold_seconds: float, update_seconds: float, max_seconds: float):
+        self.hold_seconds = hold_seconds
+        self.update_seconds = update_seconds
+        self.max_seconds = max_seconds
+        self.incidents = {}
+        self.sweeper = None
+        self.opening = set()  # _open tasks; the loop only keeps weak references
+        self.detections = 0
+        self.opened = 0
+        self.updates = 0
+        self.closed = 0
+
+    def report(self, processor, event_type, description, confidence, severity, zone, area, now):
+        key = (processor.camera_id, event_type, zone.zone_id if zone else None)
+        self.detections += 1
+        if self.sweeper is None:
+            self.sweeper = asyncio.get_running_loop().create_task(self._sweep())
+        
+        incident = self.incidents.get(key)
+        if incident is None:
+            incident = Incident(processor, event_type, zone, description, confidence, severity, area, now)
+            self.incidents[key] = incident
+            self.opened += 1
+            task = asyncio.get_running_loop().create_task(self._open(key, incident))
+            self.opening.add(task)
+            task.add_done_callback(self.opening.discard)
+            return
+        
+        incident.last_seen = now
+        incident.count += 1
+        incident.peak_area = max(incident.peak_area, area)
+        if confidence > incident.confidence:
+            incident.confidence = confidence
+            incident.description = description
+        if severity_rank(severity) > severity_rank(incident.severity):
+            incident.severity = severity
+        incident.dirty = True
+        
+        # Keep the incident's recording running while detections continue
+        if AUTO_RECORD_EVENTS:
+            processor.extend_recording(RECORDING_POST_EVENT_SECONDS)
+
+    async def _open(self, key, incident: Incident):
+        incident.event = await incident.processor.trigger_event(
+            incident.event_type, incident.description, incident.confidence,
+            incident.severity, incident.zone, incident.peak_area
+        )
+        if incident.event is None and self.incidents.get(key) is incident:
+            del self.incidents[key]
+
+    async def _flush(self, incident: Incident, closing: bool):
+        event = incident.event
+        fields = {
+            'description': incident.description,
+            'confidence': incident.confidence,
+            'severity': incident.severity,
+            'peak_area': incident.peak_area,
+            'detection_count': incident.count,
+            'duration': round(incident.last_seen - incident.started_at, 2),
+            'is_open': not closing
+        }
+        if closing:
+            fields['ended_at'] = datetime.fromtimestamp(incident.last_seen, timezone.utc)
+        for name, value in fields.items():
+            setattr(event, name, value)
+        incident.dirty = False
+        incident.last_flush = time.time()
+        await db_update_one('events', {"id": event.id}, {"$set": fields})
+        broadcast_message({'type': 'event_update', 'data': event.model_dump()})
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(1.0)
+            now = time.time()
+            for key, incident in list(self.incidents.items()):
+                if incident.event is None:
+                    continue  # Still being inserted
+                try:
+                    if now - incident.last_seen >= self.hold_seconds or now - incident.started_at >= self.max_seconds:
+                        del self.incidents[key]
+                        self.closed += 1
+                        await self._flush(incident, closing=True)
+                    elif incident.dirty and now - incident.last_flush >= self.update_seconds:
+                        self.updates += 1
+                        await self._flush(incident, closing=False)
+                except Exception as e:
+                    logging.error(f"Error updating incident {incident.event.id}: {e}")
+
+    async def close_all(self):
+        """Close every open incident (shutdown)"""
+        if self.sweeper is not None:
+            self.sweeper.cancel()
+            self.sweeper = None
+        incidents = [incident for incident in self.incidents.values() if incident.event is not None]
+        self.incidents.clear()
+        for incident in incidents:
+            try:
+                await self._flush(incident, closing=True)
+            except Exception as e:
+                logging.error(f"Error closing incident {incident.event.id}: {e}")
+
+    def stats(self) -> dict:
+        return {
+            'open': len(self.incidents),
+            'detections': self.detections,
+            'opened': self.opened,
+            'updates': self.updates,
+            'closed': self.closed
+        }
+
+incident_aggregator = IncidentAggregator(INCIDENT_HOLD_SECONDS, INCIDENT_UPDATE_SECONDS, INCIDENT_MAX_SECONDS)
 
 # Enhanced Video Processing Class
 # Enhanced Video Processing Class with Threading
 class VideoProcessor:
-    def __init__(self, camera_id, source, camera_name="Unknown"):
+    def __init__(self, camera_id, source, camera_name="Unknown", detection_mode=None, zones=None, detectors=None,
+                 fps=10, resolution=None, stream_fps=None, detection_fps=None, priority=1.0):
         self.camera_id = camera_id
         self.source = source
         self.camera_name = camera_name
+        self.camera_index = get_camera_index(camera_id)
         self.cap = None
+        self.reader = None  # LatestFrameReader for network sources
+        self.file_source = None  # VideoFileSource for video files
         self.is_running = False
         self.use_mock = False
-        self.motion_detector = cv2.createBackgroundSubtractorMOG2(detectShadows=True)
-        self.last_frame = None
         self.recording = False
-        self.video_writer = None
+        self.recording_session = None
         self.current_recording = None
         self.frame_count = 0
         self.last_motion_time = 0
-        self.fps = 10  # Reduced FPS for better performance
+        self.fps = 10
+        self.frame_size = None  # (width, height) to capture at; None = as the source delivers
+        self.stream_fps = None
+        self.detection_fps = None
+        self.capture_settings_changed = False
+        self.decode_buffer = None  # scratch frame for sources delivering more than frame_size
+        self.last_stream_at = 0.0
+        self.configure_capture(fps, resolution, stream_fps, detection_fps)
+        self.capture_settings_changed = False
+        self.mock_renderer = MockFrameRenderer()
+        self.detection_mode = detection_mode or DETECTION_MODE
+        self.detection_priority = priority
+        self.decimator = AdaptiveDecimator(self)
+        self.zone_layout = ZoneLayout(zones)
+        self.pending_layout = None  # set_zones() result, applied by the capture step
+        self.pending_detectors = None  # set_detectors() argument, likewise
+        self.pool_submitted = None  # whether this frame's motion job went to the worker pool (None = in-process)
+        self.crowd_estimator = CrowdDensityEstimator(camera_id)
+        self.pipeline = DetectorPipeline(self, detectors)
         
         # Threading support
         self.lock = threading.Lock()
-        self.capture_thread = None
-        self.stop_event = threading.Event()
-        self.current_frame = None
+        self.frame_ring = FrameRing(FRAME_RING_SLOTS)
         self.loop = asyncio.get_running_loop()
         
+        # Encoded frame cache - one JPEG per captured frame and quality tier, shared by all clients
+        self.encoded_frames = {}
+        
+        # Pre-roll of recent full-quality frames for recordings and event snapshots
+        self.pre_event_buffer = None
+        self.last_pre_event_at = 0.0
+        
     def start(self):
         try:
             # Try to initialize real camera first with shorter timeout
             source = int(self.source) if self.source.isdigit() else self.source
             
+            # Synthetic scene sources (mock://?resolution=...&fps=...&pattern=...)
+            width, height = self.frame_size or (640, 480)
+            scene = parse_mock_source(self.source, width, height, self.fps)
+            file_spec = parse_file_source(self.source) if scene is None else None
+            if scene is not None:
+                self.mock_renderer = MockFrameRenderer(
+                    scene['width'], scene['height'], scene['pattern'], scene['objects']
+                )
+                # Settings given in the URL describe the scene; the rest came from the camera
+                self.fps = scene['fps']
+                self.frame_size = (scene['width'], scene['height'])
+                self.use_mock = True
+                self.cap = None
+                logging.info(f"Synthetic source {self.source}: {scene['width']}x{scene['height']} "
+                             f"@ {scene['fps']}fps, pattern '{scene['pattern']}'")
+            
             # Quick check for camera availability
-            if str(source).isdigit():
+            elif str(source).isdigit():
                 self.cap = cv2.VideoCapture(source)
                 # Set a short timeout for faster initialization
                 self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Reduce buffer for faster response
@@ -370,9 +2994,7 @@ class VideoProcessor:
                 if self.cap and self.cap.isOpened():
                     ret, test_frame = self.cap.read()
                     if ret and test_frame is not None:
-                        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-                        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-                        self.cap.set(cv2.CAP_PROP_FPS, self.fps)
+                        self._apply_device_settings()
                         logging.info(f"Real camera {self.source} initialized successfully")
                     else:
                         logging.warning(f"Real camera {self.source} not responsive, using mock feed")
@@ -383,16 +3005,37 @@ class VideoProcessor:
                     logging.warning(f"Real camera {self.source} not available, using mock feed")
                     self.use_mock = True
                     self.cap = None
+            elif file_spec is not None:
+                file_source = VideoFileSource(file_spec['path'], file_spec['loop'], file_spec['rate'])
+                if file_source.open():
+                    self.file_source = file_source
+                    self.use_mock = False
+                    # Capturing faster than the file plays would only repeat frames
+                    self.fps = max(1, min(self.fps, int(round(file_source.fps))))
+                    logging.info(f"Video file {file_spec['path']}: {file_source.resolution} @ {file_source.fps:.2f}fps, "
+                                 f"loop={file_spec['loop']}, captured at {self.fps}fps")
+                else:
+                    logging.warning(f"Video file {file_spec['path']} cannot be opened, using mock feed")
+                    self.use_mock = True
+                self.cap = None
+            elif is_network_source(self.source):
+                # Connects (and reconnects) in its own thread, so start never blocks on the network
+                self.reader = LatestFrameReader(self.source, self.camera_name)
+                self.reader.start()
+                self.use_mock = False
+                self.cap = None
+                logging.info(f"Network source {self.source} for camera {self.camera_id}")
             else:
-                # For RTSP or other sources, assume mock for faster startup
-                logging.info(f"Non-webcam source {self.source}, using mock feed for demo")
+                logging.info(f"Unsupported source {self.source}, using mock feed for demo")
                 self.use_mock = True
                 self.cap = None
             
+            if self.use_mock and scene is None and self.frame_size is not None:
+                self.mock_renderer = MockFrameRenderer(*self.frame_size)
+            self.capture_settings_changed = False
             self.is_running = True
-            self.stop_event.clear()
-            self.capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
-            self.capture_thread.start()
+            self._create_pre_event_buffer()
+            capture_scheduler.add(self)
             
             return True
             
@@ -401,156 +3044,469 @@ class VideoProcessor:
             self.use_mock = True
             self.cap = None
             self.is_running = True
+            self._create_pre_event_buffer()
             
-            # Start thread anyway for mock generation
-            self.stop_event.clear()
-            self.capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
-            self.capture_thread.start()
+            # Schedule anyway for mock generation
+            capture_scheduler.add(self)
             
             return True
     
+    def configure_capture(self, fps=None, resolution=None, stream_fps=None, detection_fps=None):
+        """Set capture fps and resolution and the stream and detection rates (also while running)"""
+        fps = self.fps if fps is None else max(1, int(fps))
+        frame_size = parse_resolution(resolution) if resolution else None
+        # Settings given in a mock:// URL describe the scene and win over the camera's
+        try:
+            scene = parse_mock_source(self.source, *(frame_size or (640, 480)), fps)
+        except ValueError:
+            scene = None
+        if scene is not None:
+            fps, frame_size = scene['fps'], (scene['width'], scene['height'])
+        # A video file is never captured faster than it was recorded
+        if self.file_source is not None:
+            fps = max(1, min(fps, int(round(self.file_source.fps))))
+        if fps != self.fps:
+            self.fps = fps
+            self.capture_settings_changed = True
+        if frame_size != self.frame_size:
+            self.frame_size = frame_size
+            self.capture_settings_changed = True
+        self.stream_fps = stream_fps
+        self.detection_fps = detection_fps
+    
+    @property
+    def stream_rate(self) -> float:
+        return min(float(self.fps), self.stream_fps or float(self.fps))
+    
+    @property
+    def detection_rate(self) -> float:
+        return min(float(self.fps), self.detection_fps or float(self.fps))
+    
+    def _apply_device_settings(self):
+        if self.frame_size is not None:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.frame_size[0])
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.frame_size[1])
+        self.cap.set(cv2.CAP_PROP_FPS, self.fps)
+    
+    def _apply_capture_settings(self):
+        """Apply an fps/resolution change from the capture step, where the device is not in use"""
+        self.capture_settings_changed = False
+        renderer = self.mock_renderer
+        if self.use_mock and self.frame_size is not None and (renderer.width, renderer.height) != self.frame_size:
+            self.mock_renderer = MockFrameRenderer(*self.frame_size, renderer.pattern, len(renderer.positions))
+        elif self.cap is not None:
+            self._apply_device_settings()
+        self.decode_buffer = None
+        # Background models restart on the new picture
+        with self.lock:
+            self.pipeline.reset()
+    
+    def _fit_frame(self, frame: np.ndarray) -> np.ndarray:
+        """Downscale a frame larger than frame_size into the next ring slot"""
+        width, height = self.frame_size
+        if frame.shape[1] * frame.shape[0] <= width * height:
+            if frame is self.decode_buffer:
+                self.decode_buffer = None  # The ring adopts it; decode straight into the ring again
+            return frame
+        # Decode the following frames into scratch so the resize can land in the ring
+        self.decode_buffer = frame
+        return cv2.resize(frame, (width, height), dst=self.frame_ring.next_buffer((height, width, 3)),
+                          interpolation=cv2.INTER_AREA)
+    
+    def _capture_buffer(self) -> Optional[np.ndarray]:
+        return self.decode_buffer if self.decode_buffer is not None else self.frame_ring.next_buffer()
+    
+    def _create_pre_event_buffer(self):
+        if PRE_EVENT_SECONDS > 0 and self.pre_event_buffer is None:
+            self.pre_event_buffer = pre_event_pool.create(PRE_EVENT_SECONDS)
+    
     def stop(self):
         self.is_running = False
-        self.stop_event.set()
-        if self.capture_thread:
-            self.capture_thread.join(timeout=2.0)
+        capture_scheduler.remove(self)
+        
+        if self.pre_event_buffer is not None:
+            pre_event_pool.release(self.pre_event_buffer)
+            self.pre_event_buffer = None
+        
+        if detection_pool is not None:
+            detection_pool.unregister(self.camera_id)
+        batch_motion_scorer.unregister(self.camera_id)
+        detection_scheduler.unregister(self.camera_id)
             
+        session = self.recording_session
+        if session is not None:
+            self.stop_recording()
+            session.thread.join(timeout=5.0)
+        
+        if self.reader is not None:
+            self.reader.stop()
+        
         with self.lock:
             if self.cap:
                 self.cap.release()
-            if self.video_writer:
-                self.video_writer.release()
+            if self.file_source is not None:
+                self.file_source.release()
     
-    def _capture_loop(self):
-        """Background loop to capture frames"""
-        while not self.stop_event.is_set():
+    def capture_step(self):
+        """Capture, analyse, encode and record one frame (run by the capture scheduler)"""
+        started = time.monotonic()
+        if self.capture_settings_changed:
+            self._apply_capture_settings()
+        if self.pending_layout is not None or self.pending_detectors is not None:
+            self._apply_pending_changes()
+        
+        frame = captured_at = None
+        if self.reader is not None:
+            if not self.reader.connected:
+                return  # Connecting or reconnecting; the reader backs off
+            # The frame the reader retrieved for this step; never wait for the stream
+            retrieved = self.reader.poll()
+            if retrieved is None:
+                if not self.reader.pending:
+                    self.reader.request(self._capture_buffer())
+                return
+            frame, captured_at = retrieved
+        elif self.file_source is not None:
+            # The frame the file's clock has reached; None when it was already shown or the file ended
+            frame = self.file_source.read(self._capture_buffer())
+            if frame is None:
+                return
+        elif not self.use_mock and self.cap:
+            # Decode straight into the next ring slot
+            ret, frame = self.cap.read(self._capture_buffer())
+            if not ret:
+                logging.warning(f"Failed to read from camera {self.camera_id}, switching to mock")
+                self.use_mock = True
+                # Release broken cap
+                self.cap.release()
+                self.cap = None
+        
+        if frame is None or self.use_mock:
+            renderer = self.mock_renderer
+            frame = renderer.render(self.frame_ring.next_buffer((renderer.height, renderer.width, 3)))
+        elif self.frame_size is not None:
+            frame = self._fit_frame(frame)
+        
+        # Detection, thumbnail and full size are each derived once per frame
+        slot = self.frame_ring.publish(frame, captured_at)
+        renditions = FrameRenditions(slot.frame)
+        
+        # Process frame for events (off the event loop)
+        self.process_frame_for_events(frame, renditions)
+        
+        # Encode once here so clients never run imencode on the event loop
+        self._publish_frame(renditions, slot.captured_at)
+        
+        session = self.recording_session
+        if session is not None:
+            session.submit(slot.frame, slot.captured_at)
+            if session.stop_at is not None and slot.captured_at >= session.stop_at:
+                self.stop_recording()
+        
+        if self.reader is not None:
+            # Have the grab taken just before the next deadline waiting in the next slot
+            self.reader.request(self._capture_buffer(), started + 1.0 / self.fps)
+    
+    def _publish_frame(self, renditions: FrameRenditions, captured_at: float):
+        """Publish shared JPEG encodings of every watched tier for the latest frame"""
+        encoded_frames = {}
+        
+        with self.lock:
+            self.frame_count += 1
+            version = self.frame_count
+        
+        # Only encode the tiers somebody is subscribed to, at the stream rate, plus
+        # full quality at PRE_EVENT_FPS while a pre-roll is being kept
+        stream_due = captured_at - self.last_stream_at >= 0.95 / self.stream_rate
+        tiers = stream_demand.tiers_for(self.camera_id) if stream_due else []
+        pre_event_buffer = self.pre_event_buffer
+        keep_pre_event = pre_event_buffer is not None and \
+            captured_at - self.last_pre_event_at >= 1.0 / max(PRE_EVENT_FPS, 0.001)
+        if keep_pre_event and 'full' not in tiers:
+            tiers.append('full')
+        
+        for tier in tiers:
+            rendition, quality = QUALITY_TIERS[tier]
             try:
-                frame = None
-                if not self.use_mock and self.cap:
-                    ret, frame = self.cap.read()
-                    if not ret:
-                        logging.warning(f"Failed to read from camera {self.camera_id}, switching to mock")
-                        self.use_mock = True
-                        # Release broken cap
-                        self.cap.release()
-                        self.cap = None
-                
-                if frame is None or self.use_mock:
-                    frame = generate_mock_frame()
-                    # Sleep to match FPS in mock mode
-                    time.sleep(1.0 / self.fps)
-                
-                # Process frame for events (in this thread to offload main thread)
-                self.process_frame_for_events(frame)
-                
-                # Update current frame safely
-                with self.lock:
-                    self.current_frame = frame.copy()
-                
+                jpeg = renditions.jpeg(rendition, quality)
             except Exception as e:
-                logging.error(f"Error in capture loop for {self.camera_id}: {e}")
-                time.sleep(1)  # Prevent tight loop on error
+                logging.error(f"Frame encoding failed: {e}")
+                jpeg = None
+            if jpeg is not None:
+                encoded_frames[tier] = EncodedFrame(
+                    self.camera_id,
+                    self.camera_name,
+                    self.camera_index,
+                    tier,
+                    version,
+                    jpeg,
+                    captured_at,
+                    self.stream_rate,
+                    self.use_mock
+                )
+        
+        if keep_pre_event and 'full' in encoded_frames:
+            pre_event_buffer.add(encoded_frames['full'])
+            self.last_pre_event_at = captured_at
+        
+        if not stream_due:
+            return
+        self.last_stream_at = captured_at
+        with self.lock:
+            self.encoded_frames = encoded_frames
+        
+        # Hand the new frames to connected clients' mailboxes on the event loop
+        if encoded_frames and (client_sessions or mjpeg_streams):
+            try:
+                self.loop.call_soon_threadsafe(dispatch_frames, list(encoded_frames.values()))
+            except RuntimeError:
+                # Event loop already closed (shutdown in progress)
+                pass
     
-    def get_frame(self):
+    def get_encoded_frame(self, since_version=None, tier='full'):
+        """Return the cached EncodedFrame for a tier, or None if it is not newer than since_version"""
         if not self.is_running:
             return None
         
-        # Get the latest frame safely
-        frame = None
-        with self.lock:
-            if self.current_frame is not None:
-                frame = self.current_frame.copy()
-        
-        if frame is None:
+        encoded = self.encoded_frames.get(tier)
+        if encoded is None:
             return None
-            
-        # Encode frame for streaming
-        try:
-            _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 70]) # Lower quality slightly for speed
-            frame_bytes = base64.b64encode(buffer).decode('utf-8')
-            
-            self.frame_count += 1
-            
-            return {
-                'camera_id': self.camera_id,
-                'camera_name': self.camera_name,
-                'frame': frame_bytes,
-                'timestamp': datetime.now(timezone.utc).isoformat(),
-                'frame_count': self.frame_count,
-                'fps': self.fps,
-                'mock': self.use_mock
-            }
-        except Exception as e:
-            logging.error(f"Frame encoding failed: {e}")
+        if since_version is not None and encoded.version <= since_version:
             return None
+        return encoded
     
-    def process_frame_for_events(self, frame):
-        """Enhanced frame processing for multiple event types"""
+    def process_frame_for_events(self, frame, renditions: Optional[FrameRenditions] = None,
+                                 now: Optional[float] = None):
+        """Enhanced frame processing for multiple event types (`now` lets offline runs use a simulated clock)"""
         try:
-            # Only process events for default webcam (source "0")
-            if str(self.source) != "0":
-                return
-
-            current_time = time.time()
+            current_time = time.time() if now is None else now
             
             # Ensure frame is valid
             if frame is None or frame.size == 0:
                 return
             
-            # Motion Detection
-            if self.last_frame is not None:
-                # Downscale for faster processing
-                small_frame = cv2.resize(frame, (320, 240))
-                
-                fg_mask = self.motion_detector.apply(small_frame)
-                motion_area = cv2.countNonZero(fg_mask)
-                
-                # Scale threshold back up relative to size
-                threshold = 500 # Adjusted for smaller frame
-                
-                # Motion event with adaptive threshold
-                if motion_area > threshold:
-                    if current_time - self.last_motion_time > 5:  # Avoid spam events
-                        self.last_motion_time = current_time
-                        
-                        # Use run_coroutine_threadsafe to schedule async event on main loop
-                        asyncio.run_coroutine_threadsafe(
-                            self.trigger_event(
-                                EventType.MOTION, 
-                                f"Significant motion detected (area: {motion_area} pixels)",
-                                min(0.95, motion_area / 10000),  # Dynamic confidence
-                                "medium"
-                            ),
-                            self.loop
-                        )
+            if renditions is None:
+                renditions = FrameRenditions(frame)
             
-            # Simulate other AI events periodically for demonstration
-            if self.frame_count % 1200 == 0:  # Every ~2 minutes at 10fps
-                event_type = random.choice([EventType.CROWD_GATHERING, EventType.DROWSINESS, EventType.PANIC])
-                descriptions = {
-                    EventType.CROWD_GATHERING: "Crowd gathering detected on platform",
-                    EventType.DROWSINESS: "Driver drowsiness pattern detected",
-                    EventType.PANIC: "Unusual crowd behavior pattern detected"
-                }
-                
-                asyncio.run_coroutine_threadsafe(
-                    self.trigger_event(
-                        event_type,
-                        descriptions[event_type],
-                        random.uniform(0.7, 0.95),
-                        random.choice(["medium", "high"])
-                    ),
-                    self.loop
-                ) 
+            # Batch mode: only run MOG2 while the shared cheap score says something moves,
+            # plus an occasional frame to keep the background model current
+            if self.detection_mode == 'batch':
+                batch_motion_scorer.update(self.camera_id, renditions.gray('motion'))
+                if not batch_motion_scorer.is_active(self.camera_id) and \
+                        self.frame_count % BATCH_BACKGROUND_EVERY != 0:
+                    return
+            
+            # Static scenes are analysed every k-th frame, active ones every frame
+            if not self.decimator.should_analyse():
+                return
+            
+            # Global detection budget: cameras over their share are decimated
+            if not detection_scheduler.try_acquire(self, current_time):
+                return
+            self.decimator.mark_analysed()
             
-            # Store frame for processing (keep small for memory/speed)
-            self.last_frame = cv2.resize(frame, (320, 240))
+            # Registered detectors, on the zone crop, each timed against its budget
+            self.pool_submitted = None
+            seconds = self.pipeline.run(renditions, current_time)
+            if self.pool_submitted is None:
+                detection_scheduler.report_cost(seconds)
+                self.decimator.record_latency(seconds)
+                self.decimator.record_result(current_time)
+            elif not self.pool_submitted:
+                # Every worker slot was busy: the frame was not analysed, so it doesn't spend budget
+                detection_scheduler.refund(self)
+            # A submitted frame is accounted for by the pool when its result comes back
             
         except Exception as e:
             logging.error(f"Error processing frame for events: {e}")
     
-    async def trigger_event(self, event_type: EventType, description: str, confidence: float, severity: str = "medium"):
-        """Enhanced event triggering with better data"""
+    def set_zones(self, zones: Optional[List[DetectionZone]]):
+        """Queue new detection zones; the capture step swaps them in between frames"""
+        layout = ZoneLayout(zones)
+        with self.lock:
+            self.pending_layout = layout
+    
+    def set_detectors(self, names: Optional[List[str]]):
+        """Queue a new detector list (None uses DETECTORS); the capture step rebuilds the pipeline between frames"""
+        with self.lock:
+            self.pending_detectors = (names,)  # wrapped, since None is a valid list
+    
+    def _apply_pending_changes(self):
+        """Apply changes queued from the event loop, on the capture worker where detectors run"""
+        with self.lock:
+            layout, self.pending_layout = self.pending_layout, None
+            detectors, self.pending_detectors = self.pending_detectors, None
+        if detectors is not None:
+            self.pipeline.configure(detectors[0])
+        if layout is not None:
+            # The background model restarts on the new crop
+            self.zone_layout = layout
+            self.pipeline.reset()
+    
+    def handle_motion(self, motion_areas: List[int], current_time: float):
+        """Raise zone events for a scored frame (from the capture thread or a detection worker)"""
+        zones = self.zone_layout.zones
+        if len(motion_areas) != len(zones):
+            return  # Scored against a zone layout that has since been replaced
+        
+        active = False
+        for zone, motion_area in zip(zones, motion_areas):
+            # Motion event with per-zone threshold
+            if motion_area <= zone.threshold:
+                continue
+            active = True
+            
+            if zone.zone_id is None:
+                description = f"Significant motion detected (area: {motion_area} pixels)"
+            else:
+                label = zone.event_type.value.replace('_', ' ').capitalize()
+                description = f"{label} detected in zone '{zone.name}' (area: {motion_area} pixels)"
+            
+            self.report_detection(
+                zone.event_type,
+                description,
+                min(0.95, motion_area / (zone.threshold * 20)),  # Dynamic confidence
+                zone.severity,
+                zone,
+                motion_area
+            )
+        
+        if active:
+            self.last_motion_time = current_time
+        self.decimator.observe(active, current_time)
+    
+    def handle_occupancy(self, occupancy: np.ndarray, current_time: float):
+        """Update the crowd density map and raise CROWD_GATHERING for zones that stay crowded"""
+        estimator = self.crowd_estimator
+        for zone, density in estimator.update(occupancy, self.zone_layout, current_time):
+            where = f"in zone '{zone.name}'" if zone.zone_id is not None else "on platform"
+            self.report_detection(
+                EventType.CROWD_GATHERING,
+                f"Crowd gathering detected {where} (density: {density:.0%})",
+                min(0.95, 0.5 + density - estimator.threshold),
+                "high" if density >= 1.5 * estimator.threshold else "medium",
+                zone
+            )
+    
+    def report_detection(self, event_type: EventType, description: str, confidence: float,
+                         severity: str = "medium", zone: Optional[ZoneMask] = None, area: int = 0):
+        """Hand a raw detection to the incident aggregator on the main loop (any thread)"""
+        self.pipeline.note_detection()
+        self.loop.call_soon_threadsafe(
+            incident_aggregator.report, self, event_type, description, confidence, severity, zone, area, time.time()
+        )
+    
+    async def start_recording(self, event_id: Optional[str] = None,
+                              duration: Optional[float] = None) -> Optional[Recording]:
+        """Start recording (with pre-roll), or extend the running recording's stop time.
+
+        Returns None when the recording memory budget has no room for a new recording.
+        """
+        stop_at = time.time() + duration if duration else None
+        session = self.recording_session
+        if session is not None and not session.stopping.is_set():
+            if session.stop_at is not None:
+                session.stop_at = None if stop_at is None else max(session.stop_at, stop_at)
+            return session.recording
+        
+        recording = Recording(
+            camera_id=self.camera_id,
+            camera_name=self.camera_name,
+            start_time=datetime.now(timezone.utc),
+            file_path="",
+            event_triggered=event_id is not None,
+            event_id=event_id
+        )
+        filename = f"{self.camera_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{recording.id[:8]}.mp4"
+        recording.file_path = f"/recordings/{filename}"
+        
+        latest = self.frame_ring.latest
+        if not recording_memory_pool.admit(latest.frame.nbytes if latest is not None else 0):
+            logging.warning(f"Recording refused for camera {self.camera_id}: recording memory budget is full")
+            return None
+        
+        try:
+            pre_roll = self.pre_event_buffer.snapshot() if self.pre_event_buffer else []
+            if pre_roll:
+                recording.start_time = datetime.fromtimestamp(pre_roll[0].captured_at, timezone.utc)
+            
+            session = RecordingSession(self, recording, RECORDINGS_DIR / filename, self.fps, pre_roll)
+            session.stop_at = stop_at
+            await db_insert_one('recordings', recording.model_dump())
+            await db_update_one('cameras', {"id": self.camera_id}, {"$set": {"is_recording": True}})
+        except Exception:
+            # The session never started, so its writer won't give the slot back
+            recording_memory_pool.leave()
+            raise
+        
+        self.recording_session = session
+        self.current_recording = recording
+        self.recording = True
+        session.start()
+        logging.info(f"Recording started for camera {self.camera_id}: {filename}")
+        return recording
+    
+    def extend_recording(self, duration: float) -> bool:
+        """Push back the stop time of a running timed recording; False if none is running"""
+        session = self.recording_session
+        if session is None or session.stopping.is_set():
+            return False
+        if session.stop_at is not None:
+            session.stop_at = max(session.stop_at, time.time() + duration)
+        return True
+    
+    def stop_recording(self) -> Optional[Recording]:
+        """Ask the writer thread to flush and finalize; safe to call from any thread"""
+        session = self.recording_session
+        if session is None:
+            return None
+        self.recording_session = None
+        self.recording = False
+        session.stop()
+        return session.recording
+    
+    async def finalize_recording(self, session: RecordingSession):
+        """Persist a finished recording (scheduled by the writer thread)"""
+        recording = session.recording
+        await db_update_one('recordings', {"id": recording.id}, {"$set": {
+            "end_time": recording.end_time,
+            "duration": recording.duration,
+            "file_size": recording.file_size
+        }})
+        if self.recording_session is None:
+            await db_update_one('cameras', {"id": self.camera_id}, {"$set": {"is_recording": False}})
+            if self.current_recording is recording:
+                self.current_recording = None
+        broadcast_message({'type': 'recording', 'status': 'finished', 'data': recording.model_dump()})
+        logging.info(f"Recording {recording.id} finalized: {recording.duration}s, {recording.file_size} bytes, "
+                     f"{session.frames_dropped} frames dropped")
+    
+    def source_status(self) -> dict:
+        if self.reader is not None:
+            source_type = 'network'
+        elif self.file_source is not None:
+            source_type = 'file'
+        elif parse_mock_source(self.source) is not None or self.use_mock:
+            source_type = 'mock'
+        else:
+            source_type = 'webcam'
+        return {
+            'camera_id': self.camera_id,
+            'source_type': source_type,
+            'is_running': self.is_running,
+            'fps': self.fps,
+            'stream_fps': self.stream_rate,
+            'detection_fps': self.detection_rate,
+            'resolution': f"{self.frame_size[0]}x{self.frame_size[1]}" if self.frame_size else None,
+            'frames': self.frame_count,
+            'capture': capture_scheduler.camera_stats(self.camera_id),
+            'stream': self.reader.stats() if self.reader is not None else None,
+            'file': self.file_source.stats() if self.file_source is not None else None
+        }
+    
+    async def trigger_event(self, event_type: EventType, description: str, confidence: float, severity: str = "medium",
+                            zone: Optional[ZoneMask] = None, area: int = 0) -> Optional[Event]:
+        """Insert and broadcast a newly opened incident; returns the event, or None on failure"""
         try:
             # Get camera info for GPS
             camera = await db_find_one('cameras', {"id": self.camera_id})
@@ -563,9 +3519,26 @@ class VideoProcessor:
                 confidence=confidence,
                 gps_lat=camera.get('gps_lat', 0.0) if camera else 0.0,
                 gps_lng=camera.get('gps_lng', 0.0) if camera else 0.0,
-                severity=severity
+                severity=severity,
+                zone_id=zone.zone_id if zone else None,
+                zone_name=zone.name if zone else None,
+                is_open=True,
+                peak_area=area
             )
             
+            # Snapshot from the pre-roll, reusing the JPEG that was already encoded
+            latest = self.pre_event_buffer.latest() if self.pre_event_buffer else None
+            if latest is not None:
+                snapshot_path = SNAPSHOTS_DIR / f"{event.id}.jpg"
+                await asyncio.get_running_loop().run_in_executor(None, snapshot_path.write_bytes, latest.jpeg)
+                event.image_path = f"/recordings/snapshots/{event.id}.jpg"
+            
+            # Record the incident, including the pre-roll leading up to it
+            if AUTO_RECORD_EVENTS and self.is_running:
+                recording = await self.start_recording(event.id, RECORDING_POST_EVENT_SECONDS)
+                if recording is not None:
+                    event.video_path = recording.file_path
+            
             # Save to database
             await db_insert_one('events', event.model_dump())
             
@@ -575,20 +3548,13 @@ class VideoProcessor:
                 'data': event.model_dump()
             }
             
-            # Send to all connected clients
-            disconnected_clients = []
-            for websocket in websocket_connections:
-                try:
-                    await websocket.send_text(json.dumps(notification, default=str))
-                except:
-                    disconnected_clients.append(websocket)
-            
-            # Clean up disconnected clients
-            for client in disconnected_clients:
-                websocket_connections.remove(client)
+            # Queue for every connected client; each sender task delivers it
+            broadcast_message(notification)
+            return event
                     
         except Exception as e:
             logging.error(f"Error triggering event: {e}")
+            return None
 
 # Authentication functions
 def hash_password(password: str) -> str:
@@ -608,7 +3574,20 @@ def verify_token(token: str) -> Optional[dict]:
         return None
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    token = credentials.credentials
+    return await authenticate_token(credentials.credentials)
+
+async def get_stream_user(
+    token: Optional[str] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False))
+):
+    """Like get_current_user, but also accepts ?token= for players that cannot set headers"""
+    if credentials is not None:
+        token = credentials.credentials
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return await authenticate_token(token)
+
+async def authenticate_token(token: str) -> User:
     payload = verify_token(token)
     if payload is None:
         raise HTTPException(status_code=401, detail="Invalid token")
@@ -664,11 +3643,39 @@ async def logout(current_user: User = Depends(get_current_user)):
 async def get_me(current_user: User = Depends(get_current_user)):
     return current_user
 
+def validate_camera_settings(camera_data: CameraCreate):
+    try:
+        parse_file_source(camera_data.source)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not 1 <= camera_data.fps <= CAMERA_MAX_FPS:
+        raise HTTPException(status_code=400, detail=f"Invalid fps. Must be between 1 and {CAMERA_MAX_FPS}")
+    try:
+        parse_resolution(camera_data.resolution)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid resolution. Must be WIDTHxHEIGHT, e.g. 1280x720")
+    for field in ('stream_fps', 'detection_fps'):
+        value = getattr(camera_data, field)
+        if value is not None and not 0 < value <= camera_data.fps:
+            raise HTTPException(status_code=400, detail=f"Invalid {field}. Must be above 0 and at most fps")
+    if not 0 < camera_data.priority <= 100:
+        raise HTTPException(status_code=400, detail="Invalid priority. Must be above 0 and at most 100")
+    if camera_data.detection_mode not in (None,) + DETECTION_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid detection_mode. Must be one of {list(DETECTION_MODES)}")
+    unknown = [name for name in camera_data.detectors or [] if name not in DETECTOR_REGISTRY]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown detectors {unknown}. Must be among {list(DETECTOR_REGISTRY)}")
+    for zone in camera_data.zones:
+        if len(zone.points) < 3 or any(len(point) != 2 or not all(0.0 <= v <= 1.0 for v in point) for point in zone.points):
+            raise HTTPException(status_code=400, detail=f"Invalid zone '{zone.name}'. Points must be at least 3 [x, y] pairs between 0 and 1")
+
 @api_router.post("/cameras")
 async def create_camera(camera_data: CameraCreate, current_user: User = Depends(get_current_user)):
     if current_user.role not in [UserRole.ADMIN, UserRole.OPERATOR]:
         raise HTTPException(status_code=403, detail="Insufficient permissions. Only admins and operators can add cameras.")
     
+    validate_camera_settings(camera_data)
+    
     camera = Camera(**camera_data.model_dump())
     await db_insert_one('cameras', camera.model_dump())
     return camera.model_dump()
@@ -701,6 +3708,8 @@ async def update_camera(camera_id: str, camera_data: CameraCreate, current_user:
     if current_user.role not in [UserRole.ADMIN, UserRole.OPERATOR]:
         raise HTTPException(status_code=403, detail="Insufficient permissions. Only admins and operators can update cameras.")
     
+    validate_camera_settings(camera_data)
+    
     result = await db_update_one('cameras', {"id": camera_id}, {"$set": camera_data.model_dump()})
     
     if result.matched_count == 0:
@@ -710,6 +3719,15 @@ async def update_camera(camera_id: str, camera_data: CameraCreate, current_user:
     if updated_camera is None:
         raise HTTPException(status_code=404, detail="Camera not found after update")
     
+    # Running cameras pick up zone, detector, rate and priority changes without a restart
+    processor = video_processors.get(camera_id)
+    if processor is not None:
+        processor.detection_priority = camera_data.priority
+        processor.set_zones(camera_data.zones)
+        processor.set_detectors(camera_data.detectors)
+        processor.configure_capture(camera_data.fps, camera_data.resolution,
+                                    camera_data.stream_fps, camera_data.detection_fps)
+    
     return Camera(**updated_camera).model_dump()
 
 @api_router.delete("/cameras/{camera_id}")
@@ -719,9 +3737,7 @@ async def delete_camera(camera_id: str, current_user: User = Depends(get_current
     
     # Stop camera if running
     if camera_id in video_processors:
-        processor = video_processors[camera_id]
-        processor.stop()
-        del video_processors[camera_id]
+        await stop_camera_processor(camera_id)
     
     result = await db_delete_one('cameras', {"id": camera_id})
     if result.deleted_count == 0:
@@ -729,20 +3745,46 @@ async def delete_camera(camera_id: str, current_user: User = Depends(get_current
     
     return {"message": "Camera deleted successfully"}
 
-@api_router.post("/cameras/{camera_id}/start")
-async def start_camera(camera_id: str, current_user: User = Depends(get_current_user)):
+async def run_camera_control(func, timeout: float, on_late=None):
+    """Run a blocking camera call on camera_control_executor, timed from when it gets a thread.
+
+    Raises asyncio.TimeoutError if it takes longer than `timeout`; the call is not
+    cancelled (a device open can't be), it keeps its slot until it returns and then
+    runs `on_late` on the event loop.
+    """
+    await camera_control_slots.acquire()
+    future = asyncio.get_running_loop().run_in_executor(camera_control_executor, func)
+    future.add_done_callback(lambda _: camera_control_slots.release())
+    try:
+        return await asyncio.wait_for(asyncio.shield(future), timeout)
+    except asyncio.TimeoutError:
+        def finished_late(done):
+            if not done.cancelled() and done.exception() is not None:
+                logging.error(f"Camera call finished after its timeout with an error: {done.exception()}")
+            if on_late is not None:
+                on_late()
+        future.add_done_callback(finished_late)
+        raise
+
+async def start_camera_processor(camera: dict) -> dict:
+    """Start one camera off the event loop; returns its status (active, already_active, starting, timeout or failed)"""
+    camera_id = camera["id"]
+    result = {"camera_id": camera_id, "camera_name": camera.get("name", "")}
+    if camera_id in video_processors:
+        return {**result, "status": "already_active", "mock_mode": video_processors[camera_id].use_mock}
+    if camera_id in starting_cameras:
+        return {**result, "status": "starting"}
+    
+    starting_cameras.add(camera_id)
+    began = time.monotonic()
+    processor = None
+    
+    def stop_late_start():
+        # start() returned after we gave up on it: release the camera, then allow a retry
+        stopping = camera_control_executor.submit(processor.stop)
+        stopping.add_done_callback(lambda _: processor.loop.call_soon_threadsafe(starting_cameras.discard, camera_id))
+    
     try:
-        camera = await db_find_one('cameras', {"id": camera_id})
-        if not camera:
-            raise HTTPException(status_code=404, detail="Camera not found")
-        
-        if camera_id in video_processors:
-            return {
-                "message": "Camera already running", 
-                "status": "active",
-                "camera_name": camera["name"]
-            }
-        
         # Update database status immediately
         await db_update_one('cameras', {"id": camera_id}, {
             "$set": {
@@ -751,58 +3793,251 @@ async def start_camera(camera_id: str, current_user: User = Depends(get_current_
             }
         })
         
-        # Start processor in background (non-blocking)
-        processor = VideoProcessor(camera_id, camera["source"], camera["name"])
-        
-        if processor.start():
-            video_processors[camera_id] = processor
-            
-            return {
-                "message": "Camera started successfully",
-                "status": "active",
-                "mock_mode": processor.use_mock,
-                "camera_name": camera["name"]
-            }
+        settings = Camera(**camera)
+        processor = VideoProcessor(camera_id, camera["source"], camera["name"], settings.detection_mode,
+                                   settings.zones, settings.detectors, settings.fps, settings.resolution,
+                                   settings.stream_fps, settings.detection_fps, settings.priority)
+        try:
+            started = await run_camera_control(processor.start, CAMERA_START_TIMEOUT_SECONDS, stop_late_start)
+        except asyncio.TimeoutError:
+            logging.warning(f"Camera {camera_id} did not start within {CAMERA_START_TIMEOUT_SECONDS:.0f}s")
+            result.update(status="timeout", error=f"Camera did not start within {CAMERA_START_TIMEOUT_SECONDS:.0f}s")
         else:
-            # Revert database if processor failed
-            await db_update_one('cameras', {"id": camera_id}, {
-                "$set": {"is_active": False}
-            })
-            raise HTTPException(status_code=500, detail="Failed to initialize camera")
-            
-    except HTTPException:
-        raise
+            starting_cameras.discard(camera_id)
+            if started:
+                video_processors[camera_id] = processor
+                result.update(status="active", mock_mode=processor.use_mock)
+            else:
+                result.update(status="failed", error="Failed to initialize camera")
     except Exception as e:
+        starting_cameras.discard(camera_id)
         logging.error(f"Error starting camera {camera_id}: {e}")
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+        result.update(status="failed", error=str(e))
+    
+    if result["status"] != "active":
+        # Revert database if processor failed
+        await db_update_one('cameras', {"id": camera_id}, {"$set": {"is_active": False}})
+    result["seconds"] = round(time.monotonic() - began, 3)
+    return result
+
+async def stop_camera_processor(camera_id: str) -> dict:
+    """Stop one camera off the event loop; returns its status (inactive, already_inactive, stopping or failed)"""
+    result = {"camera_id": camera_id}
+    began = time.monotonic()
+    
+    # Update database status immediately
+    await db_update_one('cameras', {"id": camera_id}, {"$set": {"is_active": False}})
+    
+    # Removed first so it is never served or stopped twice, even if stop() fails
+    processor = video_processors.pop(camera_id, None)
+    if processor is None:
+        return {**result, "status": "already_inactive"}
+    
+    result["camera_name"] = processor.camera_name
+    try:
+        await run_camera_control(processor.stop, CAMERA_STOP_TIMEOUT_SECONDS)
+        result["status"] = "inactive"
+    except asyncio.TimeoutError:
+        # Capture is already unscheduled; the rest of the release finishes on its own thread
+        logging.warning(f"Camera {camera_id} still releasing after {CAMERA_STOP_TIMEOUT_SECONDS:.0f}s")
+        result["status"] = "stopping"
+    except Exception as e:
+        logging.error(f"Error stopping camera {camera_id}: {e}")
+        result.update(status="failed", error=str(e))
+    result["seconds"] = round(time.monotonic() - began, 3)
+    return result
+
+def summarize_camera_results(results: List[dict]) -> dict:
+    summary = defaultdict(int)
+    for result in results:
+        summary[result["status"]] += 1
+    return {"results": results, "summary": dict(summary)}
+
+@api_router.post("/cameras/start")
+async def start_cameras(request: Optional[CameraBulkRequest] = None, current_user: User = Depends(get_current_user)):
+    """Start several cameras (all of them without camera_ids) concurrently, with per-camera status"""
+    cameras = await db_find('cameras')
+    camera_ids = request.camera_ids if request is not None else None
+    if camera_ids is None:
+        selected, missing = cameras, []
+    else:
+        by_id = {camera["id"]: camera for camera in cameras}
+        selected = [by_id[camera_id] for camera_id in dict.fromkeys(camera_ids) if camera_id in by_id]
+        missing = [camera_id for camera_id in dict.fromkeys(camera_ids) if camera_id not in by_id]
+    
+    results = await asyncio.gather(*(start_camera_processor(camera) for camera in selected))
+    return summarize_camera_results(list(results) + [
+        {"camera_id": camera_id, "status": "not_found", "error": "Camera not found"} for camera_id in missing
+    ])
+
+@api_router.post("/cameras/stop")
+async def stop_cameras(request: Optional[CameraBulkRequest] = None, current_user: User = Depends(get_current_user)):
+    """Stop several cameras (every running one without camera_ids) concurrently, with per-camera status"""
+    camera_ids = request.camera_ids if request is not None else None
+    if camera_ids is None:
+        camera_ids = list(video_processors)
+    results = await asyncio.gather(*(stop_camera_processor(camera_id) for camera_id in dict.fromkeys(camera_ids)))
+    return summarize_camera_results(list(results))
+
+@api_router.post("/cameras/{camera_id}/start")
+async def start_camera(camera_id: str, current_user: User = Depends(get_current_user)):
+    camera = await db_find_one('cameras', {"id": camera_id})
+    if not camera:
+        raise HTTPException(status_code=404, detail="Camera not found")
+    
+    # The device open and test read run off the event loop
+    result = await start_camera_processor(camera)
+    status = result["status"]
+    if status == "already_active":
+        return {
+            "message": "Camera already running",
+            "status": "active",
+            "camera_name": camera["name"]
+        }
+    if status == "starting":
+        return {"message": "Camera is starting", "status": "starting", "camera_name": camera["name"]}
+    if status == "timeout":
+        raise HTTPException(status_code=504, detail=result["error"])
+    if status == "failed":
+        raise HTTPException(status_code=500, detail=result["error"])
+    return {
+        "message": "Camera started successfully",
+        "status": "active",
+        "mock_mode": result["mock_mode"],
+        "camera_name": camera["name"]
+    }
 
 @api_router.post("/cameras/{camera_id}/stop")
 async def stop_camera(camera_id: str, current_user: User = Depends(get_current_user)):
-    if camera_id not in video_processors:
-        # Update database even if processor not found
-        await db_update_one('cameras', {"id": camera_id}, {"$set": {"is_active": False}})
+    result = await stop_camera_processor(camera_id)
+    status = result["status"]
+    if status == "already_inactive":
         return {"message": "Camera already stopped", "status": "inactive"}
+    if status == "failed":
+        raise HTTPException(status_code=500, detail="Failed to stop camera")
+    if status == "stopping":
+        return {"message": "Camera stopped; still releasing the device", "status": "inactive"}
+    return {"message": "Camera stopped successfully", "status": "inactive"}
+
+@api_router.get("/cameras/{camera_id}/stream.mjpg")
+async def stream_camera_mjpeg(
+    camera_id: str,
+    fps: Optional[float] = Query(None, gt=0, le=60),
+    quality: str = "full",
+    current_user: User = Depends(get_stream_user)
+):
+    """Serve a running camera as multipart/x-mixed-replace for video walls, VLC and NVRs"""
+    if quality not in QUALITY_TIERS:
+        raise HTTPException(status_code=400, detail=f"Invalid quality. Must be one of {list(QUALITY_TIERS)}")
+    processor = video_processors.get(camera_id)
+    if processor is None:
+        raise HTTPException(status_code=404, detail="Camera is not running")
+    
+    # Viewers share the processor's encoded frames, so another viewer costs no extra encode
+    stream = MjpegStream(camera_id, quality)
+    stream.latest = processor.get_encoded_frame(tier=quality)
+    if stream.latest is not None:
+        stream.wakeup.set()
+    stream_demand.add(camera_id, quality)
+    mjpeg_streams.append(stream)
+    
+    async def frame_parts():
+        min_interval = 1.0 / fps if fps else 0.0
+        last_version = 0
+        last_sent = 0.0
+        try:
+            while camera_id in video_processors:
+                try:
+                    await asyncio.wait_for(stream.wakeup.wait(), timeout=5.0)
+                except asyncio.TimeoutError:
+                    continue
+                stream.wakeup.clear()
+                
+                # Honour the fps cap, then send whatever frame is newest by then
+                delay = min_interval - (time.monotonic() - last_sent)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                encoded = stream.latest
+                if encoded is None or encoded.version <= last_version:
+                    continue
+                
+                last_version = encoded.version
+                last_sent = time.monotonic()
+                yield encoded.mjpeg_part
+        finally:
+            if stream in mjpeg_streams:
+                mjpeg_streams.remove(stream)
+                stream_demand.remove(camera_id, quality)
+    
+    return StreamingResponse(
+        frame_parts(),
+        media_type=f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}",
+        headers={"Cache-Control": "no-cache, no-store", "Pragma": "no-cache"}
+    )
+
+@api_router.get("/cameras/{camera_id}/status")
+async def get_camera_status(camera_id: str, current_user: User = Depends(get_current_user)):
+    """Capture status of a running camera, including network stream health"""
+    processor = video_processors.get(camera_id)
+    if processor is None:
+        raise HTTPException(status_code=404, detail="Camera is not running")
+    return processor.source_status()
+
+@api_router.get("/cameras/{camera_id}/detectors")
+async def get_camera_detectors(camera_id: str, current_user: User = Depends(get_current_user)):
+    """Per-detector timing, budget and enabled state of a running camera"""
+    processor = video_processors.get(camera_id)
+    if processor is None:
+        raise HTTPException(status_code=404, detail="Camera is not running")
+    return {"camera_id": camera_id, "available": list(DETECTOR_REGISTRY), "detectors": processor.pipeline.stats()}
+
+@api_router.get("/cameras/{camera_id}/density")
+async def get_camera_density(camera_id: str, current_user: User = Depends(get_current_user)):
+    """Smoothed crowd density grid of a running camera, for dashboard heatmaps"""
+    processor = video_processors.get(camera_id)
+    if processor is None:
+        raise HTTPException(status_code=404, detail="Camera is not running")
+    heatmap = processor.crowd_estimator.heatmap()
+    if heatmap is None:
+        raise HTTPException(status_code=404, detail="No density data yet")
+    return heatmap
+
+@api_router.post("/cameras/{camera_id}/recording/start")
+async def start_camera_recording(
+    camera_id: str,
+    duration: Optional[float] = Query(None, gt=0, le=3600),
+    current_user: User = Depends(get_current_user)
+):
+    processor = video_processors.get(camera_id)
+    if processor is None:
+        raise HTTPException(status_code=404, detail="Camera is not running")
     
     try:
-        # Update database status immediately
-        await db_update_one('cameras', {"id": camera_id}, {"$set": {"is_active": False}})
-        
-        # Stop processor
-        processor = video_processors[camera_id]
-        processor.stop()
-        del video_processors[camera_id]
-        
-        return {"message": "Camera stopped successfully", "status": "inactive"}
+        recording = await processor.start_recording(duration=duration)
     except Exception as e:
-        logging.error(f"Error stopping camera {camera_id}: {e}")
-        # Ensure processor is removed even on error
-        if camera_id in video_processors:
-            try:
-                video_processors[camera_id].stop()
-                del video_processors[camera_id]
-            except:
-                pass
-        raise HTTPException(status_code=500, detail="Failed to stop camera")
+        logging.error(f"Error starting recording for camera {camera_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to start recording: {str(e)}")
+    if recording is None:
+        raise HTTPException(status_code=503, detail="Recording memory budget is full; try again shortly")
+    return {"message": "Recording started", "recording": recording.model_dump()}
+
+@api_router.post("/cameras/{camera_id}/recording/stop")
+async def stop_camera_recording(camera_id: str, current_user: User = Depends(get_current_user)):
+    processor = video_processors.get(camera_id)
+    recording = processor.stop_recording() if processor else None
+    if recording is None:
+        return {"message": "Camera is not recording"}
+    return {"message": "Recording stopping", "recording": recording.model_dump()}
+
+@api_router.get("/capture/scheduler")
+async def get_capture_scheduler(current_user: User = Depends(get_current_user)):
+    """Capture pool size, utilization, lateness and saturation, for sizing nodes"""
+    return capture_scheduler.stats()
+
+@api_router.get("/detection/scheduler")
+async def get_detection_scheduler(current_user: User = Depends(get_current_user)):
+    """Per-camera detection budget allocation, measured rates and decimation"""
+    return detection_scheduler.stats()
 
 @api_router.get("/events")
 async def get_events(
@@ -912,80 +4147,345 @@ async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
         "connected_clients": len(websocket_connections)
     }
 
+class ClientSession:
+    """Per-connection delivery state for /api/ws.
+
+    Frames land in a one-slot-per-camera mailbox, so a newer frame replaces
+    one the client has not received yet. A dedicated sender task drains the
+    mailbox as fast as the socket accepts, which gives every client its own
+    effective FPS and keeps slow links from building up latency.
+    """
+
+    def __init__(self, websocket: WebSocket, binary_mode: bool = False):
+        self.websocket = websocket
+        self.binary_mode = binary_mode
+        # camera_id -> quality tier; None until the client first subscribes,
+        # in which case it receives every camera at full quality
+        self.subscriptions = None
+        self.mailbox = {}
+        self.messages = deque(maxlen=WS_MAX_QUEUED_MESSAGES)
+        self.messages_dropped = 0
+        self.wakeup = asyncio.Event()
+        # Last frame version sent to this client, per camera
+        self.sent_versions = {}
+        # Camera indexes already announced to a binary client
+        self.announced_indexes = set()
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.effective_fps = 0.0
+        self._window_start = time.monotonic()
+        self._window_frames = 0
+
+    def wants(self, camera_id: str, tier: str) -> bool:
+        if self.subscriptions is None:
+            return tier == 'full'
+        return self.subscriptions.get(camera_id) == tier
+
+    def register_demand(self):
+        if self.subscriptions is None:
+            stream_demand.add(None, 'full')
+
+    def release_demand(self):
+        if self.subscriptions is None:
+            stream_demand.remove(None, 'full')
+        else:
+            for camera_id, tier in self.subscriptions.items():
+                stream_demand.remove(camera_id, tier)
+
+    def subscribe(self, camera_id: str, tier: str):
+        if self.subscriptions is None:
+            # First explicit subscription ends the implicit "everything" mode
+            stream_demand.remove(None, 'full')
+            self.subscriptions = {}
+            self.mailbox.clear()
+        previous = self.subscriptions.get(camera_id)
+        if previous == tier:
+            return
+        if previous is not None:
+            stream_demand.remove(camera_id, previous)
+        self.subscriptions[camera_id] = tier
+        stream_demand.add(camera_id, tier)
+        self.mailbox.pop(camera_id, None)
+        self.sent_versions.pop(camera_id, None)
+        
+        # Send the cached frame straight away if the tier is already being encoded
+        processor = video_processors.get(camera_id)
+        if processor:
+            encoded = processor.get_encoded_frame(tier=tier)
+            if encoded:
+                self.offer_frame(encoded)
+
+    def unsubscribe(self, camera_id: str):
+        if self.subscriptions is None:
+            stream_demand.remove(None, 'full')
+            self.subscriptions = {}
+            self.mailbox.clear()
+            return
+        tier = self.subscriptions.pop(camera_id, None)
+        if tier is not None:
+            stream_demand.remove(camera_id, tier)
+        self.mailbox.pop(camera_id, None)
+        self.sent_versions.pop(camera_id, None)
+
+    def handle_message(self, text: str):
+        """Apply a client control message (subscribe/unsubscribe)"""
+        try:
+            message = json.loads(text)
+        except (TypeError, ValueError):
+            self.send_message({'type': 'error', 'message': 'Invalid JSON message'})
+            return
+        if not isinstance(message, dict):
+            self.send_message({'type': 'error', 'message': 'Message must be a JSON object'})
+            return
+        
+        message_type = message.get('type')
+        camera_ids = message.get('camera_ids', [])
+        if message_type in ('subscribe', 'unsubscribe') and \
+                (not isinstance(camera_ids, list) or not all(isinstance(c, str) for c in camera_ids)):
+            self.send_message({'type': 'error', 'message': 'camera_ids must be a list of camera id strings'})
+            return
+        
+        if message_type == 'subscribe':
+            # Either {"cameras": [{"camera_id": ..., "quality": ...}]}
+            # or {"camera_ids": [...], "quality": ...}
+            default_tier = message.get('quality', 'full')
+            requested = message.get('cameras') or [
+                {'camera_id': camera_id, 'quality': default_tier}
+                for camera_id in camera_ids
+            ]
+            if not isinstance(requested, list):
+                self.send_message({'type': 'error', 'message': 'cameras must be a list of subscriptions'})
+                return
+            for item in requested:
+                camera_id = item.get('camera_id') if isinstance(item, dict) else None
+                tier = item.get('quality', default_tier) if isinstance(item, dict) else None
+                if not isinstance(camera_id, str) or not camera_id or not isinstance(tier, str) or tier not in QUALITY_TIERS:
+                    self.send_message({
+                        'type': 'error',
+                        'message': f"Invalid subscription {item!r}; quality must be one of {list(QUALITY_TIERS)}"
+                    })
+                    continue
+                self.subscribe(camera_id, tier)
+        elif message_type == 'unsubscribe':
+            for camera_id in camera_ids:
+                self.unsubscribe(camera_id)
+        elif message_type == 'ping':
+            self.send_message({'type': 'pong', 'timestamp': datetime.now(timezone.utc).isoformat()})
+            return
+        else:
+            self.send_message({'type': 'error', 'message': f"Unknown message type: {message_type!r}"})
+            return
+        
+        self.send_message({'type': 'subscriptions', 'cameras': self.subscriptions})
+
+    def offer_frame(self, encoded: EncodedFrame):
+        if not self.wants(encoded.camera_id, encoded.tier):
+            return
+        if encoded.version <= self.sent_versions.get(encoded.camera_id, 0):
+            return
+        if encoded.camera_id in self.mailbox:
+            # Client has not caught up since the previous frame - replace it
+            self.frames_dropped += 1
+        self.mailbox[encoded.camera_id] = encoded
+        self.wakeup.set()
+
+    def send_message(self, message: dict):
+        if len(self.messages) == self.messages.maxlen:
+            # Client is not reading; the oldest queued message gives way
+            self.messages_dropped += 1
+        self.messages.append(json.dumps(message, default=str))
+        self.wakeup.set()
+
+    def _update_fps(self, sent: int):
+        self._window_frames += sent
+        elapsed = time.monotonic() - self._window_start
+        if elapsed >= 1.0:
+            self.effective_fps = round(self._window_frames / elapsed, 2)
+            self._window_start = time.monotonic()
+            self._window_frames = 0
+
+    async def _send_frames(self, frames: List[EncodedFrame]):
+        if self.binary_mode:
+            # Tell the client which camera each header index refers to before first use
+            new_cameras = [f for f in frames if f.camera_index not in self.announced_indexes]
+            if new_cameras:
+                await self.websocket.send_text(json.dumps({
+                    'type': 'camera_index',
+                    'cameras': [{
+                        'camera_index': f.camera_index,
+                        'camera_id': f.camera_id,
+                        'camera_name': f.camera_name
+                    } for f in new_cameras]
+                }))
+                self.announced_indexes.update(f.camera_index for f in new_cameras)
+            
+            for encoded in frames:
+                await self.websocket.send_bytes(encoded.packet)
+        else:
+            await self.websocket.send_text(json.dumps({
+                'type': 'video_frames',
+                'data': [f.to_message() for f in frames],
+                'timestamp': datetime.now(timezone.utc).isoformat()
+            }, default=str))
+
+    async def _send_heartbeat(self):
+        await self.websocket.send_text(json.dumps({
+            'type': 'heartbeat',
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'active_cameras': len(video_processors),
+            'status': 'healthy',
+            'effective_fps': self.effective_fps,
+            'frames_sent': self.frames_sent,
+            'frames_dropped': self.frames_dropped,
+            'messages_dropped': self.messages_dropped
+        }))
+
+    async def run_sender(self):
+        last_heartbeat = time.monotonic()
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=WS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            
+            # Control and event messages go first
+            while self.messages:
+                await self.websocket.send_text(self.messages.popleft())
+            
+            mailbox, self.mailbox = self.mailbox, {}
+            now = time.time()
+            frames = []
+            for camera_id, encoded in mailbox.items():
+                if camera_id not in video_processors or now - encoded.captured_at > WS_FRAME_STALE_SECONDS:
+                    self.frames_dropped += 1
+                    continue
+                frames.append(encoded)
+            
+            if frames:
+                await self._send_frames(frames)
+                for encoded in frames:
+                    self.sent_versions[encoded.camera_id] = encoded.version
+                self.frames_sent += len(frames)
+            self._update_fps(len(frames))
+            
+            # Forget cameras that have been stopped
+            for camera_id in list(self.sent_versions):
+                if camera_id not in video_processors:
+                    del self.sent_versions[camera_id]
+            
+            if time.monotonic() - last_heartbeat >= WS_HEARTBEAT_SECONDS:
+                await self._send_heartbeat()
+                last_heartbeat = time.monotonic()
+
+class MjpegStream:
+    """Latest-frame slot for one MJPEG HTTP viewer of a camera"""
+
+    def __init__(self, camera_id: str, tier: str):
+        self.camera_id = camera_id
+        self.tier = tier
+        self.latest = None
+        self.wakeup = asyncio.Event()
+
+    def offer_frame(self, encoded: EncodedFrame):
+        if encoded.camera_id == self.camera_id and encoded.tier == self.tier:
+            self.latest = encoded
+            self.wakeup.set()
+
+def dispatch_frames(frames: List[EncodedFrame]):
+    """Offer freshly encoded frames to every client mailbox (runs on the event loop)"""
+    for consumer in client_sessions + mjpeg_streams:
+        for encoded in frames:
+            consumer.offer_frame(encoded)
+
+def broadcast_message(message: dict):
+    """Queue a JSON control/event message for every connected client"""
+    for session in client_sessions:
+        session.send_message(message)
+
+def is_normal_close(error: Exception) -> bool:
+    error_str = str(error)
+    return "1000" in error_str or "1001" in error_str or \
+        "Component unmounting" in error_str or "going away" in error_str
+
 # Enhanced WebSocket with better error handling
 @api_router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     websocket_connections.append(websocket)
     
+    # Frame transport negotiated at connect time: JSON (default) or binary
+    binary_mode = websocket.query_params.get('protocol', 'json').lower() == 'binary'
+    session = ClientSession(websocket, binary_mode)
+    sender_task = None
+    receiver_task = None
+    
     try:
         # Send initial connection confirmation
-        await websocket.send_text(json.dumps({
+        connection_message = {
             'type': 'connection',
             'status': 'connected',
             'timestamp': datetime.now(timezone.utc).isoformat(),
-            'server': 'Railway Video Surveillance System'
-        }))
+            'server': 'Railway Video Surveillance System',
+            'protocol': 'binary' if binary_mode else 'json',
+            'quality_tiers': list(QUALITY_TIERS)
+        }
+        if binary_mode:
+            connection_message['frame_header'] = {
+                'version': FRAME_PROTOCOL_VERSION,
+                'format': FRAME_HEADER.format,
+                'size': FRAME_HEADER.size,
+                'fields': ['version', 'camera_index', 'frame_number', 'timestamp', 'mock']
+            }
+        await websocket.send_text(json.dumps(connection_message))
+        
+        # Until the client subscribes it gets every running camera at full quality
+        client_sessions.append(session)
+        session.register_demand()
+        for processor in list(video_processors.values()):
+            encoded = processor.get_encoded_frame()
+            if encoded:
+                session.offer_frame(encoded)
+        
+        sender_task = asyncio.create_task(session.run_sender())
+        receiver_task = asyncio.create_task(websocket.receive())
         
         while True:
-            try:
-                # Send video frames from all active cameras
-                frames = []
-                # Iterate over a copy of items to avoid runtime error if dictionary changes
-                current_processors = list(video_processors.items())
-                for camera_id, processor in current_processors:
-                    try:
-                        frame_data = processor.get_frame()
-                        if frame_data:
-                            frames.append(frame_data)
-                    except Exception as e:
-                        logging.error(f"Error getting frame from {camera_id}: {e}")
-                
-                if frames:
-                    await websocket.send_text(json.dumps({
-                        'type': 'video_frames',
-                        'data': frames,
-                        'timestamp': datetime.now(timezone.utc).isoformat()
-                    }, default=str))
-
-                
-                # Send heartbeat every 30 seconds when no frames
-                if len(frames) == 0:
-                    await websocket.send_text(json.dumps({
-                        'type': 'heartbeat',
-                        'timestamp': datetime.now(timezone.utc).isoformat(),
-                        'active_cameras': len(video_processors),
-                        'status': 'healthy'
-                    }))
-                
-                await asyncio.sleep(0.5)  # Reduced to 2 FPS for better stability
-                
-            except WebSocketDisconnect:
+            done, _ = await asyncio.wait(
+                {sender_task, receiver_task},
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if sender_task in done:
+                # Sender only finishes when the socket failed
+                sender_task.result()
                 break
-            except Exception as e:
-                # Only log actual errors, not normal disconnections
-                error_str = str(e)
-                if ("1000" in error_str and "Component unmounting" in error_str) or \
-                   ("1001" in error_str and "going away" in error_str):
-                    # Normal disconnection - don't log at all
-                    break
-                elif "1000" in error_str or "1001" in error_str:
-                    # Normal close codes - don't log as errors
-                    break
-                else:
-                    # Actual error - log as error
-                    logging.error(f"WebSocket frame error: {e}")
-                    await asyncio.sleep(1)  # Prevent tight error loop
+            received = receiver_task.result()
+            if received['type'] == 'websocket.disconnect':
+                raise WebSocketDisconnect(received.get('code', 1000))
+            if received.get('text') is not None:
+                try:
+                    session.handle_message(received['text'])
+                except Exception as e:
+                    logging.error(f"Error handling WebSocket message: {e}")
+                    session.send_message({'type': 'error', 'message': 'Could not process message'})
+            else:
+                session.send_message({'type': 'error', 'message': 'Binary messages are not accepted; send JSON text'})
+            receiver_task = asyncio.create_task(websocket.receive())
                 
     except WebSocketDisconnect:
         # Normal disconnection - no logging needed
         pass
     except Exception as e:
         # Only log unexpected errors
-        error_str = str(e)
-        if "1000" not in error_str and "1001" not in error_str and "Component unmounting" not in error_str and "going away" not in error_str:
+        if not is_normal_close(e):
             logging.error(f"WebSocket unexpected error: {e}")
     finally:
+        for task in (sender_task, receiver_task):
+            if task and not task.done():
+                task.cancel()
+        if session in client_sessions:
+            client_sessions.remove(session)
+            session.release_demand()
         if websocket in websocket_connections:
             websocket_connections.remove(websocket)
             # Only log when connection count changes significantly
@@ -999,6 +4499,13 @@ async def health_check():
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "active_cameras": len(video_processors),
         "connected_clients": len(websocket_connections),
+        "pre_event_buffer": pre_event_pool.stats(),
+        "recording_memory": recording_memory_pool.stats(),
+        "detection_workers": detection_pool.stats() if detection_pool else None,
+        "batch_motion": batch_motion_scorer.stats(),
+        "incidents": incident_aggregator.stats(),
+        "detection_scheduler": detection_scheduler.stats(),
+        "capture": capture_scheduler.stats(),
         "system": "Railway Video Surveillance System v1.0"
     }
 
@@ -1027,9 +4534,15 @@ logger = logging.getLogger(__name__)
 
 @app.on_event("startup")
 async def startup_event():
+    global detection_pool
+    
     # Initialize database connection first
     await init_database()
     
+    if DETECTION_WORKERS > 0:
+        detection_pool = DetectionWorkerPool(DETECTION_WORKERS, DETECTION_SLOTS_PER_CAMERA)
+        detection_pool.start()
+    
     logger.info("Railway Video Surveillance System starting up...")
     
     # Create default admin user if none exists
@@ -1140,9 +4653,20 @@ async def startup_event():
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    # Stop all cameras
-    for processor in video_processors.values():
-        processor.stop()
+    global detection_pool
+    
+    # Stop all cameras, concurrently and off the event loop
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*(loop.run_in_executor(camera_control_executor, processor.stop)
+                           for processor in video_processors.values()), return_exceptions=True)
+    video_processors.clear()
+    
+    await incident_aggregator.close_all()
+    
+    if detection_pool is not None:
+        detection_pool.stop()
+        detection_pool = None
+    camera_control_executor.shutdown(wait=False)
     
     # Close all websocket connections
     for websocket in websocket_connections.copy():
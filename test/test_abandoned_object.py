@@ -0,0 +1,49 @@
+import numpy as np
+
+from backend import server
+
+
+def run(detector, frames, step=0.5):
+    """Feed (duration, frame) pairs at a fixed rate; returns (time, detections) for every alert"""
+    alerts, now = [], 0.0
+    for duration, image in frames:
+        end = now + duration
+        while now < end:
+            found = detector.update(image, now)
+            if found:
+                alerts.append((now, found))
+            now += step
+    return alerts
+
+
+def scene(value=100, box=None):
+    image = np.full((120, 160), value, dtype=np.uint8)
+    if box:
+        x0, y0, x1, y1 = box
+        image[y0:y1, x0:x1] = 220
+    return image
+
+
+def test_object_left_in_place_fires_once_after_the_dwell_time():
+    detector = server.AbandonedObjectDetector(dwell_seconds=5, min_area=50)
+    alerts = run(detector, [(15, scene()), (30, scene(box=(60, 40, 80, 60)))])
+    
+    # Nothing before the fast model settles plus the dwell, then exactly one alert
+    assert len(alerts) == 1
+    at, [(x0, y0, x1, y1, area, dwell)] = alerts[0]
+    assert 20 <= at <= 25
+    assert (x0, y0, x1, y1) == (60, 40, 80, 60)
+    assert area == 400 and dwell >= 5
+
+
+def test_passing_objects_and_lighting_changes_do_not_fire():
+    detector = server.AbandonedObjectDetector(dwell_seconds=5, min_area=50)
+    walker = [(0.5, scene(box=(x, 40, x + 20, 60))) for x in range(0, 140, 10)]
+    assert run(detector, [(15, scene())] + walker + [(30, scene(value=180))]) == []
+
+
+def test_warmup_ignores_people_present_at_startup():
+    detector = server.AbandonedObjectDetector(dwell_seconds=5, min_area=50)
+    # Someone stands in view for the first seconds, then leaves the empty scene behind
+    alerts = run(detector, [(3, scene(box=(60, 40, 80, 60))), (40, scene())])
+    assert alerts == []
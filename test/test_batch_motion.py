@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from backend import server
+
+
+def test_batch_scoring_flags_only_cameras_that_changed():
+    # Ticks are driven by hand; the background thread effectively never runs
+    scorer = server.BatchMotionScorer(25, 0.01, 3.0, 3600.0, shape=(60, 80))
+    still = np.full((60, 80), 100, dtype=np.uint8)
+    cameras = [f"cam-{index}" for index in range(10)]
+    for camera_id in cameras:
+        scorer.update(camera_id, still)
+    scorer.tick()
+    # The first tick only primes each camera's previous frame
+    assert not any(scorer.is_active(camera_id) for camera_id in cameras)
+    
+    moved = still.copy()
+    moved[10:30, 10:30] = 200
+    for camera_id in cameras:
+        scorer.update(camera_id, moved if camera_id == 'cam-3' else still)
+    scorer.tick()
+    assert [camera_id for camera_id in cameras if scorer.is_active(camera_id)] == ['cam-3']
+    assert scorer.score('cam-3') == pytest.approx(20 * 20 / (60 * 80))
+    assert scorer.score('cam-4') == 0.0
+    
+    # A stopped camera's row goes back to the free list; a new camera starts unprimed
+    row = scorer.rows['cam-3']
+    scorer.unregister('cam-3')
+    assert row in scorer.free_rows
+    scorer.update('late', moved)
+    scorer.tick()
+    assert not scorer.is_active('late') and scorer.score('late') == 0.0
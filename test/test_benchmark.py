@@ -0,0 +1,52 @@
+import json
+import pathlib
+import subprocess
+import sys
+
+import cv2
+import numpy as np
+
+BACKEND = pathlib.Path(__file__).resolve().parent.parent / 'backend'
+
+
+def benchmark(*args):
+    """Run backend/benchmark.py the way it is documented, from the backend directory"""
+    result = subprocess.run([sys.executable, 'benchmark.py', *args], cwd=BACKEND,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def test_pipeline_report_has_throughput_latency_and_detections_per_detector(tmp_path):
+    clip = tmp_path / 'clip.avi'
+    writer = cv2.VideoWriter(str(clip), cv2.VideoWriter_fourcc(*'MJPG'), 10, (320, 240))
+    for index in range(8):
+        writer.write(np.full((240, 320, 3), index * 20, dtype=np.uint8))
+    writer.release()
+    
+    # The clip is shorter than the run, so it has to be rewound
+    output = benchmark('pipeline', '--source', 'mock://?pattern=intrusion', '--source', str(clip),
+                       '--resolution', '320x240', '--frames', '12', '--warmup', '2',
+                       '--json', str(tmp_path / 'results.json'))
+    assert 'frames/s' in output and 'p99' in output
+    
+    report = json.loads((tmp_path / 'results.json').read_text())
+    assert report['options']['frames'] == 12
+    assert report['machine']['opencv'] == cv2.__version__
+    assert [r['resolution'] for r in report['results']] == ['320x240', '320x240']
+    for result in report['results']:
+        assert result['frames'] == 12
+        assert result['fps'] > 0
+        assert 0 < result['p50_ms'] <= result['p99_ms']
+        assert set(result['detectors']) >= {'motion', 'abandoned_object'}
+        for stats in result['detectors'].values():
+            assert stats['runs'] == 14
+            assert {'mean_ms', 'max_ms', 'share', 'detections', 'enabled'} <= set(stats)
+    assert report['results'][0]['detections'].get('motion', 0) > 0
+
+
+def test_abandoned_benchmark_reports_cost_and_alert_latency():
+    output = benchmark('abandoned', '--frames', '150', '--fps', '5', '--drop-at', '15', '--dwell', '5',
+                       '--width', '320', '--height', '240', '--pattern', 'static')
+    assert 'per frame: mean' in output
+    assert 'alert at' in output and 'no alert raised' not in output
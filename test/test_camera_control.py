@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+from backend import server
+
+ADMIN = server.User(username='admin', email='admin@example.com', role=server.UserRole.ADMIN)
+
+
+def test_bulk_start_times_out_slow_cameras_and_rolls_them_back(monkeypatch):
+    monkeypatch.setattr(server, 'CAMERA_START_TIMEOUT_SECONDS', 0.3)
+    start, stop = server.VideoProcessor.start, server.VideoProcessor.stop
+    stopped = []
+    
+    def slow_start(processor):
+        # A device that takes longer to open than the timeout allows
+        if processor.camera_name == 'slow':
+            time.sleep(1.0)
+        return start(processor)
+    
+    def recording_stop(processor):
+        stopped.append(processor.camera_name)
+        return stop(processor)
+    
+    monkeypatch.setattr(server.VideoProcessor, 'start', slow_start)
+    monkeypatch.setattr(server.VideoProcessor, 'stop', recording_stop)
+    
+    async def scenario():
+        cameras = [server.Camera(name=name, location='platform 1', source='mock://?fps=5') for name in ('fast', 'slow')]
+        for camera in cameras:
+            await server.db_insert_one('cameras', camera.model_dump())
+        fast, slow = (camera.id for camera in cameras)
+        try:
+            began = time.monotonic()
+            started = await server.start_cameras(server.CameraBulkRequest(camera_ids=[fast, slow, 'missing']),
+                                                 current_user=ADMIN)
+            elapsed = time.monotonic() - began
+            retry = await server.start_camera_processor(cameras[1].model_dump())
+            slow_active = (await server.db_find_one('cameras', {"id": slow}))['is_active']
+            fast_active = (await server.db_find_one('cameras', {"id": fast}))['is_active']
+            
+            # Once the late start() returns the camera is released and may be retried
+            await asyncio.sleep(1.0)
+            released = slow not in server.starting_cameras and slow not in server.video_processors
+            stopped_all = await server.stop_cameras(None, current_user=ADMIN)
+            return started, elapsed, retry, slow_active, fast_active, released, stopped_all, fast, slow
+        finally:
+            for camera in cameras:
+                await server.stop_camera_processor(camera.id)
+                await server.db_delete_one('cameras', {"id": camera.id})
+    
+    started, elapsed, retry, slow_active, fast_active, released, stopped_all, fast, slow = asyncio.run(scenario())
+    
+    statuses = {result['camera_id']: result['status'] for result in started['results']}
+    assert statuses == {fast: 'active', slow: 'timeout', 'missing': 'not_found'}
+    assert started['summary'] == {'active': 1, 'timeout': 1, 'not_found': 1}
+    # The request returns at the timeout, not when the slow device finally opens
+    assert elapsed < 0.9
+    assert retry['status'] == 'starting'
+    assert fast_active and not slow_active
+    assert released and 'slow' in stopped
+    
+    assert [(r['camera_id'], r['status']) for r in stopped_all['results']] == [(fast, 'inactive')]
+    assert stopped_all['summary'] == {'inactive': 1}
+
+
+def test_bulk_stop_reports_cameras_that_are_not_running():
+    async def scenario():
+        return await server.stop_cameras(server.CameraBulkRequest(camera_ids=['gone', 'gone']), current_user=ADMIN)
+    
+    stopped = asyncio.run(scenario())
+    assert stopped['results'] == [{'camera_id': 'gone', 'status': 'already_inactive'}]
+    assert stopped['summary'] == {'already_inactive': 1}
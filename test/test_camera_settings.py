@@ -0,0 +1,74 @@
+import asyncio
+
+import cv2
+import numpy as np
+
+from backend import server
+
+ADMIN = server.User(username='admin', email='admin@example.com', role=server.UserRole.ADMIN)
+
+
+async def update_running_camera(source, settings):
+    camera = server.Camera(name='cam', location='platform 1', source=source, **settings)
+    await server.db_insert_one('cameras', camera.model_dump())
+    result = await server.start_camera_processor(camera.model_dump())
+    assert result['status'] == 'active'
+    processor = server.video_processors[camera.id]
+    try:
+        await server.update_camera(camera.id, server.CameraCreate(name='cam', location='platform 1', source=source),
+                                   current_user=ADMIN)
+        await asyncio.sleep(0.5)
+        shape = processor.frame_ring.latest.frame.shape
+        return processor.fps, processor.frame_size, shape
+    finally:
+        await server.stop_camera_processor(camera.id)
+        await server.db_delete_one('cameras', {"id": camera.id})
+
+
+def test_mock_url_settings_survive_an_update():
+    # The update carries the document defaults (30 fps, 640x480); the URL's scene wins
+    fps, frame_size, shape = asyncio.run(update_running_camera('mock://?fps=5&resolution=320x240', {}))
+    assert fps == 5
+    assert frame_size == (320, 240)
+    assert shape == (240, 320, 3)
+
+
+def test_file_fps_caps_the_capture_rate_after_an_update(tmp_path):
+    path = tmp_path / 'clip.avi'
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), 10, (320, 240))
+    for index in range(20):
+        writer.write(np.full((240, 320, 3), index * 10, dtype=np.uint8))
+    writer.release()
+    
+    fps, _, _ = asyncio.run(update_running_camera(str(path), {'fps': 30}))
+    assert fps == 10
+
+
+def test_zone_changes_wait_for_the_capture_step():
+    async def change_zones():
+        processor = server.VideoProcessor('zones', 'mock://?fps=5', 'zones')
+        before = processor.zone_layout
+        zone = server.DetectionZone(name='track', points=[[0, 0], [0.5, 0], [0.5, 0.5]])
+        processor.set_zones([zone])
+        # Detectors may be mid-frame on a capture worker: nothing is swapped from the loop
+        unchanged = processor.zone_layout is before
+        processor.capture_step()
+        return unchanged, processor.zone_layout, processor.pending_layout
+    
+    unchanged, layout, pending = asyncio.run(change_zones())
+    assert unchanged
+    assert [zone.name for zone in layout.zones] == ['track']
+    assert pending is None
+
+
+def test_detector_changes_wait_for_the_capture_step():
+    async def change_detectors():
+        processor = server.VideoProcessor('detectors', 'mock://?fps=5', 'detectors', detectors=['motion', 'abandoned_object'])
+        processor.set_detectors(['motion'])
+        before = [entry['detector'].name for entry in processor.pipeline.entries]
+        processor.capture_step()
+        return before, [entry['detector'].name for entry in processor.pipeline.entries]
+    
+    before, after = asyncio.run(change_detectors())
+    assert before == ['motion', 'abandoned_object']
+    assert after == ['motion']
@@ -0,0 +1,34 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from backend import server
+
+
+async def make_processor(camera_id, source):
+    return server.VideoProcessor(camera_id, source, camera_id, fps=20)
+
+
+def test_stalled_stream_does_not_delay_other_cameras():
+    stalled = asyncio.run(make_processor('stalled', 'rtsp://127.0.0.1:9/stalled'))
+    # A connected stream whose grab thread never delivers a frame
+    stalled.reader = server.LatestFrameReader(stalled.source, 'stalled')
+    stalled.reader.connected = True
+    
+    steps = []
+    other = SimpleNamespace(camera_id='other', fps=20, capture_step=lambda: steps.append(time.monotonic()))
+    
+    scheduler = server.CaptureScheduler(1)
+    scheduler.add(stalled)
+    scheduler.add(other)
+    time.sleep(1.0)
+    stalled_stats, other_stats = scheduler.camera_stats('stalled'), scheduler.camera_stats('other')
+    scheduler.remove(stalled)
+    scheduler.remove(other)
+    
+    # One worker serves both cameras; the stalled one skips its steps instead of holding it.
+    # A blocking read would take 100 ms per step and starve the other camera; the bounds
+    # leave room for a loaded machine
+    assert stalled.reader.pending
+    assert stalled_stats['steps'] >= 10 and stalled_stats['mean_step_ms'] < 50
+    assert other_stats['steps'] >= 10 and other_stats['late_steps'] <= other_stats['steps'] // 4
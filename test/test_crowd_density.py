@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from backend import server
+
+
+def halves():
+    return server.ZoneLayout([
+        server.DetectionZone(name='west', points=[[0, 0], [0.5, 0], [0.5, 1], [0, 1]]),
+        server.DetectionZone(name='east', points=[[0.5, 0], [1, 0], [1, 1], [0.5, 1]]),
+    ])
+
+
+def test_occupancy_grid_counts_confident_foreground_only():
+    fg_mask = np.zeros((120, 160), dtype=np.uint8)
+    fg_mask[:, :80] = 255
+    fg_mask[:, 80:] = 127  # MOG2 shadow
+    grid = server.occupancy_grid(fg_mask, (4, 3))
+    assert grid.shape == (3, 4)
+    assert grid[:, :2] == pytest.approx(np.ones((3, 2)))
+    assert not grid[:, 2:].any()
+
+
+def test_zone_is_raised_only_after_staying_crowded_for_the_hold_time():
+    layout = halves()
+    estimator = server.CrowdDensityEstimator('cam', threshold=0.3, hold_seconds=4)
+    occupancy = np.zeros((12, 16), dtype=np.float32)
+    occupancy[:, :8] = 0.8
+    
+    first = None
+    for step in range(40):
+        now = step * 0.5
+        crowded = estimator.update(occupancy, layout, now)
+        if crowded and first is None:
+            first = now
+            assert [zone.name for zone, _ in crowded] == ['west']
+            assert crowded[0][1] >= 0.3
+    # Smoothing takes ~2.4s to cross the threshold, then the 4s hold
+    assert 6 <= first <= 7.5
+    
+    # A brief dip below the threshold restarts the hold
+    estimator.update(np.zeros_like(occupancy), layout, 30.0)
+    assert estimator.update(occupancy, layout, 30.5) == []
+
+
+def test_heatmap_is_shared_until_the_next_update():
+    layout = halves()
+    estimator = server.CrowdDensityEstimator('cam', threshold=0.3, hold_seconds=4)
+    assert estimator.heatmap() is None
+    occupancy = np.zeros((12, 16), dtype=np.float32)
+    occupancy[:, 8:] = 1.0
+    estimator.update(occupancy, layout, 0.0)
+    estimator.update(occupancy, layout, 5.0)
+    
+    heatmap = estimator.heatmap()
+    assert heatmap is estimator.heatmap()
+    assert heatmap['camera_id'] == 'cam'
+    assert (heatmap['rows'], heatmap['cols']) == (12, 16)
+    assert len(heatmap['cells']) == 12 and len(heatmap['cells'][0]) == 16
+    assert heatmap['bounds'] == [0.0, 0.0, 1.0, 1.0]
+    west, east = heatmap['zones']
+    assert west['density'] == pytest.approx(0, abs=0.01)
+    assert east['density'] == pytest.approx(1 - np.exp(-1), abs=0.01)
+    
+    estimator.update(occupancy, layout, 6.0)
+    assert estimator.heatmap() is not heatmap
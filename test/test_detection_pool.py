@@ -0,0 +1,123 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from backend import server
+
+
+def wait_for(condition, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def make_processor():
+    processor = SimpleNamespace(camera_id='cam', camera_index=0, zone_layout=server.ZoneLayout(None),
+                                fps=30, detection_rate=30.0, motion=[])
+    processor.decimator = server.AdaptiveDecimator(processor)
+    processor.handle_motion = lambda areas, now: processor.motion.append(areas)
+    processor.handle_occupancy = lambda occupancy, now: None
+    return processor
+
+
+def test_dead_worker_falls_back_in_process_and_respawns(monkeypatch):
+    pool = server.DetectionWorkerPool(1, 2, respawn_seconds=0.5)
+    pool.start()
+    monkeypatch.setattr(server, 'detection_pool', pool)
+    # Process start-up takes hundreds of ms; capture workers must not wait on the lock for it
+    spawn, lock_held = pool._spawn, []
+    def checked_spawn(index):
+        lock_held.append(pool.lock.locked())
+        return spawn(index)
+    monkeypatch.setattr(pool, '_spawn', checked_spawn)
+    processor = make_processor()
+    frame = np.zeros((180, 320), dtype=np.uint8)
+    try:
+        assert pool.available(processor)
+        pool.processes[0].kill()
+        pool.processes[0].join()
+        
+        # While the worker is down the detector runs MOG2 itself
+        assert not pool.available(processor)
+        assert not pool.submit(processor, frame)
+        detector = server.MotionDetector(processor)
+        detector.process(frame, time.time())
+        detector.process(frame, time.time())
+        assert len(processor.motion) == 1
+        
+        assert wait_for(lambda: pool.available(processor))
+        assert pool.respawns == 1
+        assert lock_held == [False]
+        processor.motion.clear()
+        assert pool.submit(processor, frame)
+        assert pool.submit(processor, frame)
+        assert wait_for(lambda: len(processor.motion) == 1)
+    finally:
+        pool.stop()
+
+
+def test_result_for_a_reused_slot_is_ignored(monkeypatch):
+    pool = server.DetectionWorkerPool(1, 1)
+    pool.start()
+    processor = make_processor()
+    frame = np.zeros((180, 320), dtype=np.uint8)
+    try:
+        pool.processes[0].kill()
+        pool.processes[0].join()
+        assert wait_for(lambda: pool.respawns == 1)
+        assert pool.submit(processor, frame)
+        sequence = pool.cameras['cam']['sequences'][0]
+        pool.result_queue.put(('cam', 0, sequence + 1, [10 ** 6], None, 0.0))
+        assert wait_for(lambda: pool.stale_results == 1)
+        assert processor.motion == []
+    finally:
+        pool.stop()
+
+
+def test_only_frames_whose_result_returns_count_towards_the_detection_rate():
+    pool = server.DetectionWorkerPool(1, 1)
+    pool.start()
+    processor = make_processor()
+    frame = np.zeros((180, 320), dtype=np.uint8)
+    try:
+        # One slot: the second and third frames are skipped while the first is in flight
+        results = [pool.submit(processor, frame) for _ in range(3)]
+        assert wait_for(lambda: processor.decimator.frames_analysed == 1)
+        time.sleep(0.2)
+        assert results == [True, False, False]
+        assert processor.decimator.frames_analysed == 1
+    finally:
+        pool.stop()
+
+
+def run_one_frame(detectors, submit_result, monkeypatch):
+    pool = SimpleNamespace(available=lambda processor: True, submit=lambda processor, image: submit_result,
+                           unregister=lambda camera_id: None)
+    monkeypatch.setattr(server, 'detection_pool', pool)
+    
+    async def analyse():
+        processor = server.VideoProcessor(f"pool-{submit_result}-{len(detectors)}", 'mock://', 'pool',
+                                          detectors=detectors)
+        frame = processor.mock_renderer.render()
+        processor.process_frame_for_events(frame, server.FrameRenditions(frame))
+        state = dict(server.detection_scheduler.cameras[processor.camera_id])
+        server.detection_scheduler.unregister(processor.camera_id)
+        return processor.decimator.frames_analysed, state
+    
+    return asyncio.run(analyse())
+
+
+def test_cameras_without_motion_are_accounted_in_process(monkeypatch):
+    analysed, state = run_one_frame(['abandoned_object'], True, monkeypatch)
+    assert analysed == 1 and state['runs'] == 1
+
+
+def test_a_frame_the_pool_skipped_gives_its_token_back(monkeypatch):
+    analysed, state = run_one_frame(['motion'], False, monkeypatch)
+    assert analysed == 0
+    assert state['runs'] == 0 and state['skips'] == 1 and state['tokens'] == 1.0
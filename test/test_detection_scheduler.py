@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+
+from backend import server
+
+
+def make_processor(camera_id, priority):
+    return SimpleNamespace(camera_id=camera_id, fps=30, last_motion_time=0.0, detection_priority=priority,
+                           decimator=SimpleNamespace(requested_fps=lambda: 30.0, stats=dict))
+
+
+def test_higher_priority_gets_a_larger_share_of_a_tight_budget():
+    scheduler = server.DetectionScheduler(budget_fps=10.0, min_fps=0.5)
+    high, low = make_processor('high', 3.0), make_processor('low', 1.0)
+    scheduler.try_acquire(high, 1000.0)
+    scheduler.try_acquire(low, 1000.0)
+    scheduler._rebalance(1001.0)
+    
+    cameras = scheduler.stats()['cameras']
+    assert cameras['high']['allocated_fps'] > 2 * cameras['low']['allocated_fps']
+    assert cameras['high']['allocated_fps'] + cameras['low']['allocated_fps'] <= 10.0 + 1e-6
+
+
+def test_cameras_over_budget_are_decimated_and_counted():
+    scheduler = server.DetectionScheduler(budget_fps=10.0, min_fps=0.5)
+    cameras = [make_processor('a', 1.0), make_processor('b', 1.0)]
+    runs = {'a': 0, 'b': 0}
+    # Both cameras offer 30 frames/sec for 5 simulated seconds
+    for tick in range(150):
+        now = 1000.0 + tick / 30.0
+        for processor in cameras:
+            runs[processor.camera_id] += scheduler.try_acquire(processor, now)
+    
+    stats = scheduler.stats()['cameras']
+    for camera_id in runs:
+        assert 20 <= runs[camera_id] <= 30  # ~5 fps each out of 30
+        assert stats[camera_id]['frames_decimated'] == 150 - runs[camera_id]
+        assert 0.75 < stats[camera_id]['decimation'] < 0.9
+
+
+def test_recent_activity_boosts_a_cameras_share():
+    scheduler = server.DetectionScheduler(budget_fps=10.0, min_fps=0.5)
+    active, quiet = make_processor('active', 1.0), make_processor('quiet', 1.0)
+    active.last_motion_time = 995.0
+    scheduler.try_acquire(active, 1000.0)
+    scheduler.try_acquire(quiet, 1000.0)
+    scheduler._rebalance(1001.0)
+    
+    cameras = scheduler.stats()['cameras']
+    assert cameras['active']['weight'] == server.DETECTION_ACTIVITY_BOOST
+    assert cameras['active']['allocated_fps'] > cameras['quiet']['allocated_fps']
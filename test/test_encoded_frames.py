@@ -0,0 +1,38 @@
+import asyncio
+
+from backend import server
+
+
+def test_each_frame_is_encoded_once_for_every_client(monkeypatch):
+    encodes = []
+    imencode = server.cv2.imencode
+    def counting_imencode(*args, **kwargs):
+        encodes.append(args[0])
+        return imencode(*args, **kwargs)
+    monkeypatch.setattr(server.cv2, 'imencode', counting_imencode)
+    
+    async def capture():
+        processor = server.VideoProcessor('cache', 'mock://?fps=30', 'cache', fps=30)
+        processor.is_running = True
+        # Three clients watching full quality
+        for _ in range(3):
+            server.stream_demand.add(processor.camera_id, 'full')
+        try:
+            processor.capture_step()
+            first = processor.get_encoded_frame()
+            encodes_per_frame = len(encodes)
+            unchanged = processor.get_encoded_frame(since_version=first.version)
+            await asyncio.sleep(0.05)
+            processor.capture_step()
+            return first, encodes_per_frame, unchanged, processor.get_encoded_frame(since_version=first.version)
+        finally:
+            for _ in range(3):
+                server.stream_demand.remove(processor.camera_id, 'full')
+    
+    first, encodes_per_frame, unchanged, second = asyncio.run(capture())
+    assert encodes_per_frame == 1
+    assert first.jpeg.startswith(b'\xff\xd8')
+    # Clients that already sent this version are told there is nothing new
+    assert unchanged is None
+    assert second.version > first.version
+    assert len(encodes) == 2
@@ -0,0 +1,33 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from pydantic import ValidationError
+
+from backend import server
+
+
+def test_zone_severity_must_be_a_known_level():
+    with pytest.raises(ValidationError):
+        server.DetectionZone(name='platform', points=[[0, 0], [1, 0], [1, 1]], severity='urgent')
+
+
+def test_unknown_severity_updates_an_open_incident():
+    async def report_twice():
+        async def trigger_event(*args):
+            return SimpleNamespace(id='event')
+        
+        aggregator = server.IncidentAggregator(10, 30, 600)
+        processor = SimpleNamespace(camera_id='cam', trigger_event=trigger_event)
+        aggregator.report(processor, server.EventType.MOTION, 'motion', 0.5, 'high', None, 100, 1.0)
+        await asyncio.sleep(0)
+        aggregator.report(processor, server.EventType.MOTION, 'motion', 0.6, 'urgent', None, 200, 2.0)
+        incident = next(iter(aggregator.incidents.values()))
+        await asyncio.gather(*aggregator.opening)
+        aggregator.sweeper.cancel()
+        return incident, aggregator
+    
+    incident, aggregator = asyncio.run(report_twice())
+    assert incident.count == 2 and incident.peak_area == 200
+    assert incident.severity == 'high'
+    assert not aggregator.opening
@@ -0,0 +1,40 @@
+import asyncio
+import re
+from types import SimpleNamespace
+
+from backend import server
+
+ADMIN = server.User(username='admin', email='admin@example.com', role=server.UserRole.ADMIN)
+
+
+def test_mjpeg_part_is_one_multipart_jpeg():
+    jpeg = b'\xff\xd8' + bytes(100) + b'\xff\xd9'
+    encoded = server.EncodedFrame('cam', 'cam', 1, 'full', 1, jpeg, 0.0, 10, False)
+    part = encoded.mjpeg_part
+    
+    match = re.match(rb'--(\w+)\r\nContent-Type: image/jpeg\r\nContent-Length: (\d+)\r\n\r\n', part)
+    assert match.group(1).decode() == server.MJPEG_BOUNDARY
+    assert int(match.group(2)) == len(jpeg)
+    assert part[match.end():] == jpeg + b'\r\n'
+
+
+def test_stream_serves_the_shared_encoded_frame(monkeypatch):
+    encoded = server.EncodedFrame('cam', 'cam', 1, 'full', 1, b'\xff\xd8\xff\xd9', 0.0, 10, False)
+    processor = SimpleNamespace(get_encoded_frame=lambda since_version=None, tier='full': encoded)
+    monkeypatch.setattr(server, 'video_processors', {'cam': processor})
+    
+    async def first_part():
+        response = await server.stream_camera_mjpeg('cam', fps=None, quality='full', current_user=ADMIN)
+        parts = response.body_iterator
+        part = await parts.__anext__()
+        watched = server.stream_demand.tiers_for('cam')
+        await parts.aclose()
+        return response, part, watched
+    
+    response, part, watched = asyncio.run(first_part())
+    assert response.media_type == f"multipart/x-mixed-replace; boundary={server.MJPEG_BOUNDARY}"
+    # The same bytes the WebSocket path uses: no encode of its own
+    assert part is encoded.mjpeg_part
+    assert watched == ['full']
+    assert server.stream_demand.tiers_for('cam') == []
+    assert server.mjpeg_streams == []
@@ -0,0 +1,14 @@
+import cv2
+import numpy as np
+
+from backend import server
+
+
+def test_intrusion_figure_exceeds_default_motion_threshold():
+    renderer = server.MockFrameRenderer(640, 480, 'intrusion', seed=1)
+    start = 1_000_000.0 - 1_000_000.0 % 20  # start of a 20 s cycle
+    empty = server.FrameRenditions(renderer.render(now=start + 10)).gray('detection')
+    crossing = server.FrameRenditions(renderer.render(now=start + 3)).gray('detection')
+    # Ignore the timestamp overlay at the top of the frame
+    changed = cv2.absdiff(empty, crossing)[60:] > 25
+    assert np.count_nonzero(changed) > server.MOTION_AREA_THRESHOLD
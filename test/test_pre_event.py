@@ -0,0 +1,38 @@
+from backend import server
+
+
+def frame(captured_at, size=1000):
+    return server.EncodedFrame('cam', 'cam', 1, 'full', int(captured_at * 10), bytes(size), captured_at, 10, False)
+
+
+def test_pre_event_buffers_stay_under_the_shared_memory_cap():
+    pool = server.PreEventBufferPool(10_000)
+    quiet, busy = pool.create(60), pool.create(60)
+    for index in range(3):
+        quiet.add(frame(index * 0.1))
+    for index in range(20):
+        busy.add(frame(index * 0.1))
+    
+    # The busy camera over its fair share gives up its own oldest frames
+    assert pool.total_bytes <= 10_000
+    assert len(quiet.frames) == 3
+    assert len(busy.frames) == 7
+    assert busy.snapshot()[0].captured_at == 1.3
+    assert pool.stats()['evicted_frames'] == 13
+
+
+def test_pre_event_buffer_keeps_only_its_seconds_and_drains_without_copies():
+    pool = server.PreEventBufferPool(10 ** 6)
+    buffer = pool.create(1.0)
+    frames = [frame(index * 0.25) for index in range(9)]
+    for encoded in frames:
+        buffer.add(encoded)
+    
+    assert [f.captured_at for f in buffer.snapshot()] == [1.0, 1.25, 1.5, 1.75, 2.0]
+    assert [f.captured_at for f in buffer.snapshot(seconds=0.5)] == [1.5, 1.75, 2.0]
+    drained = buffer.drain()
+    assert drained[-1] is frames[-1]
+    assert pool.total_bytes == 0 and not buffer.frames
+    
+    pool.release(buffer)
+    assert pool.stats()['cameras'] == 0
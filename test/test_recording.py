@@ -0,0 +1,50 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from backend import server
+
+
+def make_session(tmp_path, name):
+    recording = server.Recording(camera_id='cam', start_time=server.datetime.now(server.timezone.utc),
+                                 file_path=f"/recordings/{name}.mp4")
+    return server.RecordingSession(None, recording, tmp_path / f"{name}.mp4", 10)
+
+
+def test_recordings_share_one_memory_budget(tmp_path, monkeypatch):
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    pool = server.RecordingMemoryPool(frame.nbytes * 3)
+    monkeypatch.setattr(server, 'recording_memory_pool', pool)
+    
+    first, second = make_session(tmp_path, 'a'), make_session(tmp_path, 'b')
+    assert pool.admit(frame.nbytes) and pool.admit(frame.nbytes)
+    for index in range(4):
+        first.submit(frame, float(index))
+    second.submit(frame, 0.0)
+    
+    # Three frames fit across both sessions; the rest are dropped, not queued
+    assert first.queue.qsize() + second.queue.qsize() == 3
+    assert first.frames_dropped + second.frames_dropped == 2
+    assert pool.total_bytes == frame.nbytes * 3
+    assert not pool.admit(frame.nbytes)
+    assert pool.stats()['refused_sessions'] == 1
+
+
+def test_failed_recording_start_gives_its_slot_back(monkeypatch):
+    pool = server.RecordingMemoryPool(10 ** 9)
+    monkeypatch.setattr(server, 'recording_memory_pool', pool)
+    
+    async def database_down(*args):
+        raise RuntimeError('database unavailable')
+    monkeypatch.setattr(server, 'db_insert_one', database_down)
+    
+    async def start():
+        processor = server.VideoProcessor('rec', 'mock://', 'rec')
+        with pytest.raises(RuntimeError):
+            await processor.start_recording()
+        return processor
+    
+    processor = asyncio.run(start())
+    assert pool.sessions == 0
+    assert processor.recording_session is None
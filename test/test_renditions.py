@@ -0,0 +1,30 @@
+import numpy as np
+
+from backend import server
+
+
+def test_renditions_are_resized_once_and_encoded_on_demand(monkeypatch):
+    resizes, encodes = [], []
+    resize, imencode = server.cv2.resize, server.cv2.imencode
+    def counting_resize(image, size, *args, **kwargs):
+        resizes.append((image.shape[1], image.shape[0], size))
+        return resize(image, size, *args, **kwargs)
+    def counting_imencode(*args, **kwargs):
+        encodes.append(args[0])
+        return imencode(*args, **kwargs)
+    monkeypatch.setattr(server.cv2, 'resize', counting_resize)
+    monkeypatch.setattr(server.cv2, 'imencode', counting_imencode)
+    
+    renditions = server.FrameRenditions(np.zeros((720, 1280, 3), dtype=np.uint8))
+    detection = renditions.detection
+    thumbnail = renditions.get('thumbnail')
+    motion = renditions.get('motion')
+    assert renditions.get('detection') is detection and renditions.get('thumbnail') is thumbnail
+    assert detection.shape == (240, 320, 3) and thumbnail.shape == (180, 240, 3) and motion.shape == (60, 80, 3)
+    # Each size once, the smaller ones from the smallest rendition already made, not full size
+    assert resizes == [(1280, 720, (320, 240)), (320, 240, (240, 180)), (240, 180, (80, 60))]
+    assert encodes == []
+    
+    jpeg = renditions.jpeg('thumbnail', 50)
+    assert renditions.jpeg('thumbnail', 50) is jpeg
+    assert jpeg.startswith(b'\xff\xd8') and len(encodes) == 1
@@ -0,0 +1,134 @@
+import asyncio
+import time
+
+import cv2
+import numpy as np
+
+from backend import server
+
+
+def write_clip(path, frames=20, fps=10):
+    """A clip whose frame i is uniformly grey level 10 * i"""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), fps, (320, 240))
+    for index in range(frames):
+        writer.write(np.full((240, 320, 3), index * 10, dtype=np.uint8))
+    writer.release()
+
+
+def wait_for_frame(reader, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        retrieved = reader.poll()
+        if retrieved is not None:
+            return retrieved
+        time.sleep(0.005)
+    return None
+
+
+class PacedCapture:
+    """A live stream stand-in: grab() blocks until the next frame at `fps`"""
+
+    def __init__(self, fps):
+        self.interval = 1.0 / fps
+        self.next_at = time.monotonic()
+        self.index = 0
+
+    def grab(self):
+        self.next_at += self.interval
+        time.sleep(max(0.0, self.next_at - time.monotonic()))
+        self.index += 1
+        return True
+
+    def retrieve(self, out=None):
+        frame = out if out is not None and out.shape == (240, 320, 3) else np.zeros((240, 320, 3), np.uint8)
+        frame[:] = self.index % 256
+        return True, frame
+
+    def release(self):
+        pass
+
+
+class PacedReader(server.LatestFrameReader):
+    def _open(self):
+        self.cap = PacedCapture(25)
+        self.stream_fps, self.resolution = 25.0, '320x240'
+        return True
+
+
+def test_network_frames_are_fresh_when_published():
+    async def sample_ages():
+        processor = server.VideoProcessor('live', 'rtsp://127.0.0.1/live', 'live', fps=2)
+        processor.reader = PacedReader(processor.source, 'live')
+        processor.reader.start()
+        processor.is_running = True
+        server.capture_scheduler.add(processor)
+        ages, sequence = [], 0
+        try:
+            deadline = time.monotonic() + 3.0
+            while time.monotonic() < deadline:
+                slot = processor.frame_ring.latest
+                if slot is not None and slot.sequence != sequence:
+                    sequence = slot.sequence
+                    ages.append(time.time() - slot.captured_at)
+                await asyncio.sleep(0.005)
+        finally:
+            server.capture_scheduler.remove(processor)
+            processor.reader.stop()
+        return ages
+    
+    # At 2 fps a frame fetched right after the previous step would be ~500 ms old
+    ages = asyncio.run(sample_ages())
+    assert len(ages) >= 4
+    assert max(ages[1:]) < 0.3
+
+
+def test_file_is_paced_loops_and_hands_out_the_newest_frame(tmp_path):
+    path = tmp_path / 'clip.avi'
+    write_clip(path)
+    reader = server.LatestFrameReader(str(path), 'clip')
+    reader.start()
+    try:
+        time.sleep(0.6)
+        reader.request()
+        frame, grabbed_at = wait_for_frame(reader)
+        # Grabbed at 10 fps, not decoded in one burst: about the sixth frame, just grabbed
+        assert 3 <= round(frame.mean() / 10) <= 9
+        assert time.time() - grabbed_at < 0.2
+        
+        delivered = 0
+        for _ in range(20):
+            reader.request()
+            delivered += wait_for_frame(reader, 0.3) is not None
+        # Past the end of the 2 s clip it loops instead of reconnecting
+        assert delivered == 20
+        assert reader.grabbed > 20
+        assert reader.failures == 0 and reader.connected
+    finally:
+        reader.stop()
+
+
+def test_reader_backs_off_until_the_stream_appears(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, 'STREAM_RECONNECT_MIN_SECONDS', 0.05)
+    monkeypatch.setattr(server, 'STREAM_RECONNECT_MAX_SECONDS', 0.2)
+    path = tmp_path / 'late.avi'
+    reader = server.LatestFrameReader(str(path), 'late')
+    reader.start()
+    try:
+        time.sleep(0.4)
+        assert not reader.connected
+        assert reader.failures >= 2
+        assert reader.stats()['next_backoff_seconds'] == 0.2
+        
+        # Written aside and moved in, so the reader never opens half a file
+        write_clip(tmp_path / 'partial.avi')
+        (tmp_path / 'partial.avi').rename(path)
+        deadline = time.monotonic() + 2.0
+        while not reader.connected and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert reader.connected
+        assert reader.reconnects == 1
+        assert reader.backoff == 0.05
+        reader.request()
+        assert wait_for_frame(reader) is not None
+    finally:
+        reader.stop()
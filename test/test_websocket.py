@@ -0,0 +1,106 @@
+import asyncio
+import json
+import time
+
+from fastapi.testclient import TestClient
+
+from backend import server
+
+
+def receive_until(ws, message_type):
+    while True:
+        message = ws.receive_json()
+        if message['type'] == message_type:
+            return message
+
+
+def test_malformed_messages_get_errors_and_keep_the_socket_open():
+    client = TestClient(server.app)
+    with client.websocket_connect('/api/ws') as ws:
+        receive_until(ws, 'connection')
+        for bad in ({'type': 'subscribe', 'camera_ids': 5},
+                    {'type': 'subscribe', 'camera_ids': [1, 2]},
+                    {'type': 'subscribe', 'cameras': 'cam'},
+                    {'type': 'subscribe', 'camera_ids': ['cam'], 'quality': ['full']},
+                    {'type': 'unsubscribe', 'camera_ids': None},
+                    [1, 2, 3]):
+            ws.send_text(json.dumps(bad))
+            assert receive_until(ws, 'error')['message']
+        ws.send_bytes(b'\x00\x01')
+        assert 'Binary' in receive_until(ws, 'error')['message']
+        
+        ws.send_text(json.dumps({'type': 'ping'}))
+        assert receive_until(ws, 'pong')
+
+
+def test_queued_messages_are_bounded():
+    session = server.ClientSession(websocket=None)
+    for index in range(server.WS_MAX_QUEUED_MESSAGES + 10):
+        session.send_message({'type': 'event', 'index': index})
+    assert len(session.messages) == server.WS_MAX_QUEUED_MESSAGES
+    assert session.messages_dropped == 10
+    assert json.loads(session.messages[-1])['index'] == server.WS_MAX_QUEUED_MESSAGES + 9
+
+
+def test_binary_frame_header_round_trips():
+    jpeg = b'\xff\xd8jpeg bytes\xff\xd9'
+    encoded = server.EncodedFrame('cam', 'Platform 1', 7, 'full', 2 ** 32 + 5, jpeg, 1700000000.25, 10, True)
+    packet = encoded.packet
+    
+    version, camera_index, frame_number, timestamp, mock = server.FRAME_HEADER.unpack_from(packet)
+    assert version == server.FRAME_PROTOCOL_VERSION
+    assert camera_index == 7
+    assert frame_number == 5  # wraps at 32 bits
+    assert timestamp == 1700000000.25
+    assert mock == 1
+    assert packet[server.FRAME_HEADER.size:] == jpeg
+    assert packet is encoded.packet  # packed once, shared by every binary client
+
+
+def test_binary_protocol_is_negotiated_on_connect():
+    client = TestClient(server.app)
+    with client.websocket_connect('/api/ws?protocol=binary') as ws:
+        message = receive_until(ws, 'connection')
+    assert message['protocol'] == 'binary'
+    header = message['frame_header']
+    assert header['size'] == server.FRAME_HEADER.size == 16
+    assert header['format'] == server.FRAME_HEADER.format
+    assert len(header['fields']) == 5
+
+
+class RecordingSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+    async def send_bytes(self, data):
+        self.sent.append(data)
+
+
+def test_mailbox_keeps_only_the_newest_fresh_frame(monkeypatch):
+    monkeypatch.setattr(server, 'video_processors', {'cam': None, 'old': None})
+    
+    def frame(camera_id, version, age=0.0):
+        return server.EncodedFrame(camera_id, camera_id, 1, 'full', version, b'jpeg', time.time() - age, 10, False)
+    
+    async def deliver():
+        session = server.ClientSession(RecordingSocket())
+        for version in (1, 2, 3):
+            session.offer_frame(frame('cam', version))
+        session.offer_frame(frame('old', 1, age=server.WS_FRAME_STALE_SECONDS + 1))
+        sender = asyncio.create_task(session.run_sender())
+        await asyncio.sleep(0.05)
+        sender.cancel()
+        # A version the client already has is not offered again
+        session.offer_frame(frame('cam', 3))
+        return session
+    
+    session = asyncio.run(deliver())
+    batches = [message['data'] for message in session.websocket.sent if message['type'] == 'video_frames']
+    assert [[(f['camera_id'], f['frame_count']) for f in batch] for batch in batches] == [[('cam', 3)]]
+    # Two frames replaced before the client caught up, one too stale to send
+    assert session.frames_dropped == 3
+    assert session.frames_sent == 1
+    assert session.mailbox == {}